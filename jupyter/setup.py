@@ -42,6 +42,9 @@ setuptools.setup(
         "notebook >=4.2",
         "colorama",
     ],
+    extras_require={
+        "fast": ["orjson"],
+    },
     python_requires=">=3.5",
     classifiers=[
         "Framework :: Jupyter",
@@ -1,6 +1,19 @@
+import atexit
 from notebook.utils import url_path_join as ujoin
-from .handler import NeoaiHandler
-from .neoai import Neoai
+from .cache import CompletionCache
+from .config import JupyterNeoai
+from .context import NotebookContexts
+from .handler import (
+    NeoaiBatchHandler,
+    NeoaiHandler,
+    NeoaiMetricsHandler,
+    NeoaiStatusHandler,
+    NeoaiWebSocketHandler,
+)
+from .metrics import Metrics
+from .pool import NeoaiPool
+from .serializer import Serializer
+from .singleflight import SingleFlight
 
 # Jupyter Extension points
 def _jupyter_server_extension_paths():
@@ -28,7 +41,51 @@ def load_jupyter_server_extension(nb_server_app):
     web_app = nb_server_app.web_app
     host_pattern = ".*$"
     route_pattern = ujoin(web_app.settings["base_url"], "/neoai")
-    neoai = Neoai()
+    batch_route_pattern = ujoin(web_app.settings["base_url"], "/neoai/batch")
+    ws_route_pattern = ujoin(web_app.settings["base_url"], "/neoai/ws")
+    status_route_pattern = ujoin(web_app.settings["base_url"], "/neoai/status")
+    metrics_route_pattern = ujoin(web_app.settings["base_url"], "/neoai/metrics")
+    config = JupyterNeoai(parent=nb_server_app)
+    metrics = Metrics()
+    pool = NeoaiPool(
+        size=config.pool_size,
+        max_queue_depth=config.max_queue_depth,
+        request_timeout=config.request_timeout,
+        stall_timeout=config.stall_timeout,
+        binary_store_dir=config.binary_store_dir,
+        update_check_interval=config.update_check_interval,
+        versions_to_keep=config.binary_versions_to_keep,
+        hot_standby=config.hot_standby,
+        health_check_interval=config.health_check_interval,
+        metrics=metrics,
+        binary_path=config.binary_path or None,
+        serializer=Serializer(use_orjson=config.fast_json, passthrough=config.response_passthrough),
+    )
+    # Stops the binaries and their standbys along with the server.
+    atexit.register(pool.close)
+    singleflight = SingleFlight(pool)
+    cache = CompletionCache(
+        singleflight,
+        max_entries=config.cache_max_entries,
+        max_bytes=config.cache_max_bytes,
+        ttl=config.cache_ttl,
+    )
+    neoai = NotebookContexts(cache, max_documents=config.context_max_documents)
     web_app.add_handlers(
-        host_pattern, [(route_pattern, NeoaiHandler, {"neoai": neoai})]
+        host_pattern,
+        [
+            (route_pattern, NeoaiHandler, {"neoai": neoai}),
+            (
+                batch_route_pattern,
+                NeoaiBatchHandler,
+                {"neoai": neoai, "timeout": config.batch_timeout},
+            ),
+            (ws_route_pattern, NeoaiWebSocketHandler, {"neoai": neoai}),
+            (status_route_pattern, NeoaiStatusHandler, {"pool": pool}),
+            (
+                metrics_route_pattern,
+                NeoaiMetricsHandler,
+                {"metrics": metrics, "pool": pool, "singleflight": singleflight, "cache": cache},
+            ),
+        ],
     )
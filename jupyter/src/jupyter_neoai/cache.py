@@ -0,0 +1,156 @@
+import collections
+import hashlib
+import re
+import time
+from .serializer import RawResponse
+from .singleflight import request_key
+
+# The characters completions are filtered on; anything else typed after a
+# cached request changes the context too much to reuse its results.
+_WORD_TAIL = re.compile(r"\w*\Z")
+
+
+class CompletionCache:
+    """
+    A bounded LRU cache of Autocomplete responses.
+
+    Besides exact hits, a request whose ``before`` only extends the word at
+    the cursor of a cached request (``df.gro`` -> ``df.grou``) is served by
+    filtering the cached results down to those whose ``new_prefix`` still
+    matches what was typed. Everything else falls through to ``neoai``.
+    Responses are kept as they came, so a ``RawResponse`` is only parsed
+    when it is narrowed.
+    """
+
+    def __init__(self, neoai, max_entries=1024, max_bytes=8 * 1024 * 1024, ttl=30.0):
+        self._neoai = neoai
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._by_stem = {}
+        self._bytes = 0
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+
+    async def request(self, request, session=None, deadline=None):
+        key = request_key(request)
+        if key is None or self._max_entries <= 0:
+            return await self._neoai.request(request, session=session, deadline=deadline)
+
+        response = self._lookup(key)
+        if response is not None:
+            return response
+
+        self.misses += 1
+        response = await self._neoai.request(request, session=session, deadline=deadline)
+        if response is not None:
+            self._store(key, response)
+        return response
+
+    def _lookup(self, key):
+        now = time.monotonic()
+        digest = _digest(key)
+        entry = self._entries.get(digest)
+        if entry is not None and not self._expired(entry, now):
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry.response
+
+        stem, word = _split_word(key)
+        entry = self._entries.get(self._by_stem.get(_digest(stem)))
+        if entry is None or self._expired(entry, now) or not word.startswith(entry.word):
+            return None
+        response = _narrow(entry.response, word[len(entry.word) :])
+        if response is None:
+            return None
+        self._entries.move_to_end(entry.digest)
+        self.prefix_hits += 1
+        return response
+
+    def _store(self, key, response):
+        digest = _digest(key)
+        stem, word = _split_word(key)
+        self._discard(digest)
+
+        entry = _Entry(digest, _digest(stem), word, response, time.monotonic())
+        self._entries[digest] = entry
+        self._by_stem[entry.stem] = digest
+        self._bytes += entry.size
+
+        while self._entries and (
+            len(self._entries) > self._max_entries or self._bytes > self._max_bytes
+        ):
+            self._discard(next(iter(self._entries)))
+
+    def _discard(self, digest):
+        entry = self._entries.pop(digest, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        if self._by_stem.get(entry.stem) == digest:
+            del self._by_stem[entry.stem]
+
+    def _expired(self, entry, now):
+        if now - entry.created <= self._ttl:
+            return False
+        self._discard(entry.digest)
+        return True
+
+
+class _Entry:
+    __slots__ = ("digest", "stem", "word", "response", "created", "size")
+
+    def __init__(self, digest, stem, word, response, created):
+        self.digest = digest
+        self.stem = stem
+        self.word = word
+        self.response = response
+        self.created = created
+        self.size = len(digest) + len(stem) + len(word) + _response_size(response)
+
+
+def _digest(key):
+    h = hashlib.blake2b(digest_size=16)
+    for part in key:
+        h.update(str(part).encode("utf8", "surrogatepass"))
+        h.update(b"\0")
+    return h.digest()
+
+
+def _split_word(key):
+    """
+    Splits the word at the cursor off ``before``, returning the key of the
+    remaining context and the word.
+    """
+    filename, before, *rest = key
+    word = _WORD_TAIL.search(before).group()
+    return (filename, before[: len(before) - len(word)], *rest), word
+
+
+def _narrow(response, typed):
+    """
+    Returns ``response`` as if ``typed`` had been appended to its prefix,
+    or ``None`` if none of its results survive.
+    """
+    old_prefix = response.get("old_prefix", "") + typed
+    results = [
+        result
+        for result in response.get("results") or ()
+        if result.get("new_prefix", "").startswith(old_prefix)
+    ]
+    if not results:
+        return None
+    return dict(response, old_prefix=old_prefix, results=results)
+
+
+def _response_size(response):
+    if isinstance(response, RawResponse):
+        return len(response.line)
+    size = len(response.get("old_prefix", ""))
+    for result in response.get("results") or ():
+        for value in result.values():
+            if isinstance(value, str):
+                size += len(value)
+    return size
@@ -0,0 +1,140 @@
+from traitlets import Bool, Float, Int, Unicode, default
+from traitlets.config import Configurable
+from .store import default_store_dir
+
+
+class JupyterNeoai(Configurable):
+    """
+    Server-side settings of the NeoAi extension, e.g. in
+    ``jupyter_notebook_config.py``::
+
+        c.JupyterNeoai.pool_size = 4
+    """
+
+    pool_size = Int(
+        1,
+        config=True,
+        help="Number of NeoAi binaries serving completion requests.",
+    )
+    max_queue_depth = Int(
+        8,
+        config=True,
+        help=(
+            "Maximum number of in-flight requests per binary. Requests for a "
+            "busier binary are routed to the least loaded one instead."
+        ),
+    )
+    request_timeout = Float(
+        1.0,
+        config=True,
+        help=(
+            "Seconds to wait for the binary to answer a request before giving "
+            "up on it. Completions arriving later than this are stale anyway."
+        ),
+    )
+    batch_timeout = Float(
+        5.0,
+        config=True,
+        help=(
+            "Seconds to answer all requests of a /neoai/batch call. They wait "
+            "for busy binaries instead of being dropped."
+        ),
+    )
+    stall_timeout = Float(
+        10.0,
+        config=True,
+        help=(
+            "Seconds the binary may leave a request unanswered before it is "
+            "considered wedged and restarted."
+        ),
+    )
+    hot_standby = Bool(
+        False,
+        config=True,
+        help=(
+            "Keep a warmed-up spare binary per pool member to switch to when "
+            "the running one crashes, at the cost of twice the processes and memory."
+        ),
+    )
+    health_check_interval = Float(
+        30.0,
+        config=True,
+        help=(
+            "Seconds between health probes of an idle binary. A binary not "
+            "answering within the stall timeout is restarted. 0 disables probes."
+        ),
+    )
+    binary_path = Unicode(
+        "",
+        config=True,
+        help=(
+            "Run this executable instead of the downloaded NeoAi binary, e.g. "
+            "tools/mock_neoai.py for load tests. Disables downloads and updates."
+        ),
+    )
+    fast_json = Bool(
+        True,
+        config=True,
+        help=(
+            "Encode and decode the binary's messages with orjson when it is "
+            "installed, instead of the standard library json module."
+        ),
+    )
+    response_passthrough = Bool(
+        True,
+        config=True,
+        help=(
+            "Write the binary's responses to clients as they come instead of "
+            "parsing and serializing them again. They are still parsed when "
+            "the completion cache has to narrow them."
+        ),
+    )
+    binary_store_dir = Unicode(
+        config=True,
+        help=(
+            "Directory of the content-addressed NeoAi binary store. Point "
+            "every install on a host at the same directory to download and "
+            "keep each binary only once."
+        ),
+    )
+    update_check_interval = Float(
+        24 * 3600.0,
+        config=True,
+        help=(
+            "Seconds between checks for a new NeoAi version. New versions are "
+            "downloaded in the background and used from the next restart."
+        ),
+    )
+    binary_versions_to_keep = Int(
+        2,
+        config=True,
+        help="Number of installed NeoAi versions kept on disk, the active one included.",
+    )
+    cache_max_entries = Int(
+        1024,
+        config=True,
+        help="Maximum number of cached completion responses, 0 disables the cache.",
+    )
+    cache_max_bytes = Int(
+        8 * 1024 * 1024,
+        config=True,
+        help="Approximate upper bound on the memory used by cached responses.",
+    )
+    cache_ttl = Float(
+        30.0,
+        config=True,
+        help="Seconds a cached completion response stays valid.",
+    )
+
+    context_max_documents = Int(
+        64,
+        config=True,
+        help=(
+            "Maximum number of open notebooks whose cells are indexed on the "
+            "server, so that clients only send what changed per keystroke."
+        ),
+    )
+
+    @default("binary_store_dir")
+    def _default_binary_store_dir(self):
+        return default_store_dir()
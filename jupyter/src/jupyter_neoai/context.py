@@ -0,0 +1,258 @@
+import bisect
+import collections
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Characters outside the Basic Multilingual Plane take two UTF-16 code units
+# in the browser but one character in Python.
+_ASTRAL = re.compile("[\U00010000-\U0010FFFF]")
+
+# Lines of context sent to the binary when the client does not say.
+_DEFAULT_LINES = 50
+
+# Answer telling the client to send the full text of every cell again.
+RESYNC = {"resync": True}
+
+
+class NotebookContexts:
+    """
+    Assembles the ``before``/``after`` of Autocomplete requests from an
+    index of the notebook kept on the server, so that the client sends
+    only what changed since its previous request.
+
+    A request with a ``context`` member is expanded before being passed
+    to ``neoai``, anything else is passed through unchanged::
+
+        {
+            "request": {"Autocomplete": {"filename": ..., "max_num_results": ...}},
+            "context": {
+                "document": "<notebook page id>",
+                "base": 6,                             # version the edits apply to
+                "version": 7,                          # version after the edits
+                "order": ["<cell id>", ...],           # when cells were added, removed or moved
+                "edits": [
+                    {"cell": "<id>", "text": "..."},   # full text of a cell
+                    {"cell": "<id>", "offset": 12, "delete": 0, "insert": "x"},
+                ],
+                "cell": "<id>",                        # the cell with the cursor
+                "cursor": 13,                          # UTF-16 offset in that cell
+                "before_lines": 50,
+                "after_lines": 50,
+            },
+        }
+
+    A request without ``base`` starts the document over, so it must carry
+    the order and the full text of every cell. When the index cannot apply
+    the request, e.g. after a server restart or because an earlier request
+    was lost or overtaken, the answer is ``RESYNC`` and the client starts
+    over with full texts.
+    At most ``max_documents`` notebooks are indexed, least recently used
+    ones are dropped.
+    """
+
+    def __init__(self, neoai, max_documents=64):
+        self._neoai = neoai
+        self._max_documents = max_documents
+        self._documents = collections.OrderedDict()
+        self.resyncs = 0
+
+    async def request(self, request, session=None, deadline=None):
+        context = request.get("context")
+        if not isinstance(context, dict):
+            return await self._neoai.request(request, session=session, deadline=deadline)
+
+        expanded = self._expand(request, context)
+        if expanded is None:
+            self.resyncs += 1
+            return RESYNC
+        return await self._neoai.request(expanded, session=session, deadline=deadline)
+
+    def _expand(self, request, context):
+        body = request.get("request")
+        autocomplete = body.get("Autocomplete") if isinstance(body, dict) else None
+        document = self._document(context.get("document"), fresh="base" not in context)
+        if document is None or not isinstance(autocomplete, dict):
+            return None
+        if document.version != context.get("base"):
+            logger.debug(f"Notebook context at version {document.version}, not {context.get('base')}")
+            return None
+        try:
+            if "order" in context:
+                document.reorder(context["order"])
+            for edit in context.get("edits") or ():
+                document.apply(edit)
+            region = document.region(
+                context["cell"],
+                context["cursor"],
+                _limit(context.get("before_lines")),
+                _limit(context.get("after_lines")),
+            )
+            document.version = context["version"]
+        except (KeyError, TypeError, ValueError, IndexError) as e:
+            logger.debug(f"Notebook context out of sync: {e!r}")
+            self._documents.pop(context.get("document"), None)
+            return None
+
+        before, after, includes_beginning, includes_end = region
+        expanded = {key: value for key, value in request.items() if key != "context"}
+        expanded["request"] = {
+            "Autocomplete": dict(
+                autocomplete,
+                before=before,
+                after=after,
+                region_includes_beginning=includes_beginning,
+                region_includes_end=includes_end,
+            )
+        }
+        return expanded
+
+    def _document(self, key, fresh):
+        if not isinstance(key, str):
+            return None
+        document = self._documents.get(key)
+        if document is None or fresh:
+            document = self._documents[key] = _Notebook()
+            self._documents.move_to_end(key)
+            while len(self._documents) > self._max_documents:
+                self._documents.popitem(last=False)
+        else:
+            self._documents.move_to_end(key)
+        return document
+
+
+class _Notebook:
+    """
+    The cells of one notebook, in order, as far as the client told us.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.order = []
+        self.cells = {}
+
+    def reorder(self, order):
+        if not all(isinstance(cell, str) for cell in order):
+            raise TypeError("cell ids must be strings")
+        self.order = list(order)
+        self.cells = {cell: self.cells[cell] for cell in self.order if cell in self.cells}
+
+    def apply(self, edit):
+        cell_id = edit["cell"]
+        if "text" in edit:
+            self.cells[cell_id] = _Cell(str(edit["text"]))
+            return
+        cell = self.cells[cell_id]
+        start = cell.index(edit["offset"])
+        end = cell.index(edit["offset"] + edit["delete"])
+        cell.replace(start, end, str(edit.get("insert", "")))
+
+    def region(self, cell_id, cursor, before_limit, after_limit):
+        """
+        Returns the code lines before and after ``cursor`` of ``cell_id``
+        across cells, as ``(before, after, includes_beginning, includes_end)``.
+        Lines starting with ``!`` (shell escapes) and empty lines are skipped.
+        """
+        position = self.order.index(cell_id)
+        cell = self.cells[cell_id]
+        lines = cell.lines()
+        row, column = cell.rowcol(cell.index(cursor))
+
+        before = []
+        after = []
+        current = lines[row]
+        if _is_code(current):
+            before.append(current[:column])
+            after.append(current[column:])
+
+        includes_beginning = _collect(before, before_limit, _lines_backward(lines, row))
+        if includes_beginning:
+            for other in reversed(self.order[:position]):
+                if not _collect(before, before_limit, reversed(self.cells[other].lines())):
+                    includes_beginning = False
+                    break
+
+        includes_end = _collect(after, after_limit, lines[row + 1 :])
+        if includes_end:
+            for other in self.order[position + 1 :]:
+                if not _collect(after, after_limit, self.cells[other].lines()):
+                    includes_end = False
+                    break
+
+        before.reverse()
+        return "\n".join(before), "\n".join(after), includes_beginning, includes_end
+
+
+class _Cell:
+    __slots__ = ("text", "_lines", "_starts", "_astral")
+
+    def __init__(self, text):
+        self.text = text
+        self._lines = None
+        self._starts = None
+        self._astral = None
+
+    def replace(self, start, end, insert):
+        if not 0 <= start <= end <= len(self.text):
+            raise ValueError("edit out of range")
+        self.__init__(self.text[:start] + insert + self.text[end:])
+
+    def lines(self):
+        if self._lines is None:
+            self._lines = self.text.split("\n")
+        return self._lines
+
+    def rowcol(self, index):
+        if self._starts is None:
+            starts = [0]
+            for line in self.lines()[:-1]:
+                starts.append(starts[-1] + len(line) + 1)
+            self._starts = starts
+        row = bisect.bisect_right(self._starts, index) - 1
+        return row, index - self._starts[row]
+
+    def index(self, offset):
+        """
+        Converts a UTF-16 offset from the browser to an index into ``text``.
+        """
+        if offset < 0:
+            raise ValueError("negative offset")
+        if self._astral is None:
+            self._astral = [m.start() for m in _ASTRAL.finditer(self.text)]
+        index = offset
+        for astral in self._astral:
+            if astral >= index:
+                break
+            index -= 1
+        if index > len(self.text):
+            raise ValueError("offset out of range")
+        return index
+
+
+def _lines_backward(lines, row):
+    return (lines[i] for i in range(row - 1, -1, -1))
+
+
+def _collect(collected, limit, lines):
+    """
+    Appends the code ``lines`` to ``collected`` up to ``limit`` entries and
+    returns whether all of them fit.
+    """
+    for line in lines:
+        if not _is_code(line):
+            continue
+        if len(collected) >= limit:
+            return False
+        collected.append(line)
+    return True
+
+
+def _is_code(line):
+    # Comment lines are kept, since completions are wanted there too.
+    return len(line) > 0 and line[0] != "!"
+
+
+def _limit(value):
+    return value if isinstance(value, int) and value > 0 else _DEFAULT_LINES
+
@@ -0,0 +1,98 @@
+import hashlib
+import logging
+import os
+import shutil
+import zipfile
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+class SecurityException(Exception):
+    """Custom exception for security-related errors."""
+    pass
+
+
+def fetch_checksum(url):
+    """
+    Returns the SHA-256 published next to ``url``, or ``None`` if there is none.
+    """
+    try:
+        with urlopen(url + ".sha256") as response:
+            return response.read().decode("UTF-8").split()[0].strip().lower()
+    except (HTTPError, IndexError) as e:
+        logger.warning(f"Could not download checksum file ({e}), proceeding without verification.")
+        return None
+
+
+def download(url, path, expected_checksum=None, chunk_size=_CHUNK_SIZE):
+    """
+    Streams ``url`` into ``path``, hashing the bytes as they arrive.
+
+    If ``path`` already holds the beginning of the file from an interrupted
+    download, only the rest is requested with an HTTP Range request. When
+    ``expected_checksum`` is given and does not match, ``path`` is removed
+    and a ``SecurityException`` raised.
+    """
+    sha256 = hashlib.sha256()
+    offset = 0
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                sha256.update(chunk)
+                offset += len(chunk)
+
+    request = Request(url)
+    if offset:
+        logger.info(f"Resuming download of {url} at byte {offset}")
+        request.add_header("Range", f"bytes={offset}-")
+    try:
+        with urlopen(request) as response:
+            if offset and response.status != 206:
+                # The server ignored the range, so start over.
+                sha256 = hashlib.sha256()
+                mode = "wb"
+            else:
+                mode = "ab"
+            with open(path, mode) as f:
+                for chunk in iter(lambda: response.read(chunk_size), b""):
+                    sha256.update(chunk)
+                    f.write(chunk)
+    except HTTPError as e:
+        # 416 means the partial file is already complete.
+        if not (offset and e.code == 416):
+            raise
+
+    actual_checksum = sha256.hexdigest()
+    if expected_checksum and actual_checksum != expected_checksum.lower():
+        os.remove(path)
+        raise SecurityException(
+            f"Checksum mismatch for {url}. "
+            f"Expected {expected_checksum}, got {actual_checksum}."
+        )
+    return actual_checksum
+
+
+def extract_member(zip_path, name, output_dir):
+    """
+    Extracts the member of ``zip_path`` whose base name is ``name`` into
+    ``output_dir`` and returns its path. The file appears atomically, so a
+    concurrent reader never sees it half written.
+    """
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        members = [
+            m for m in zf.infolist()
+            if not m.is_dir() and os.path.basename(m.filename) == name
+        ]
+        if not members:
+            raise zipfile.BadZipFile(f"{zip_path} has no member named {name}")
+
+        target = os.path.join(output_dir, name)
+        partial = target + ".extracting"
+        with zf.open(members[0]) as source, open(partial, "wb") as destination:
+            shutil.copyfileobj(source, destination, _CHUNK_SIZE)
+    os.replace(partial, target)
+    return target
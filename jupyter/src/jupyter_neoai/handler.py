@@ -1,6 +1,24 @@
+import asyncio
+import gzip
+import json
+import zlib
 from tornado import web
+from tornado.websocket import WebSocketHandler
 from urllib.parse import unquote
 from notebook.base.handlers import IPythonHandler
+from notebook.base.zmqhandlers import WebSocketMixin
+from .metrics import CONTENT_TYPE, render
+from .pool import READY
+from .serializer import response_bytes
+
+# Responses smaller than this do not shrink enough to be worth compressing.
+_GZIP_MIN_LENGTH = 1024
+# Upper bound on a decompressed request body.
+_MAX_BODY_LENGTH = 32 * 1024 * 1024
+# Upper bound on the number of requests in one batch.
+_MAX_BATCH_SIZE = 64
+# Seconds a whole batch may take to be answered.
+_BATCH_TIMEOUT = 5.0
 
 
 class NeoaiHandler(IPythonHandler):
@@ -9,8 +27,245 @@ class NeoaiHandler(IPythonHandler):
 
     @web.authenticated
     async def get(self):
-        url_params = self.request.uri
-        request_data = unquote(url_params[url_params.index("=") + 1 :])
-        response = self.neoai.request(request_data)
-        if response:
-            self.write(response)
+        """
+        Answers ``?data=<request>&session=<session>``. A request sent as
+        the only URL parameter, whatever its name, is accepted as well.
+        """
+        request_data = self.get_query_argument("data", None)
+        if request_data is None:
+            if self.get_query_argument("session", None) is not None:
+                raise web.HTTPError(400, "Missing 'data' parameter")
+            query = self.request.query
+            request_data = unquote(query[query.find("=") + 1 :])
+        request = _parse_request(request_data, "Request data")
+        session = self.get_query_argument("session", None)
+        response = await self.neoai.request(request, session=session)
+        self.write_json(response)
+
+    @web.authenticated
+    async def post(self):
+        """
+        Same as ``get``, with the request as a JSON body (optionally
+        gzip-encoded) instead of a URL parameter. The response is gzipped
+        when the client accepts it.
+        """
+        request = _parse_request(self._decoded_body(), "Request body")
+        session = self.get_query_argument("session", None)
+        response = await self.neoai.request(request, session=session)
+        self.write_json(response)
+
+    def _decoded_body(self):
+        body = self.request.body
+        encoding = self.request.headers.get("Content-Encoding", "").strip().lower()
+        if encoding in ("", "identity"):
+            return body
+        if encoding != "gzip":
+            raise web.HTTPError(415, f"Unsupported Content-Encoding: {encoding}")
+
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            body = decompressor.decompress(body, _MAX_BODY_LENGTH)
+        except zlib.error:
+            raise web.HTTPError(400, "Request body is not valid gzip")
+        if decompressor.unconsumed_tail:
+            raise web.HTTPError(413, "Decompressed request body is too large")
+        return body
+
+    def write_json(self, response):
+        """
+        Writes ``response`` as JSON. The line of a ``RawResponse`` is
+        written as the binary sent it, without parsing it again. No
+        response, e.g. while the binaries boot, is written as ``{}``.
+        """
+        self.write_body(response_bytes(response) if response is not None else b"{}")
+
+    def write_body(self, body):
+        self.set_header("Content-Type", "application/json; charset=UTF-8")
+        self.add_header("Vary", "Accept-Encoding")
+        accept_encoding = self.request.headers.get("Accept-Encoding", "")
+        if len(body) >= _GZIP_MIN_LENGTH and "gzip" in accept_encoding:
+            body = gzip.compress(body, compresslevel=6)
+            self.set_header("Content-Encoding", "gzip")
+        self.write(body)
+
+
+class NeoaiBatchHandler(NeoaiHandler):
+    """
+    Answers several requests in one round trip. The body is
+    ``{"requests": [<request>, ...]}`` and the response
+    ``{"results": [<response or null>, ...]}`` in the same order.
+
+    The requests queue up behind each other however busy the binaries are,
+    and get ``timeout`` seconds as a whole instead of the request timeout
+    each. What is not answered by then comes back as ``null``.
+    """
+
+    def initialize(self, neoai, timeout=_BATCH_TIMEOUT):
+        super().initialize(neoai)
+        self.timeout = timeout
+
+    async def get(self):
+        raise web.HTTPError(405)
+
+    @web.authenticated
+    async def post(self):
+        try:
+            requests = json.loads(self._decoded_body())["requests"]
+        except (ValueError, KeyError, TypeError):
+            raise web.HTTPError(400, "Request body must be a JSON object with a 'requests' list")
+        if not isinstance(requests, list) or not all(isinstance(r, dict) for r in requests):
+            raise web.HTTPError(400, "'requests' must be a list of request objects")
+        if len(requests) > _MAX_BATCH_SIZE:
+            raise web.HTTPError(413, f"At most {_MAX_BATCH_SIZE} requests per batch")
+        for i, request in enumerate(requests):
+            error = _request_error(request)
+            if error:
+                raise web.HTTPError(400, f"Request {i} {error}")
+
+        deadline = asyncio.get_event_loop().time() + self.timeout
+        results = await asyncio.gather(
+            *(self.neoai.request(request, deadline=deadline) for request in requests)
+        )
+        self.write_body(
+            b"".join((b'{"results":[', b",".join(map(response_bytes, results)), b"]}"))
+        )
+
+
+class NeoaiWebSocketHandler(WebSocketMixin, WebSocketHandler, IPythonHandler):
+    """
+    A persistent channel for completion requests.
+
+    Clients send ``{"id": <id>, "session": <session>, "request": <request>}``
+    and get ``{"id": <id>, "response": <response or null>}`` back as soon as
+    the binary answers, or fails to. ``{"id": <id>, "cancel": true}`` drops a request the
+    client no longer needs.
+    """
+
+    def initialize(self, neoai):
+        self.neoai = neoai
+        self._tasks = {}
+
+    def get(self, *args, **kwargs):
+        # Websocket upgrades cannot redirect to the login page like
+        # @web.authenticated does, so refuse them outright.
+        if not self.get_current_user():
+            raise web.HTTPError(403)
+        return super().get(*args, **kwargs)
+
+    def on_message(self, message):
+        try:
+            message = json.loads(message)
+            request_id = message["id"]
+        except (ValueError, KeyError, TypeError):
+            self.log.warning("Ignoring malformed Neoai websocket message")
+            return
+
+        if message.get("cancel"):
+            task = self._tasks.pop(request_id, None)
+            if task is not None:
+                # Let the task take its first step before cancelling it, so
+                # that the edits the request carries still reach the
+                # notebook index even if it is cancelled right away.
+                asyncio.get_event_loop().call_soon(task.cancel)
+            return
+
+        request = message.get("request")
+        if not isinstance(request, dict):
+            self.log.warning("Ignoring Neoai websocket message without a request")
+            return
+        self._tasks[request_id] = asyncio.ensure_future(
+            self._answer(request_id, request, message.get("session"))
+        )
+
+    async def _answer(self, request_id, request, session):
+        try:
+            response = await self.neoai.request(request, session=session)
+        except asyncio.CancelledError:
+            return
+        except Exception:
+            self.log.exception("Neoai websocket request failed")
+            response = None
+        self._tasks.pop(request_id, None)
+        if self.ws_connection is not None:
+            self.write_message(
+                b"".join(
+                    (
+                        b'{"id":',
+                        json.dumps(request_id).encode("utf8"),
+                        b',"response":',
+                        response_bytes(response),
+                        b"}",
+                    )
+                )
+            )
+
+    def on_close(self):
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+
+
+class NeoaiStatusHandler(IPythonHandler):
+    """
+    Readiness of the NeoAi binaries: 200 once they serve completions,
+    503 while booting or after boot failed, with the state as JSON.
+    """
+
+    def initialize(self, pool):
+        self.pool = pool
+
+    @web.authenticated
+    def get(self):
+        status = self.pool.status()
+        if status["state"] != READY:
+            self.set_status(503)
+        self.finish(status)
+
+
+class NeoaiMetricsHandler(IPythonHandler):
+    """
+    Prometheus text exposition of request latencies, IPC traffic, queue
+    depths, binary restarts and memory, cache hit ratios and errors.
+    """
+
+    def initialize(self, metrics, pool, singleflight, cache):
+        self.metrics = metrics
+        self.pool = pool
+        self.singleflight = singleflight
+        self.cache = cache
+
+    @web.authenticated
+    def get(self):
+        self.set_header("Content-Type", CONTENT_TYPE)
+        self.finish(render(self.metrics, self.pool, self.singleflight, self.cache))
+
+
+def _parse_request(data, source):
+    try:
+        request = json.loads(data)
+    except ValueError:
+        raise web.HTTPError(400, f"{source} is not valid JSON")
+    if not isinstance(request, dict):
+        raise web.HTTPError(400, f"{source} must be a JSON object")
+    error = _request_error(request)
+    if error:
+        raise web.HTTPError(400, f"{source} {error}")
+    return request
+
+
+def _request_error(request):
+    """
+    Returns why ``request`` cannot be answered, or ``None`` if it can.
+    """
+    body = request.get("request")
+    if not isinstance(body, dict):
+        return "must have a 'request' object"
+    autocomplete = body.get("Autocomplete")
+    if autocomplete is None:
+        return None
+    if not isinstance(autocomplete, dict):
+        return "must have an 'Autocomplete' object"
+    for side in ("before", "after"):
+        if not isinstance(autocomplete.get(side, ""), str):
+            return f"must have a string '{side}'"
+    return None
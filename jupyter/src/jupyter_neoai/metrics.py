@@ -0,0 +1,193 @@
+import bisect
+import collections
+import os
+
+# Upper bounds in seconds of the request latency buckets.
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Request types get their own latency histogram, anything else is "other" so
+# clients cannot grow the number of series.
+_REQUEST_TYPES = ("Autocomplete", "Prefetch", "SetState")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    def __init__(self, buckets=_LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Metrics:
+    """
+    Counters of the traffic between the extension and the NeoAi binaries.
+
+    Everything is updated from the event loop thread only, so plain
+    integers suffice and recording a sample costs a dict lookup and an
+    addition.
+    """
+
+    def __init__(self):
+        self.latency = {}
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.errors = collections.Counter()
+
+    def observe_request(self, request, seconds):
+        kind = request_type(request)
+        histogram = self.latency.get(kind)
+        if histogram is None:
+            histogram = self.latency[kind] = Histogram()
+        histogram.observe(seconds)
+
+    def error(self, kind):
+        self.errors[kind] += 1
+
+
+def request_type(request):
+    body = request.get("request")
+    for kind in body if isinstance(body, dict) else ():
+        return kind if kind in _REQUEST_TYPES else "other"
+    return "other"
+
+
+def render(metrics, pool, singleflight, cache):
+    """
+    Returns the Prometheus text exposition of ``metrics`` and of the state
+    of the pool, the request coalescing and the completion cache.
+    """
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            lines.append(f"{name}{suffix}{_labels(labels)} {_number(value)}")
+
+    histograms = []
+    for kind, histogram in sorted(metrics.latency.items()):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+            cumulative += count
+            histograms.append(("_bucket", {"type": kind, "le": bound}, cumulative))
+        histograms.append(("_sum", {"type": kind}, histogram.sum))
+        histograms.append(("_count", {"type": kind}, cumulative))
+    family(
+        "neoai_request_duration_seconds",
+        "histogram",
+        "Time until the binary answered a request.",
+        histograms,
+    )
+    family(
+        "neoai_errors_total",
+        "counter",
+        "Requests that got no answer, and binary failures, by kind.",
+        [("", {"kind": kind}, count) for kind, count in sorted(metrics.errors.items())],
+    )
+    family(
+        "neoai_ipc_bytes_written_total",
+        "counter",
+        "Bytes of requests written to the binaries.",
+        [("", {}, metrics.bytes_written)],
+    )
+    family(
+        "neoai_ipc_bytes_read_total",
+        "counter",
+        "Bytes of responses read from the binaries.",
+        [("", {}, metrics.bytes_read)],
+    )
+
+    workers = pool.workers()
+    family(
+        "neoai_pool_ready",
+        "gauge",
+        "Whether the pool serves completions.",
+        [("", {}, int(pool.state == "ready"))],
+    )
+    family(
+        "neoai_queue_depth",
+        "gauge",
+        "Requests queued for or written to a binary and not answered yet.",
+        [("", {"worker": i}, worker.queue_depth) for i, worker in enumerate(workers)],
+    )
+    stats = [worker.stats() for worker in workers]
+    for name, key, help_text in (
+        ("neoai_binary_starts_total", "starts", "Binary processes started or switched to."),
+        ("neoai_binary_crashes_total", "crashes", "Binary processes that died or stopped answering."),
+        ("neoai_binary_failovers_total", "failovers", "Crashes handled by switching to the standby."),
+    ):
+        family(name, "counter", help_text, [("", {"worker": i}, s[key]) for i, s in enumerate(stats)])
+    family(
+        "neoai_binary_rss_bytes",
+        "gauge",
+        "Resident memory of the running binary.",
+        [
+            ("", {"worker": i}, rss)
+            for i, rss in enumerate(process_rss(worker.pid) for worker in workers)
+            if rss is not None
+        ],
+    )
+
+    family(
+        "neoai_coalescing_requests_total",
+        "counter",
+        "Autocomplete requests sent to a binary, or answered by an identical one in flight.",
+        [
+            ("", {"result": "sent"}, singleflight.requests - singleflight.coalesced),
+            ("", {"result": "coalesced"}, singleflight.coalesced),
+        ],
+    )
+    family(
+        "neoai_cache_requests_total",
+        "counter",
+        "Autocomplete requests looked up in the completion cache, by result.",
+        [
+            ("", {"result": "hit"}, cache.hits),
+            ("", {"result": "prefix_hit"}, cache.prefix_hits),
+            ("", {"result": "miss"}, cache.misses),
+        ],
+    )
+    lookups = cache.hits + cache.prefix_hits + cache.misses
+    family(
+        "neoai_cache_hit_ratio",
+        "gauge",
+        "Share of completion cache lookups served from the cache.",
+        [("", {}, (cache.hits + cache.prefix_hits) / lookups if lookups else 0)],
+    )
+    return "\n".join(lines) + "\n"
+
+
+def process_rss(pid):
+    """
+    Returns the resident set size of process ``pid`` in bytes, or ``None``
+    where ``/proc`` is not available.
+    """
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_label_value(v)}"' for k, v in labels.items()) + "}"
+
+
+def _label_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
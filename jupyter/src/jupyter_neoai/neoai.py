@@ -1,17 +1,19 @@
-import json
+import asyncio
+import collections
 import logging
 import os
 import platform
 import subprocess
-import stat
-import threading
 import zipfile
 import notebook
-import tempfile
-import hashlib
-from urllib.request import urlopen, urlretrieve
 from urllib.error import HTTPError
 from ._version import __version__
+from .download import SecurityException, fetch_checksum
+from .metrics import Metrics
+from .serializer import Serializer
+from .store import BinaryStore, default_store_dir
+from .supervisor import Supervisor, terminate
+from .versions import BinaryVersions
 
 if platform.system() == "Windows":
     try:
@@ -28,172 +30,462 @@ logger = logging.getLogger(__name__)
 
 _NEOAI_SERVER_URL = "https://update.neoai.com/bundles"
 _NEOAI_EXECUTABLE = "NeoAi"
+# asyncio's default 64 KiB line limit is too small for large completion lists.
+_STREAM_LIMIT = 16 * 1024 * 1024
+# The binary handles one request at a time; writing a couple ahead keeps it
+# busy while leaving the rest queued where stale ones can still be dropped.
+_MAX_WRITE_AHEAD = 2
+# A cheap request every binary answers, used to check that it is responsive.
+_PROBE_REQUEST = {"version": "1.0.7", "request": {"Features": {}}}
 
 
 class Neoai:
     """
     A class to manage the NeoAi binary, including downloading, running,
     and communicating with it.
+
+    Communication is asynchronous: up to ``_MAX_WRITE_AHEAD`` requests are
+    written to the binary's stdin at once and a single reader task resolves
+    their futures in order, since the binary answers strictly one line per
+    request. Requests beyond that wait in a queue where a newer request of
+    the same session replaces an older one before it is ever written.
+
+    Processes come from a ``Supervisor``, which keeps a warm standby to
+    fail over to and backs off when the binary keeps crashing. An idle
+    binary is probed every ``health_check_interval`` seconds and restarted
+    if it does not answer.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        request_timeout=1.0,
+        stall_timeout=10.0,
+        binary_store_dir=None,
+        update_check_interval=24 * 3600,
+        versions_to_keep=2,
+        hot_standby=False,
+        health_check_interval=30.0,
+        metrics=None,
+        binary_path=None,
+        serializer=None,
+    ):
         self.name = "neoai"
+        self._binary_path = binary_path
+        self._metrics = metrics or Metrics()
+        self._serializer = serializer or Serializer()
         self._proc = None
+        self._reader = None
+        self._warm_up = None
+        self._started_at = None
+        self._prober = None
+        self._closed = False
+        self._health_check_interval = health_check_interval
+        self._pending = collections.deque()
+        self._queued = collections.OrderedDict()
+        self._request_timeout = request_timeout
+        self._stall_timeout = stall_timeout
+        self._loop = asyncio.get_event_loop()
+        self._start_lock = asyncio.Lock()
+        self._supervisor = Supervisor(self._launch, hot_standby=hot_standby)
         self._install_dir = os.path.dirname(os.path.realpath(__file__))
         self._binary_dir = os.path.join(self._install_dir, "binaries")
+        self._store = BinaryStore(binary_store_dir or default_store_dir())
+        self._distro = get_distribution_name()
+        self._versions = BinaryVersions(
+            self._binary_dir,
+            os.path.join(self._distro, executable_name(_NEOAI_EXECUTABLE)),
+            f"{_NEOAI_SERVER_URL}/version",
+            self._install_version,
+            check_ttl=update_check_interval,
+            keep=versions_to_keep,
+            store=self._store,
+        )
         logger.info(f"Neoai install dir: {self._install_dir}")
-        self.download_if_needed()
 
-    def request(self, data):
+    def stats(self):
         """
-        Sends a request to the NeoAi binary and returns the response.
+        Process restarts and failovers of this binary.
         """
-        proc = self._get_running_neoai()
-        if proc is None:
-            return None
+        return dict(self._supervisor.stats(), running=self._is_running())
+
+    @property
+    def pid(self):
+        """
+        Process id of the running binary, or ``None``.
+        """
+        return self._proc.pid if self._is_running() else None
+
+    @property
+    def queue_depth(self):
+        """
+        Number of requests queued for or written to the binary and not answered yet.
+        """
+        return len(self._pending) + len(self._queued)
+
+    def start(self):
+        """
+        Spawns the binary in the background so the first request finds it warm.
+        """
+        self._loop.create_task(self._get_running_neoai())
+
+    async def spawn(self):
+        """
+        Starts the binary if it is not running and reports whether it is.
+        """
+        return await self._get_running_neoai() is not None
+
+    def close(self):
+        """
+        Stops the binary and its standby for good. Requests waiting for
+        them are answered with ``None``, and so is every later one.
+        """
+        self._closed = True
+        proc, self._proc = self._proc, None
+        if proc is not None:
+            terminate(proc)
+        self._supervisor.close()
+        if self._loop.is_closed():
+            # At exit, after the server closed its loop, nothing waits anymore.
+            return
+        if self._prober is not None:
+            self._prober.cancel()
+            self._prober = None
+        self._fail_pending()
+        self._fail_queued()
 
+    async def wait_until_warm(self, timeout):
+        """
+        Waits for the answer to the warm-up request of the running binary.
+        Returns ``False`` if it did not come within ``timeout`` seconds.
+        """
+        if self._warm_up is None:
+            return False
         try:
-            proc.stdin.write((data + "\n").encode("utf8"))
-            proc.stdin.flush()
-        except BrokenPipeError:
-            logger.warning("Broken pipe, restarting Neoai process.")
-            self._restart()
+            await asyncio.wait_for(asyncio.shield(self._warm_up), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def request(self, request, session=None, deadline=None):
+        """
+        Sends a request dict to the NeoAi binary and returns the response,
+        a ``RawResponse`` when the serializer passes responses through.
+
+        Returns ``None`` when the binary does not answer within the request
+        timeout, or by ``deadline`` in loop time if one is given, or when a
+        newer request of the same ``session`` replaces this one while it is
+        still queued.
+        """
+        started_at = self._loop.time()
+        if await self._get_running_neoai() is None:
+            self._metrics.error("unavailable")
             return None
 
-        output = proc.stdout.readline().decode("utf8")
+        key = session if session is not None else object()
+        superseded = self._queued.pop(key, None)
+        if superseded is not None and not superseded[1].done():
+            superseded[1].set_result(None)
+
+        future = self._loop.create_future()
+        self._queued[key] = (request, future)
+        self._pump()
+
+        if deadline is None:
+            timeout = self._request_timeout
+        else:
+            timeout = max(0.0, deadline - self._loop.time())
         try:
-            return json.loads(output)
-        except json.JSONDecodeError:
-            logger.debug(f"Neoai output is corrupted: {output}")
+            response = await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            self._abandon(key, future)
+            self._metrics.error("timeout")
             return None
+        except asyncio.CancelledError:
+            self._abandon(key, future)
+            raise
+        if response is not None:
+            self._metrics.observe_request(request, self._loop.time() - started_at)
+        return response
+
+    def _pump(self):
+        """
+        Moves queued requests to the pipe while the write-ahead window allows.
+        """
+        proc = self._proc
+        if proc is None or proc.returncode is not None:
+            return
+        while self._queued and len(self._pending) < _MAX_WRITE_AHEAD:
+            _, (request, future) = self._queued.popitem(last=False)
+            if future.done():
+                continue
+            try:
+                self._submit(proc, request, future)
+            except (BrokenPipeError, ConnectionResetError):
+                # The reader notices the closed pipe and restarts the binary.
+                self._metrics.error("broken_pipe")
+                future.set_result(None)
+                return
+
+    def _submit(self, proc, request, future=None):
+        """
+        Writes ``request`` to ``proc`` and returns the future of its response.
+
+        Writing and enqueueing the future happen without yielding to the
+        loop, so the order of ``_pending`` always matches the pipe.
+        """
+        future = future or self._loop.create_future()
+        data = self._serializer.encode(request)
+        proc.stdin.write(data)
+        self._metrics.bytes_written += len(data)
+        self._pending.append((future, self._loop.time()))
+        return future
+
+    def _abandon(self, key, future):
+        """
+        Gives up on a request its caller no longer waits for. Returns
+        whether that restarts a binary that stopped answering.
+        """
+        if self._queued.get(key, (None, None))[1] is future:
+            del self._queued[key]
+            return False
+
+        # Already written: its response line will still arrive and must be
+        # consumed to keep the pipe in sync, which a cancelled future does.
+        future.cancel()
+        if self._pending and self._loop.time() - self._pending[0][1] > self._stall_timeout:
+            logger.warning("Neoai stopped answering, restarting it to resynchronize the pipe.")
+            self._crashed()
+            self._loop.create_task(self._respawn())
+            return True
+        return False
+
+    async def _read_responses(self, proc, warm_up):
+        """
+        Reads response lines from ``proc`` and resolves pending requests in order.
+        The first line answers the warm-up request and is read by ``warm_up``.
+        """
+        if warm_up is not None:
+            await asyncio.wait({warm_up})
+        while True:
+            try:
+                line = await proc.stdout.readline()
+            except ValueError:
+                logger.warning("Neoai response exceeded the stream limit, restarting.")
+                self._metrics.error("oversized_response")
+                await self._respawn()
+                return
+            if not line:
+                break
+
+            self._metrics.bytes_read += len(line)
+            if not self._pending:
+                logger.debug(f"Unexpected Neoai output: {line!r}")
+                continue
+            future, _ = self._pending.popleft()
+            if not future.done():
+                try:
+                    future.set_result(self._serializer.decode_response(line))
+                except ValueError:
+                    logger.debug(f"Neoai output is corrupted: {line!r}")
+                    self._metrics.error("invalid_response")
+                    future.set_result(None)
+            self._pump()
+
+        returncode = await proc.wait()
+        if proc is self._proc:
+            logger.error(f"Neoai exited with code {returncode}")
+            self._proc = None
+            self._crashed()
+            self._fail_pending()
+            self.start()
+
+    def _fail_pending(self):
+        """
+        Resolves every request written to the binary with ``None``.
+        """
+        while self._pending:
+            future, _ = self._pending.popleft()
+            if not future.done():
+                future.set_result(None)
+
+    def _fail_queued(self):
+        """
+        Resolves every request still waiting to be written with ``None``.
+        """
+        while self._queued:
+            _, (_, future) = self._queued.popitem(last=False)
+            if not future.done():
+                future.set_result(None)
 
-    def _restart(self):
+    async def _respawn(self):
+        async with self._start_lock:
+            await self._restart()
+
+    async def _restart(self):
         """
-        Restarts the NeoAi binary process.
+        Restarts the NeoAi binary process. Queued requests survive and are
+        written to the new process.
         """
         if self._proc is not None:
-            self._proc.terminate()
+            terminate(self._proc)
             self._proc = None
+        self._fail_pending()
+        if self._closed:
+            self._fail_queued()
+            return
 
-        path = get_neoai_path(self._binary_dir)
+        launched = await self._supervisor.take()
+        if launched is None:
+            retry_in = self._supervisor.retry_in()
+            if retry_in:
+                self._loop.call_later(retry_in, self.start)
+            self._fail_queued()
+            return
+
+        self._proc, self._warm_up = launched
+        self._started_at = self._loop.time()
+        self._reader = self._loop.create_task(self._read_responses(self._proc, self._warm_up))
+        if self._prober is None and self._health_check_interval:
+            self._prober = self._loop.create_task(self._probe_periodically())
+        self._pump()
+
+    async def _launch(self):
+        """
+        Spawns a binary and sends it the warm-up request. Returns the
+        process and the warm-up task, or ``None`` if there is no binary.
+        """
+        path = self._binary_path or self._versions.path()
         if path is None:
             logger.error("No Neoai binary found.")
-            return
+            return None
 
         logger.info(f"Starting Neoai binary at: {path}")
-        self._proc = subprocess.Popen(
-            [
+        args = [
+            "--client",
+            "jupyter",
+            "--log-file-path",
+            os.path.join(self._install_dir, "neoai.log"),
+            "--client-metadata",
+            f"pluginVersion={__version__}",
+            f"clientVersion={notebook.__version__}",
+        ]
+        try:
+            proc = await asyncio.create_subprocess_exec(
                 path,
-                "--client",
-                "jupyter",
-                "--log-file-path",
-                os.path.join(self._install_dir, "neoai.log"),
-                "--client-metadata",
-                f"pluginVersion={__version__}",
-                f"clientVersion={notebook.__version__}",
-            ],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.DEVNULL,
-        )
-
-    def _get_running_neoai(self):
+                *args,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                limit=_STREAM_LIMIT,
+            )
+        except NotImplementedError:
+            # The selector event loop Jupyter uses on Windows cannot spawn
+            # subprocesses, so fall back to a thread-backed pipe.
+            proc = _PopenProcess(path, args, self._loop)
+        return proc, self._sem_complete_on(proc)
+
+    async def _get_running_neoai(self):
         """
         Returns a running instance of the NeoAi process, starting it if necessary.
         """
-        if self._proc is None:
-            self._restart()
+        async with self._start_lock:
+            if self._proc is not None and self._proc.returncode is not None:
+                logger.error(f"Neoai exited with code {self._proc.returncode}")
+                self._proc = None
+                self._crashed()
 
-        if self._proc is not None and self._proc.poll() is not None:
-            logger.error(f"Neoai exited with code {self._proc.returncode}")
-            self._restart()
+            if self._proc is None:
+                await self._restart()
 
         return self._proc
 
+    def _is_running(self):
+        return self._proc is not None and self._proc.returncode is None
+
+    def _crashed(self):
+        self._supervisor.crashed(self._loop.time() - self._started_at)
+
+    async def _probe_periodically(self):
+        """
+        Sends ``_PROBE_REQUEST`` to the binary whenever it has been idle for
+        ``health_check_interval`` seconds and restarts it if no answer comes
+        within the stall timeout, or if it sits on an older request.
+        """
+        while True:
+            await asyncio.sleep(self._health_check_interval)
+            if not self._is_running():
+                continue
+            if self._pending and self._loop.time() - self._pending[0][1] > self._stall_timeout:
+                logger.warning("Neoai stopped answering, restarting it.")
+                self._crashed()
+                await self._respawn()
+                continue
+            if self._pending or self._queued:
+                continue
+            key = object()
+            future = self._loop.create_future()
+            self._queued[key] = (_PROBE_REQUEST, future)
+            self._pump()
+            try:
+                await asyncio.wait_for(asyncio.shield(future), self._stall_timeout)
+            except asyncio.TimeoutError:
+                if not self._abandon(key, future) and self._is_running():
+                    logger.warning("Neoai did not answer the health probe, restarting it.")
+                    self._crashed()
+                    await self._respawn()
+
     def download_if_needed(self):
         """
-        Checks if the NeoAi binary exists and downloads it if not.
+        Checks if the NeoAi binary exists and downloads it if not. Returns
+        the binary's path, or ``None`` if there is none.
+
+        This blocks on the network, so run it in an executor.
         """
-        neoai_path = get_neoai_path(self._binary_dir)
-        if neoai_path and os.path.isfile(neoai_path):
-            add_execute_permission(neoai_path)
+        if self._binary_path:
+            return self._binary_path
+
+        neoai_path = self._versions.path()
+        if neoai_path is not None:
             logger.info(f"Neoai binary already exists in {neoai_path}, skipping download.")
-            self._sem_complete_on()
-            return
+            return neoai_path
 
         logger.info("Neoai binary not found, starting download.")
-        self._download()
+        return self._versions.install_latest()
 
-    def _download(self):
+    def update_if_available(self):
         """
-        Downloads and extracts the NeoAi binary in a separate thread.
+        Downloads and activates a newer NeoAi version, if one was published,
+        while the current binary keeps running. The new version is used from
+        the next restart on. Returns whether a new version was activated.
+
+        This blocks on the network, so run it in an executor.
         """
-        version = get_neoai_version()
-        if not version:
-            logger.error("Could not retrieve latest Neoai version.")
-            return
+        if self._binary_path:
+            return False
+        return self._versions.update()
 
-        distro = get_distribution_name()
-        download_url = f"{_NEOAI_SERVER_URL}/{version}/{distro}/{_NEOAI_EXECUTABLE}.zip"
-        output_dir = os.path.join(self._binary_dir, version, distro)
+    def _install_version(self, version):
+        """
+        Downloads and extracts the given NeoAi version.
+        """
+        download_url = f"{_NEOAI_SERVER_URL}/{version}/{self._distro}/{_NEOAI_EXECUTABLE}.zip"
+        output_dir = os.path.join(self._binary_dir, version, self._distro)
 
-        downloader = threading.Thread(
-            target=self._download_and_extract, args=(download_url, output_dir)
-        )
-        downloader.start()
+        self._download_and_extract(download_url, output_dir)
 
     def _download_and_extract(self, download_url, output_dir):
         """
-        The actual download and extraction logic.
+        Fetches the executable through the shared binary store, which
+        downloads it only if no other install already did, and links it
+        into ``output_dir``.
         """
+        name = executable_name(_NEOAI_EXECUTABLE)
         try:
             logger.info(f"Begin to download Neoai Binary from {download_url}")
-            if not os.path.isdir(output_dir):
-                os.makedirs(output_dir)
-
-            # 1. Download checksum
-            checksum_url = download_url + ".sha256"
-            try:
-                with urlopen(checksum_url) as response:
-                    expected_checksum = response.read().decode("UTF-8").strip()
-            except HTTPError as e:
-                logger.warning(f"Could not download checksum file ({e}), proceeding without verification.")
-                expected_checksum = None
-
-            # 2. Download binary zip
-            with tempfile.NamedTemporaryFile(delete=False) as tmp_zip:
-                urlretrieve(download_url, tmp_zip.name)
-                zip_path = tmp_zip.name
-
-            # 3. Verify checksum
-            if expected_checksum:
-                sha256 = hashlib.sha256()
-                with open(zip_path, "rb") as f:
-                    for chunk in iter(lambda: f.read(4096), b""):
-                        sha256.update(chunk)
-                actual_checksum = sha256.hexdigest()
-
-                if actual_checksum.lower() != expected_checksum.lower():
-                    raise SecurityException(
-                        f"Checksum mismatch for {download_url}. "
-                        f"Expected {expected_checksum}, got {actual_checksum}."
-                    )
-                logger.info("Checksum verified.")
-
-            # 4. Extract
-            with zipfile.ZipFile(zip_path, "r") as zf:
-                for member in zf.infolist():
-                    # Prevent path traversal attacks
-                    target_path = os.path.realpath(os.path.join(output_dir, member.filename))
-                    if os.path.commonprefix([os.path.realpath(output_dir), target_path]) != os.path.realpath(output_dir):
-                        raise SecurityException(f"Attempted path traversal in zip file: {member.filename}")
-
-                    zf.extract(member, output_dir)
-                    target_file = os.path.join(output_dir, member.filename)
-                    add_execute_permission(target_file)
-
+            expected_checksum = fetch_checksum(download_url)
+            stored = self._store.fetch(download_url, name, expected_checksum)
+            self._store.materialize(stored, os.path.join(output_dir, name))
             logger.info(f"Finished downloading Neoai Binary to {output_dir}")
-            self._sem_complete_on()
         except HTTPError as e:
             logger.error(f"Download failed: {e}")
         except (IOError, zipfile.BadZipFile) as e:
@@ -202,14 +494,12 @@ class Neoai:
             logger.error(f"Security error: {e}")
         except Exception as e:
             logger.error(f"An unexpected error occurred during download: {e}")
-        finally:
-            if 'zip_path' in locals() and os.path.exists(zip_path):
-                os.remove(zip_path)
 
-
-    def _sem_complete_on(self):
+    def _sem_complete_on(self, proc):
         """
-        Sends a semantic completion request to Neoai to warm it up.
+        Sends a semantic completion request to a freshly started binary to
+        warm it up. It is the first line written, so it is answered first.
+        Returns the task reading its response.
         """
         sem_on_req_data = {
             "version": "1.0.7",
@@ -224,33 +514,41 @@ class Neoai:
                 }
             },
         }
-        res = self.request(json.dumps(sem_on_req_data))
         try:
-            if res and res.get("results"):
-                logger.info(
-                    f'{res["results"][0]["new_prefix"]}{res["results"][0]["new_suffix"]}'
-                )
-            else:
-                logger.warning("Could not turn on semantic completion, response was empty or invalid.")
-        except (IndexError, KeyError):
-            logger.warning("Wrong response structure when turning on semantic completion.")
-
+            proc.stdin.write(self._serializer.encode(sem_on_req_data))
+        except (BrokenPipeError, ConnectionResetError):
+            logger.warning("Could not turn on semantic completion, broken pipe.")
+            return None
+        task = self._loop.create_task(_read_warm_up(proc, self._serializer))
+        task.add_done_callback(_log_sem_complete_on)
+        return task
 
-# --- Utility Functions ---
 
-def get_neoai_version():
-    """
-    Fetches the latest Neoai version string from the update server.
-    """
-    version_url = f"{_NEOAI_SERVER_URL}/version"
+async def _read_warm_up(proc, serializer):
     try:
-        with urlopen(version_url) as response:
-            return response.read().decode("UTF-8").strip()
-    except HTTPError as e:
-        logger.error(f"Failed to fetch Neoai version: {e}")
+        line = await proc.stdout.readline()
+        return serializer.decode(line) if line else None
+    except ValueError:
         return None
 
 
+def _log_sem_complete_on(future):
+    if future.cancelled():
+        return
+    res = future.result()
+    try:
+        if res and res.get("results"):
+            logger.info(
+                f'{res["results"][0]["new_prefix"]}{res["results"][0]["new_suffix"]}'
+            )
+        else:
+            logger.warning("Could not turn on semantic completion, response was empty or invalid.")
+    except (IndexError, KeyError):
+        logger.warning("Wrong response structure when turning on semantic completion.")
+
+
+# --- Utility Functions ---
+
 def get_distribution_name():
     """
     Determines the distribution name based on the OS and architecture.
@@ -279,62 +577,45 @@ def get_distribution_name():
     return f"{sys_architecture}-{sys_platform}"
 
 
-def get_neoai_path(binary_dir):
+def executable_name(name):
     """
-    Finds the path to the NeoAi executable in the binary directory.
-    It searches for the latest version available.
+    Returns the executable name with a '.exe' suffix on Windows.
     """
-    if not os.path.isdir(binary_dir):
-        return None
-
-    distro = get_distribution_name()
-    try:
-        versions = [d for d in os.listdir(binary_dir) if os.path.isdir(os.path.join(binary_dir, d))]
-    except OSError:
-        return None
-
-    versions.sort(key=parse_semver, reverse=True)
-
-    for version in versions:
-        path = os.path.join(
-            binary_dir, version, distro, executable_name(_NEOAI_EXECUTABLE)
-        )
-        if os.path.isfile(path):
-            return path
-    return None
-
+    if platform.system() == "Windows":
+        return f"{name}.exe"
+    return name
 
-def parse_semver(s):
+class _PopenProcess:
     """
-    Parses a semantic version string into a list of integers for sorting.
+    A minimal stand-in for ``asyncio.subprocess.Process`` backed by
+    ``subprocess.Popen``, with blocking reads moved to the default executor.
     """
-    try:
-        return [int(x) for x in s.split(".")]
-    except (ValueError, AttributeError):
-        return []
 
+    def __init__(self, path, args, loop):
+        self._loop = loop
+        self._popen = subprocess.Popen(
+            [path] + list(args),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self.pid = self._popen.pid
+        self.stdin = self
+        self.stdout = self
 
-def add_execute_permission(path):
-    """
-    Adds execute permission to a file.
-    """
-    try:
-        st = os.stat(path)
-        new_mode = st.st_mode | stat.S_IEXEC
-        if new_mode != st.st_mode:
-            os.chmod(path, new_mode)
-    except OSError as e:
-        logger.warning(f"Could not set execute permission on {path}: {e}")
+    @property
+    def returncode(self):
+        return self._popen.poll()
 
+    def write(self, data):
+        self._popen.stdin.write(data)
+        self._popen.stdin.flush()
 
-def executable_name(name):
-    """
-    Returns the executable name with a '.exe' suffix on Windows.
-    """
-    if platform.system() == "Windows":
-        return f"{name}.exe"
-    return name
+    async def readline(self):
+        return await self._loop.run_in_executor(None, self._popen.stdout.readline)
+
+    async def wait(self):
+        return await self._loop.run_in_executor(None, self._popen.wait)
 
-class SecurityException(Exception):
-    """Custom exception for security-related errors."""
-    pass
+    def terminate(self):
+        self._popen.terminate()
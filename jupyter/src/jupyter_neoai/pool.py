@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import zlib
+from .metrics import Metrics
+from .neoai import Neoai
+
+logger = logging.getLogger(__name__)
+
+# Boot states, in the order they are reached; FAILED can follow any of them.
+DOWNLOADING = "downloading"
+STARTING = "starting"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+# How long boot waits for the warm-up answers before declaring the pool ready.
+_WARM_UP_TIMEOUT = 30.0
+
+
+class NeoaiPool:
+    """
+    A fixed set of NeoAi binaries sharing the completion load.
+
+    Requests are routed by the file they are about, so a notebook keeps
+    talking to the same binary and benefits from its per-file state. When
+    that binary already has ``max_queue_depth`` requests in flight the least
+    loaded one is used instead, and when every binary is that busy the
+    request is dropped, unless its caller set a deadline to wait until.
+
+    The pool boots in the background (version check, download, spawn,
+    warm-up) and answers requests with ``None`` until it is ``READY``. Once
+    ready it periodically stages newer binary versions, which the binaries
+    pick up when they next restart.
+    """
+
+    def __init__(
+        self,
+        size=1,
+        max_queue_depth=8,
+        request_timeout=1.0,
+        stall_timeout=10.0,
+        binary_store_dir=None,
+        update_check_interval=24 * 3600,
+        versions_to_keep=2,
+        hot_standby=False,
+        health_check_interval=30.0,
+        metrics=None,
+        binary_path=None,
+        serializer=None,
+    ):
+        self._metrics = metrics or Metrics()
+        self._workers = [
+            Neoai(
+                request_timeout=request_timeout,
+                stall_timeout=stall_timeout,
+                binary_store_dir=binary_store_dir,
+                update_check_interval=update_check_interval,
+                versions_to_keep=versions_to_keep,
+                hot_standby=hot_standby,
+                health_check_interval=health_check_interval,
+                metrics=self._metrics,
+                binary_path=binary_path,
+                serializer=serializer,
+            )
+            for _ in range(max(1, size))
+        ]
+        self._max_queue_depth = max_queue_depth
+        self._update_check_interval = update_check_interval
+        self._update_task = None
+        self.state = DOWNLOADING
+        self.error = None
+        self._loop = asyncio.get_event_loop()
+        self._boot_task = self._loop.create_task(self._boot())
+
+    def close(self):
+        """
+        Stops every binary, booting and checking for updates.
+        """
+        for worker in self._workers:
+            worker.close()
+        if self._loop.is_closed():
+            return
+        for task in (self._boot_task, self._update_task):
+            if task is not None:
+                task.cancel()
+
+    def workers(self):
+        return list(self._workers)
+
+    def status(self):
+        return {
+            "state": self.state,
+            "error": self.error,
+            "workers": [worker.stats() for worker in self._workers],
+        }
+
+    async def _boot(self):
+        loop = asyncio.get_event_loop()
+        try:
+            self._set_state(DOWNLOADING)
+            path = await loop.run_in_executor(None, self._workers[0].download_if_needed)
+            if path is None:
+                return self._fail("No Neoai binary is available")
+
+            self._set_state(STARTING)
+            spawned = await asyncio.gather(*(worker.spawn() for worker in self._workers))
+            if not any(spawned):
+                return self._fail("Could not start the Neoai binary")
+
+            self._set_state(WARMING)
+            warm = await asyncio.gather(
+                *(worker.wait_until_warm(_WARM_UP_TIMEOUT) for worker in self._workers)
+            )
+            if not all(warm):
+                logger.warning("Some Neoai binaries did not finish warming up in time.")
+            self._set_state(READY)
+            self._update_task = loop.create_task(self._update_periodically())
+        except Exception as e:
+            logger.exception("Neoai failed to boot")
+            self._fail(str(e))
+
+    async def _update_periodically(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            try:
+                if await loop.run_in_executor(None, self._workers[0].update_if_available):
+                    logger.info("A new Neoai version was installed and is used from the next restart.")
+            except Exception:
+                logger.exception("Neoai update check failed")
+            await asyncio.sleep(self._update_check_interval)
+
+    def _set_state(self, state):
+        logger.info(f"Neoai pool is {state}")
+        self.state = state
+
+    def _fail(self, error):
+        logger.error(f"Neoai pool failed: {error}")
+        self.error = error
+        self.state = FAILED
+
+    async def request(self, request, session=None, deadline=None):
+        if self.state != READY:
+            self._metrics.error("not_ready")
+            return None
+        worker = self._route(routing_key(request))
+        if worker is None and deadline is not None:
+            # The caller is prepared to wait, so queue it behind the others.
+            worker = min(self._workers, key=lambda w: w.queue_depth)
+        if worker is None:
+            logger.debug("All Neoai binaries are busy, dropping request.")
+            self._metrics.error("dropped")
+            return None
+        return await worker.request(request, session=session, deadline=deadline)
+
+    def _route(self, key):
+        if key is not None:
+            worker = self._workers[zlib.crc32(key.encode("utf8")) % len(self._workers)]
+            if worker.queue_depth < self._max_queue_depth:
+                return worker
+
+        worker = min(self._workers, key=lambda w: w.queue_depth)
+        if worker.queue_depth < self._max_queue_depth:
+            return worker
+        return None
+
+
+def routing_key(request):
+    """
+    Returns the file a request is about, or ``None`` if it has none.
+    """
+    bodies = request.get("request")
+    if not isinstance(bodies, dict):
+        return None
+    for body in bodies.values():
+        if isinstance(body, dict) and body.get("filename"):
+            return body["filename"]
+    return None
@@ -0,0 +1,143 @@
+import collections.abc
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_NEWLINE = b"\n"
+_ENVELOPE_END = b"}\n"
+_OBJECT_ENDS = (b"}", b"}\n", b"}\r\n")
+
+
+class Serializer:
+    """
+    Encodes messages for the NeoAi binary as newline terminated JSON lines
+    and decodes its answers, with orjson when it is installed and the
+    standard library otherwise.
+
+    Messages are ``{"version": ..., "request": ...}`` envelopes. The start
+    of the envelope is kept encoded per protocol version, so that only the
+    request itself is serialized, and the parts are joined into the output
+    in a single allocation.
+
+    With ``passthrough``, responses are not parsed but kept as the line the
+    binary wrote, see ``RawResponse``.
+    """
+
+    def __init__(self, use_orjson=True, passthrough=True):
+        self.backend = "orjson" if use_orjson and orjson is not None else "json"
+        self.passthrough = passthrough
+        self._dumps = _orjson_dumps if self.backend == "orjson" else _json_dumps
+        self._loads = orjson.loads if self.backend == "orjson" else json.loads
+        self._envelopes = {}
+
+    def encode(self, message):
+        """
+        Returns ``message`` as a JSON line in bytes.
+        """
+        if type(message) is dict and len(message) == 2:
+            version = message.get("version")
+            if type(version) is str and "request" in message:
+                return self.encode_request(message["request"], version)
+        return b"".join((self._dumps(message), _NEWLINE))
+
+    def encode_request(self, request, version):
+        """
+        Returns the envelope of ``request`` for protocol ``version`` as a JSON line.
+        """
+        envelope = self._envelopes.get(version)
+        if envelope is None:
+            if len(self._envelopes) >= 16:
+                self._envelopes.clear()
+            envelope = self._envelopes[version] = b"".join(
+                (b'{"version":', _json_dumps(version), b',"request":')
+            )
+        return b"".join((envelope, self._dumps(request), _ENVELOPE_END))
+
+    def decode(self, line):
+        """
+        Parses a line of bytes from the binary. Raises ``ValueError`` when
+        it is not valid JSON.
+        """
+        return self._loads(line)
+
+    def decode_response(self, line):
+        """
+        Returns the binary's answer to a request: a ``RawResponse`` when
+        passing responses through, which only checks that the line looks
+        like a JSON object, and the parsed line otherwise. Raises
+        ``ValueError`` when the line is not valid.
+        """
+        if not self.passthrough:
+            return self.decode(line)
+        if not line.startswith(b"{") or not line.endswith(_OBJECT_ENDS):
+            raise ValueError("Response is not a JSON object")
+        return RawResponse(line, self._loads)
+
+
+class RawResponse(collections.abc.Mapping):
+    """
+    A response line of the binary, written to clients as it is. It is
+    parsed the first time the server looks inside it, e.g. to narrow cached
+    results, and reads as an empty response if that fails.
+    """
+
+    __slots__ = ("line", "_loads", "_parsed")
+
+    def __init__(self, line, loads=json.loads):
+        self.line = line
+        self._loads = loads
+        self._parsed = None
+
+    def _value(self):
+        if self._parsed is None:
+            try:
+                value = self._loads(self.line)
+            except ValueError:
+                value = None
+            self._parsed = value if isinstance(value, dict) else {}
+        return self._parsed
+
+    def __getitem__(self, key):
+        return self._value()[key]
+
+    def __iter__(self):
+        return iter(self._value())
+
+    def __len__(self):
+        return len(self._value())
+
+    def __bool__(self):
+        # Without parsing: the binary writes ``{}`` for empty answers.
+        return len(self.line.strip()) > 2
+
+    def __repr__(self):
+        return f"RawResponse({self.line!r})"
+
+
+def response_bytes(response):
+    """
+    Returns a response as JSON in bytes, as the binary wrote it for a
+    ``RawResponse``.
+    """
+    if isinstance(response, RawResponse):
+        return response.line
+    return json.dumps(response).encode("utf8")
+
+
+_json_encoder = json.JSONEncoder(separators=(",", ":"))
+
+
+def _json_dumps(value):
+    return _json_encoder.encode(value).encode("utf8")
+
+
+def _orjson_dumps(value):
+    try:
+        return orjson.dumps(value)
+    except TypeError:
+        # Integers beyond 64 bits, lone surrogates and other values orjson
+        # refuses, but which may come from a client's JSON.
+        return _json_dumps(value)
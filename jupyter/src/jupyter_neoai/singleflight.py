@@ -0,0 +1,82 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent Autocomplete requests.
+
+    While a request is waiting for the binary, an identical one attaches to
+    the outstanding call instead of being sent again, and every caller gets
+    the same response. Once every caller of a call went away, the call is
+    cancelled too, which takes the request off the binary's queue.
+    ``requests`` counts Autocomplete requests seen and ``coalesced`` how
+    many of them never reached the binary.
+    """
+
+    def __init__(self, neoai):
+        self._neoai = neoai
+        self._in_flight = {}
+        self.requests = 0
+        self.coalesced = 0
+
+    async def request(self, request, session=None, deadline=None):
+        key = request_key(request)
+        if key is None:
+            return await self._neoai.request(request, session=session, deadline=deadline)
+
+        self.requests += 1
+        call = self._in_flight.get(key)
+        if call is None:
+            call = _Call(
+                asyncio.ensure_future(
+                    self._neoai.request(request, session=session, deadline=deadline)
+                )
+            )
+            self._in_flight[key] = call
+            call.future.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            # A caller going away must not cancel the call the others wait on.
+            return await asyncio.shield(call.future)
+        except asyncio.CancelledError:
+            call.waiters -= 1
+            if call.waiters == 0:
+                self._forget(key, call)
+                call.future.cancel()
+            raise
+
+    def _forget(self, key, call):
+        if self._in_flight.get(key) is call:
+            del self._in_flight[key]
+
+
+class _Call:
+    __slots__ = ("future", "waiters")
+
+    def __init__(self, future):
+        self.future = future
+        self.waiters = 0
+
+
+def request_key(request):
+    """
+    Returns the normalized identity of an Autocomplete request, or ``None``
+    for any other request type and for a malformed one.
+    """
+    body = request.get("request")
+    autocomplete = body.get("Autocomplete") if isinstance(body, dict) else None
+    if not isinstance(autocomplete, dict):
+        return None
+    if not all(isinstance(autocomplete.get(side, ""), str) for side in ("before", "after")):
+        return None
+    return (
+        autocomplete.get("filename"),
+        autocomplete.get("before", ""),
+        autocomplete.get("after", ""),
+        bool(autocomplete.get("region_includes_beginning")),
+        bool(autocomplete.get("region_includes_end")),
+        autocomplete.get("max_num_results"),
+    )
@@ -23,6 +23,8 @@ define([
 
     const N_LINES_BEFORE = 50;
     const N_LINES_AFTER = 50;
+    const CHANNEL_RETRY_MIN_DELAY = 1000;
+    const CHANNEL_RETRY_MAX_DELAY = 60000;
 
     let assistActive;
 
@@ -83,13 +85,196 @@ define([
         );
     }
 
-    function requestCompleterServer(requestData) {
-        let serverUrl = config.remote_server_url || baseUrl;
-        serverUrl = new URL('neoai', serverUrl.endsWith('/') ? serverUrl : `${serverUrl}/`).href;
+    // Persistent websocket to the server extension. Requests go over it while
+    // it is open and fall back to plain HTTP otherwise.
+    const channel = {
+        socket: null,
+        nextId: 0,
+        retryDelay: CHANNEL_RETRY_MIN_DELAY,
+        pending: new Map(),
+        latestBySession: new Map(),
+    };
+
+    function openChannel() {
+        const url = new URL(utils.url_path_join(baseUrl, 'neoai', 'ws'), window.location.href);
+        url.protocol = url.protocol === 'https:' ? 'wss:' : 'ws:';
+
+        const socket = new WebSocket(url.href);
+        socket.onopen = () => {
+            channel.socket = socket;
+            channel.retryDelay = CHANNEL_RETRY_MIN_DELAY;
+        };
+        socket.onmessage = event => {
+            const { id, response } = JSON.parse(event.data);
+            const deferred = channel.pending.get(id);
+            if (deferred) {
+                channel.pending.delete(id);
+                deferred.resolve(response);
+            }
+        };
+        socket.onclose = () => {
+            channel.socket = null;
+            channel.pending.forEach(deferred => deferred.reject('closed'));
+            channel.pending.clear();
+            channel.latestBySession.clear();
+            // Edits in flight may or may not have reached the server.
+            resetNotebookIndex();
+            setTimeout(openChannel, channel.retryDelay);
+            channel.retryDelay = Math.min(channel.retryDelay * 2, CHANNEL_RETRY_MAX_DELAY);
+        };
+    }
+
+    function requestOverChannel(requestData, session) {
+        // A newer request from the same cell makes the previous answer useless.
+        const previousId = channel.latestBySession.get(session);
+        if (channel.pending.has(previousId)) {
+            channel.socket.send(JSON.stringify({ id: previousId, cancel: true }));
+            channel.pending.get(previousId).reject('superseded');
+            channel.pending.delete(previousId);
+        }
+
+        const id = channel.nextId++;
+        const deferred = $.Deferred();
+        channel.pending.set(id, deferred);
+        channel.latestBySession.set(session, id);
+        channel.socket.send(JSON.stringify({ id, session, request: requestData }));
+        return deferred.promise();
+    }
+
+    // `session` identifies the cell, so the server can drop a queued request
+    // of that cell once a newer keystroke arrives.
+    function requestCompleterServer(requestData, session) {
+        if (channelOpen()) {
+            return requestOverChannel(requestData, session);
+        }
+
+        if (config.remote_server_url) {
+            // The standalone remote server only understands the GET form.
+            let serverUrl = config.remote_server_url;
+            serverUrl = new URL('neoai', serverUrl.endsWith('/') ? serverUrl : `${serverUrl}/`).href;
+            return $.get(serverUrl, { 'data': JSON.stringify(requestData), 'session': session })
+                .then(data => (typeof data === 'string' ? JSON.parse(data) : data))
+                .fail(error => console.error(`${logPrefix} get error: `, error));
+        }
+
+        const serverUrl = utils.url_path_join(baseUrl, 'neoai') + '?' + $.param({ 'session': session });
+        return utils.ajax(serverUrl, {
+            type: 'POST',
+            data: JSON.stringify(requestData),
+            contentType: 'application/json',
+        }).then(data => (typeof data === 'string' ? JSON.parse(data) : data))
+            .fail(error => console.error(`${logPrefix} post error: `, error));
+    }
+
+    // What the server's index of this notebook holds, so that requests only
+    // carry the cells edited since the previous request and the server
+    // assembles before/after itself.
+    const notebookIndex = {
+        document: `${Jupyter.notebook.notebook_path}#${Math.random().toString(36).slice(2)}`,
+        order: null,
+        cells: new Map(),
+        dirty: new Set(),
+        // Version of the index the next request's edits apply to, null to start over.
+        base: null,
+        versions: 0,
+    };
 
-        return $.get(serverUrl, { 'data': JSON.stringify(requestData) })
-            .then(data => (typeof data === 'string' ? JSON.parse(data) : data))
-            .fail(error => console.error(`${logPrefix} get error: `, error));
+    function resetNotebookIndex() {
+        notebookIndex.base = null;
+        notebookIndex.order = null;
+        notebookIndex.cells.clear();
+        notebookIndex.dirty.clear();
+    }
+
+    function trackCell(cell) {
+        if (cell.neoai_tracked) return;
+        cell.neoai_tracked = true;
+        cell.code_mirror.on('change', () => notebookIndex.dirty.add(cell.cell_id));
+    }
+
+    // The single replacement turning `oldText` into `newText`, in UTF-16 offsets.
+    function textEdit(cellId, oldText, newText) {
+        const common = Math.min(oldText.length, newText.length);
+        let start = 0;
+        while (start < common && oldText.charCodeAt(start) === newText.charCodeAt(start)) start++;
+        let end = 0;
+        while (end < common - start &&
+            oldText.charCodeAt(oldText.length - 1 - end) === newText.charCodeAt(newText.length - 1 - end)) end++;
+        return {
+            cell: cellId,
+            offset: start,
+            delete: oldText.length - start - end,
+            insert: newText.slice(start, newText.length - end),
+        };
+    }
+
+    function contextRequest(currCell, cursor) {
+        const cells = Jupyter.notebook.get_cells();
+        const context = {
+            document: notebookIndex.document,
+            cell: currCell.cell_id,
+            cursor: currCell.code_mirror.indexFromPos(cursor),
+            before_lines: config.before_line_limit > 0 ? config.before_line_limit : N_LINES_BEFORE,
+            after_lines: config.after_line_limit > 0 ? config.after_line_limit : N_LINES_AFTER,
+            version: ++notebookIndex.versions,
+            edits: [],
+        };
+        if (notebookIndex.base !== null) {
+            context.base = notebookIndex.base;
+        }
+        notebookIndex.base = context.version;
+
+        const order = cells.map(c => c.cell_id);
+        const orderKey = order.join('\n');
+        if (orderKey !== notebookIndex.order) {
+            context.order = order;
+            notebookIndex.order = orderKey;
+            const present = new Set(order);
+            notebookIndex.cells.forEach((_, id) => {
+                if (!present.has(id)) notebookIndex.cells.delete(id);
+            });
+        }
+
+        cells.forEach(c => {
+            trackCell(c);
+            const known = notebookIndex.cells.get(c.cell_id);
+            if (known !== undefined && !notebookIndex.dirty.has(c.cell_id)) return;
+            const text = c.get_text();
+            if (known === undefined) {
+                context.edits.push({ cell: c.cell_id, text });
+            } else if (known !== text) {
+                context.edits.push(textEdit(c.cell_id, known, text));
+            }
+            notebookIndex.cells.set(c.cell_id, text);
+        });
+        notebookIndex.dirty.clear();
+
+        const { filename, max_num_results } = requestInfo.request.Autocomplete;
+        return {
+            version: requestInfo.version,
+            request: { Autocomplete: { filename, max_num_results } },
+            context,
+        };
+    }
+
+    function channelOpen() {
+        return channel.socket && channel.socket.readyState === WebSocket.OPEN;
+    }
+
+    // The extension's own server keeps an index of the notebook, so only the
+    // edits since the previous request need to be sent. The standalone
+    // remote server gets the assembled context.
+    function requestCompletions(currCell, cursor, fullRequest) {
+        if (config.remote_server_url && !channelOpen()) {
+            return requestCompleterServer(fullRequest(), currCell.cell_id);
+        }
+        return requestCompleterServer(contextRequest(currCell, cursor), currCell.cell_id).then(data => {
+            if (!data || !data.resync) return data;
+            // The server lost its index, e.g. it restarted, or requests
+            // overtook one another: send everything again.
+            resetNotebookIndex();
+            return requestCompleterServer(contextRequest(currCell, cursor), currCell.cell_id);
+        });
     }
 
     function isValidCodeLine(line) {
@@ -113,16 +298,19 @@ define([
 
         const { editor, cell: currCell } = this;
         const cursor = editor.getCursor();
-        
-        const { before, after, region_includes_beginning, region_includes_end } = this.gather_context(currCell, cursor);
 
-        this.before = before;
-        this.after = after;
+        const fullRequest = () => {
+            const { before, after, region_includes_beginning, region_includes_end } = this.gather_context(currCell, cursor);
+
+            this.before = before;
+            this.after = after;
 
-        requestInfo.request.Autocomplete.before = before.slice(-N_LINES_BEFORE).join("\n");
-        requestInfo.request.Autocomplete.after = after.slice(0, N_LINES_AFTER).join("\n");
-        requestInfo.request.Autocomplete.region_includes_beginning = region_includes_beginning;
-        requestInfo.request.Autocomplete.region_includes_end = region_includes_end;
+            requestInfo.request.Autocomplete.before = before.slice(-N_LINES_BEFORE).join("\n");
+            requestInfo.request.Autocomplete.after = after.slice(0, N_LINES_AFTER).join("\n");
+            requestInfo.request.Autocomplete.region_includes_beginning = region_includes_beginning;
+            requestInfo.request.Autocomplete.region_includes_end = region_includes_end;
+            return requestInfo;
+        };
 
         this.complete = $('<div/>').addClass('completions complete-dropdown-content').attr('id', 'complete');
         $('body').append(this.complete);
@@ -130,7 +318,7 @@ define([
         this.start = editor.indexFromPos(cursor);
         this.complete.hide();
 
-        requestCompleterServer(requestInfo).done(data => {
+        requestCompletions(currCell, cursor, fullRequest).done(data => {
             if (!data || !data.results || data.results.length === 0) {
                 this.close();
                 return;
@@ -215,15 +403,23 @@ define([
 
         const cursor = this.editor.getCursor();
         this.start = this.editor.indexFromPos(cursor);
-        const currLineText = this.editor.getLine(cursor.line);
-        
-        this.before[this.before.length - 1] = currLineText.slice(0, cursor.ch);
-        this.after[0] = currLineText.slice(cursor.ch);
 
-        requestInfo.request.Autocomplete.before = this.before.slice(-N_LINES_BEFORE).join('\n');
-        requestInfo.request.Autocomplete.after = this.after.slice(0, N_LINES_AFTER).join('\n');
+        const fullRequest = () => {
+            if (!this.before) {
+                const { before, after } = this.gather_context(this.cell, cursor);
+                this.before = before;
+                this.after = after;
+            }
+            const currLineText = this.editor.getLine(cursor.line);
+            this.before[this.before.length - 1] = currLineText.slice(0, cursor.ch);
+            this.after[0] = currLineText.slice(cursor.ch);
+
+            requestInfo.request.Autocomplete.before = this.before.slice(-N_LINES_BEFORE).join('\n');
+            requestInfo.request.Autocomplete.after = this.after.slice(0, N_LINES_AFTER).join('\n');
+            return requestInfo;
+        };
 
-        requestCompleterServer(requestInfo).done(data => {
+        requestCompletions(this.cell, cursor, fullRequest).done(data => {
             if (!data || !data.results || data.results.length === 0) {
                 this.close();
                 return;
@@ -270,6 +466,8 @@ define([
         this.completions = null;
         this.completeFrom = null;
         this.complete = null;
+        this.before = null;
+        this.after = null;
     };
 
     DeepCompleter.prototype.set_location = function (oldPrefix) {
@@ -418,6 +616,9 @@ define([
         }, err => {
             console.warn(`${logPrefix} error loading config:`, err);
         }).then(() => {
+            if (!config.remote_server_url) {
+                openChannel();
+            }
             patchCellKeyevent();
             addMenuItem();
             setAssistState(config.assist_active);
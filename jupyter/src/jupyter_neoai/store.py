@@ -0,0 +1,216 @@
+import contextlib
+import hashlib
+import logging
+import os
+import shutil
+import time
+from jupyter_core.paths import jupyter_data_dir
+from .download import download, extract_member
+
+logger = logging.getLogger(__name__)
+
+# Interrupted downloads untouched for this long are not resumed anymore.
+_PARTIAL_TTL = 24 * 3600
+
+if os.name == "nt":
+    import msvcrt
+
+    def _lock_file(f):
+        f.seek(0)
+        # LK_LOCK only retries for ~10 seconds; keep waiting like flock does.
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+    def _unlock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _unlock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def default_store_dir():
+    return os.path.join(jupyter_data_dir(), "neoai", "store")
+
+
+class BinaryStore:
+    """
+    A content-addressed store of NeoAi binaries, shared by every install
+    (virtualenv, user, server) pointing at the same directory.
+
+    Binaries live under ``sha256/<checksum of the zip>/``. Only one process
+    downloads a given archive at a time, the others wait on its lock and
+    then find the binary in place. Installs get a hardlink to it, or a
+    symlink or copy where hardlinks are not possible.
+
+    ``collect_garbage`` removes binaries no install hardlinks to anymore.
+    Symlinks cannot be counted, so an install of another environment that
+    symlinked a removed binary finds it missing and fetches it again.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def fetch(self, download_url, name, expected_checksum=None):
+        """
+        Returns the path of executable ``name`` from the archive at
+        ``download_url``, downloading it only if the store lacks it.
+        """
+        if expected_checksum:
+            path = self._path(expected_checksum, name)
+            if os.path.isfile(path):
+                logger.info(f"Neoai binary found in the shared store at {path}")
+                return path
+            key = expected_checksum
+        else:
+            # Without a published checksum the content is only known after
+            # downloading, so serialize on the URL instead.
+            key = hashlib.sha256(download_url.encode("utf8")).hexdigest()
+
+        with self._locked(key):
+            if expected_checksum:
+                path = self._path(expected_checksum, name)
+                if os.path.isfile(path):
+                    return path
+
+            partial_dir = os.path.join(self.root, "partial", key)
+            os.makedirs(partial_dir, exist_ok=True)
+            zip_path = os.path.join(partial_dir, f"{name}.zip.part")
+            checksum = download(download_url, zip_path, expected_checksum)
+            extracted = extract_member(zip_path, name, partial_dir)
+            os.chmod(extracted, 0o755)
+
+            path = self._path(checksum, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(extracted, path)
+            shutil.rmtree(partial_dir, ignore_errors=True)
+            logger.info(f"Stored Neoai binary at {path}")
+            return path
+
+    def materialize(self, path, destination):
+        """
+        Makes the stored binary at ``path`` available at ``destination``.
+        Raises ``FileNotFoundError`` if it was collected in the meantime.
+        """
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        partial = destination + ".linking"
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(partial)
+        # Under the entry's lock, so that garbage collection sees the link.
+        with self._locked(os.path.basename(os.path.dirname(path))):
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"{path} is no longer in the store")
+            try:
+                os.link(path, partial)
+            except OSError:
+                try:
+                    os.symlink(path, partial)
+                except OSError:
+                    shutil.copy2(path, partial)
+        os.replace(partial, destination)
+
+    def collect_garbage(self, keep=()):
+        """
+        Removes the stored binaries that no install hardlinks to, except
+        those the paths in ``keep`` resolve to, downloads interrupted more
+        than a day ago and the locks of keys with neither.
+        """
+        keep = {os.path.realpath(path) for path in keep}
+        for checksum in _listdir(os.path.join(self.root, "sha256")):
+            entry = os.path.join(self.root, "sha256", checksum)
+            with self._locked(checksum):
+                if not _referenced(entry, keep):
+                    logger.info(f"Removing unused Neoai binary {entry}")
+                    shutil.rmtree(entry, ignore_errors=True)
+
+        for key in _listdir(os.path.join(self.root, "partial")):
+            partial_dir = os.path.join(self.root, "partial", key)
+            with self._locked(key):
+                if not os.path.isdir(partial_dir):
+                    continue
+                if time.time() - _last_modified(partial_dir) > _PARTIAL_TTL:
+                    logger.info(f"Removing abandoned Neoai download {partial_dir}")
+                    shutil.rmtree(partial_dir, ignore_errors=True)
+
+        for lock in _listdir(os.path.join(self.root, "locks")):
+            key, extension = os.path.splitext(lock)
+            if extension != ".lock":
+                continue
+            with self._locked(key) as discard:
+                if not any(
+                    os.path.exists(os.path.join(self.root, kind, key)) for kind in ("sha256", "partial")
+                ):
+                    discard()
+
+    def _path(self, checksum, name):
+        return os.path.join(self.root, "sha256", checksum.lower(), name)
+
+    @contextlib.contextmanager
+    def _locked(self, key):
+        """
+        Holds the lock of ``key`` across processes. The body may call the
+        yielded function to delete the lock file before it is released.
+        """
+        lock_dir = os.path.join(self.root, "locks")
+        os.makedirs(lock_dir, exist_ok=True)
+        path = os.path.join(lock_dir, f"{key}.lock")
+        while True:
+            with open(path, "a+b") as f:
+                _lock_file(f)
+                try:
+                    # The file may have been deleted while we waited for it,
+                    # and a lock on a deleted file excludes nobody.
+                    if not _same_file(f, path):
+                        continue
+                    discarded = []
+                    yield lambda: discarded.append(True)
+                    if discarded:
+                        # Windows refuses to delete an open file; it stays then.
+                        with contextlib.suppress(OSError):
+                            os.remove(path)
+                    return
+                finally:
+                    _unlock_file(f)
+
+
+def _listdir(path):
+    try:
+        return os.listdir(path)
+    except FileNotFoundError:
+        return []
+
+
+def _referenced(entry, keep):
+    for name in _listdir(entry):
+        path = os.path.join(entry, name)
+        try:
+            if os.stat(path).st_nlink > 1 or os.path.realpath(path) in keep:
+                return True
+        except OSError:
+            continue
+    return False
+
+
+def _last_modified(path):
+    mtimes = [os.stat(path).st_mtime]
+    for name in _listdir(path):
+        with contextlib.suppress(OSError):
+            mtimes.append(os.stat(os.path.join(path, name)).st_mtime)
+    return max(mtimes)
+
+
+def _same_file(f, path):
+    try:
+        return os.path.samestat(os.fstat(f.fileno()), os.stat(path))
+    except FileNotFoundError:
+        return False
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import random
+
+logger = logging.getLogger(__name__)
+
+
+class Backoff:
+    """
+    Exponential backoff with jitter for restarting a crashing binary.
+
+    The first crash is restarted right away, every consecutive one waits
+    twice as long up to ``cap`` seconds. A process that stayed up for
+    ``reset_after`` seconds before crashing starts the sequence over.
+    """
+
+    def __init__(self, base=0.5, cap=60.0, reset_after=60.0):
+        self._base = base
+        self._cap = cap
+        self._reset_after = reset_after
+        self._failures = 0
+
+    def next_delay(self, uptime):
+        """
+        Records a crash after ``uptime`` seconds and returns how long to
+        wait before starting the binary again.
+        """
+        if uptime >= self._reset_after:
+            self._failures = 0
+        failures, self._failures = self._failures, self._failures + 1
+        if failures == 0:
+            return 0.0
+        delay = min(self._cap, self._base * 2 ** (failures - 1))
+        # Spread restarts of binaries that crashed together.
+        return delay * random.uniform(0.5, 1.0)
+
+
+class Supervisor:
+    """
+    Hands out started NeoAi processes to a ``Neoai`` instance.
+
+    With ``hot_standby`` a second process is launched and warmed up in the
+    background while the first one serves requests, so that after a crash
+    the next request finds a warm process instead of paying a cold start.
+    Cold starts after consecutive crashes are delayed by ``backoff``.
+
+    ``launch`` is a coroutine function returning a ``(process, warm_up)``
+    pair, where ``warm_up`` is the task of the process' warm-up request,
+    or ``None`` if no process could be started.
+
+    ``failover_latency`` is the number of seconds from the last detected
+    crash until its replacement answered its warm-up request, standby or
+    not, and so could serve requests again.
+    """
+
+    def __init__(self, launch, hot_standby=False, backoff=None):
+        self._launch = launch
+        self._hot_standby = hot_standby
+        self._backoff = backoff or Backoff()
+        self._loop = asyncio.get_event_loop()
+        self._standby = None
+        self._not_before = 0.0
+        self._crashed_at = None
+        self.starts = 0
+        self.crashes = 0
+        self.failovers = 0
+        self.failover_latency = None
+
+    def stats(self):
+        return {
+            "starts": self.starts,
+            "crashes": self.crashes,
+            "failovers": self.failovers,
+            "failover_latency": self.failover_latency,
+            "standby": self._standby_ready(),
+        }
+
+    def retry_in(self):
+        """
+        Seconds until a cold start is allowed again.
+        """
+        return max(0.0, self._not_before - self._loop.time())
+
+    def crashed(self, uptime):
+        """
+        Records that the running process died after ``uptime`` seconds.
+        """
+        self.crashes += 1
+        if self._crashed_at is None:
+            self._crashed_at = self._loop.time()
+        delay = self._backoff.next_delay(uptime)
+        self._not_before = self._loop.time() + delay
+        if delay:
+            logger.warning(f"Neoai keeps crashing, backing off for {delay:.1f}s")
+
+    async def take(self):
+        """
+        Returns the warm standby if there is one, or else a freshly launched
+        process, and launches a new standby. Returns ``None`` while backing
+        off or if no process could be started.
+        """
+        launched = self._take_standby()
+        if launched is not None:
+            self.failovers += 1
+            logger.info("Switched to the standby Neoai binary")
+        elif self.retry_in() == 0:
+            launched = await self._launch()
+
+        if launched is not None:
+            self.starts += 1
+            self._time_recovery(launched[1])
+        self._replenish()
+        return launched
+
+    def close(self):
+        """
+        Terminates the standby, or stops launching it.
+        """
+        standby, self._standby = self._standby, None
+        if standby is None:
+            return
+        if not standby.done():
+            if not self._loop.is_closed():
+                standby.cancel()
+        elif not standby.cancelled() and standby.exception() is None and standby.result() is not None:
+            terminate(standby.result()[0])
+
+    def _time_recovery(self, warm_up):
+        crashed_at, self._crashed_at = self._crashed_at, None
+        if crashed_at is None:
+            return
+
+        def recovered(_=None):
+            self.failover_latency = self._loop.time() - crashed_at
+
+        if warm_up is None or warm_up.done():
+            recovered()
+        else:
+            warm_up.add_done_callback(recovered)
+
+    def _standby_ready(self):
+        standby = self._standby
+        if standby is None or not standby.done() or standby.cancelled() or standby.exception():
+            return False
+        launched = standby.result()
+        return launched is not None and launched[0].returncode is None
+
+    def _take_standby(self):
+        if not self._standby_ready():
+            return None
+        standby, self._standby = self._standby, None
+        return standby.result()
+
+    def _replenish(self):
+        if not self._hot_standby:
+            return
+        standby = self._standby
+        if standby is not None and (not standby.done() or self._standby_ready()):
+            return
+        self._standby = self._loop.create_task(self._launch_standby())
+
+    async def _launch_standby(self):
+        await asyncio.sleep(self.retry_in())
+        launch = asyncio.ensure_future(self._launch())
+        try:
+            return await asyncio.shield(launch)
+        except asyncio.CancelledError:
+            # Closed while the process was starting; stop it once it has.
+            launch.add_done_callback(_terminate_launched)
+            raise
+
+
+def _terminate_launched(launch):
+    if not launch.cancelled() and launch.exception() is None and launch.result() is not None:
+        terminate(launch.result()[0])
+
+
+def terminate(proc):
+    if proc.returncode is None:
+        try:
+            proc.terminate()
+        except ProcessLookupError:
+            pass
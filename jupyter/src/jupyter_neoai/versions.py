@@ -0,0 +1,241 @@
+import json
+import logging
+import os
+import shutil
+import stat
+import time
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_FILE = ".active"
+_CHECK_FILE = ".version-check"
+
+
+class BinaryVersions:
+    """
+    The NeoAi versions installed under ``binary_dir``, each as
+    ``<version>/<executable>``.
+
+    The version in use is named by the ``.active`` file, which ``activate``
+    replaces atomically; without it the newest installed version is used.
+    The resolved path is cached until ``.active`` changes, so restarting
+    the binary costs a single ``stat``. ``update`` stages the latest
+    published version next to the running one, switches to it and removes
+    all but the newest ``keep`` versions, and from ``store`` the binaries
+    only the removed versions used.
+    """
+
+    def __init__(
+        self, binary_dir, executable, version_url, install, check_ttl=24 * 3600, keep=2, store=None
+    ):
+        self._binary_dir = binary_dir
+        self._executable = executable
+        self._version_url = version_url
+        self._install = install
+        self._check_ttl = check_ttl
+        self._keep = max(1, keep)
+        self._store = store
+        self._path = None
+        self._active_mtime = None
+
+    def path(self):
+        """
+        Returns the path of the binary to run, or ``None`` if none is installed.
+        """
+        active_mtime = _mtime(os.path.join(self._binary_dir, ACTIVE_FILE))
+        if self._path is None or active_mtime != self._active_mtime or not os.path.isfile(self._path):
+            self._active_mtime = active_mtime
+            self._path = self._resolve()
+        return self._path
+
+    def active_version(self):
+        try:
+            with open(os.path.join(self._binary_dir, ACTIVE_FILE)) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def installed_versions(self):
+        """
+        Returns the installed versions, newest first.
+        """
+        try:
+            versions = [
+                d for d in os.listdir(self._binary_dir)
+                if not d.startswith(".") and os.path.isfile(self._executable_path(d))
+            ]
+        except OSError:
+            return []
+        versions.sort(key=parse_semver, reverse=True)
+        return versions
+
+    def activate(self, version):
+        """
+        Makes ``version`` the one started from now on. Running binaries are
+        not affected.
+        """
+        os.makedirs(self._binary_dir, exist_ok=True)
+        active = os.path.join(self._binary_dir, ACTIVE_FILE)
+        with open(active + ".tmp", "w") as f:
+            f.write(version)
+        os.replace(active + ".tmp", active)
+        self._path = None
+        logger.info(f"Neoai version {version} is now active")
+
+    def latest_version(self, force=False):
+        """
+        Returns the latest published version. The update server is asked at
+        most once per ``check_ttl`` unless ``force`` is set, and with
+        ``If-None-Match``/``If-Modified-Since`` so an unchanged answer costs
+        no body.
+        """
+        state = self._read_check_state()
+        if not force and state.get("version") and time.time() - state.get("checked_at", 0) < self._check_ttl:
+            return state["version"]
+
+        request = Request(self._version_url)
+        if state.get("version"):
+            if state.get("etag"):
+                request.add_header("If-None-Match", state["etag"])
+            if state.get("last_modified"):
+                request.add_header("If-Modified-Since", state["last_modified"])
+        try:
+            with urlopen(request) as response:
+                state = {
+                    "version": response.read().decode("UTF-8").strip(),
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+        except HTTPError as e:
+            if e.code != 304:
+                logger.error(f"Failed to fetch Neoai version: {e}")
+                return state.get("version")
+        except URLError as e:
+            logger.error(f"Failed to fetch Neoai version: {e}")
+            return state.get("version")
+
+        state["checked_at"] = time.time()
+        self._write_check_state(state)
+        return state["version"]
+
+    def install_latest(self):
+        """
+        Installs and activates the latest version if nothing is installed yet.
+        """
+        if self.path() is not None:
+            return self.path()
+        version = self.latest_version(force=True)
+        if not version:
+            logger.error("Could not retrieve latest Neoai version.")
+            return None
+        if self._stage(version):
+            self.activate(version)
+        return self.path()
+
+    def update(self):
+        """
+        Stages and activates the latest version if it is not the active one.
+        Returns whether a new version was activated.
+        """
+        version = self.latest_version()
+        current = self.active_version() or next(iter(self.installed_versions()), None)
+        if not version or version == current:
+            return False
+        if not self._stage(version):
+            return False
+        self.activate(version)
+        self.collect_garbage()
+        return True
+
+    def collect_garbage(self):
+        """
+        Removes every installed version but the active one and the newest
+        ``keep - 1`` others, then the stored binaries no install uses.
+        """
+        active = self.active_version()
+        keep = [active] if active else []
+        for version in self.installed_versions():
+            if len(keep) >= self._keep:
+                break
+            if version not in keep:
+                keep.append(version)
+
+        for entry in os.listdir(self._binary_dir):
+            path = os.path.join(self._binary_dir, entry)
+            if entry.startswith(".") or entry in keep or not os.path.isdir(path):
+                continue
+            logger.info(f"Removing old Neoai version {entry}")
+            # A binary still running from there may keep files open on Windows.
+            shutil.rmtree(path, ignore_errors=True)
+
+        if self._store is not None:
+            self._store.collect_garbage([self._executable_path(version) for version in keep])
+
+    def _stage(self, version):
+        if not os.path.isfile(self._executable_path(version)):
+            logger.info(f"Staging Neoai version {version}")
+            self._install(version)
+        return os.path.isfile(self._executable_path(version))
+
+    def _resolve(self):
+        active = self.active_version()
+        candidates = [active] if active else []
+        candidates += self.installed_versions()
+        for version in candidates:
+            path = self._executable_path(version)
+            if os.path.isfile(path):
+                add_execute_permission(path)
+                return path
+        return None
+
+    def _executable_path(self, version):
+        return os.path.join(self._binary_dir, version, self._executable)
+
+    def _read_check_state(self):
+        try:
+            with open(os.path.join(self._binary_dir, _CHECK_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_check_state(self, state):
+        path = os.path.join(self._binary_dir, _CHECK_FILE)
+        try:
+            os.makedirs(self._binary_dir, exist_ok=True)
+            with open(path + ".tmp", "w") as f:
+                json.dump(state, f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            logger.warning(f"Could not record Neoai version check: {e}")
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def parse_semver(s):
+    """
+    Parses a semantic version string into a list of integers for sorting.
+    """
+    try:
+        return [int(x) for x in s.split(".")]
+    except (ValueError, AttributeError):
+        return []
+
+
+def add_execute_permission(path):
+    """
+    Adds execute permission to a file.
+    """
+    try:
+        st = os.stat(path)
+        new_mode = st.st_mode | stat.S_IEXEC
+        if new_mode != st.st_mode:
+            os.chmod(path, new_mode)
+    except OSError as e:
+        logger.warning(f"Could not set execute permission on {path}: {e}")
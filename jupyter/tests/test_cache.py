@@ -0,0 +1,142 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from jupyter_neoai.cache import CompletionCache
+from jupyter_neoai.serializer import Serializer
+
+
+class RecordingNeoai:
+    """Answers Autocomplete requests with completions of the word at the cursor."""
+
+    def __init__(self, serializer=None):
+        self.requests = []
+        self.serializer = serializer
+
+    async def request(self, request, session=None, deadline=None):
+        self.requests.append(request)
+        before = request["request"]["Autocomplete"]["before"]
+        word = before.rsplit(".", 1)[-1]
+        response = {
+            "old_prefix": word,
+            "results": [{"new_prefix": name} for name in ("groupby", "group", "head") if name.startswith(word)],
+        }
+        if self.serializer is not None:
+            return self.serializer.decode_response(self.serializer.encode(response))
+        return response
+
+
+def autocomplete(before, after=""):
+    return {
+        "version": "1.0.7",
+        "request": {
+            "Autocomplete": {
+                "filename": "a.ipynb",
+                "before": before,
+                "after": after,
+                "region_includes_beginning": True,
+                "region_includes_end": True,
+                "max_num_results": 5,
+            }
+        },
+    }
+
+
+class TestCompletionCache(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("jupyter_neoai.cache.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.neoai = RecordingNeoai()
+
+    def cache(self, **options):
+        return CompletionCache(self.neoai, **options)
+
+    def send(self, cache, request):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(cache.request(request))
+        finally:
+            loop.close()
+
+    def test_exact_hit(self):
+        cache = self.cache()
+        first = self.send(cache, autocomplete("df.gr"))
+        self.assertIs(self.send(cache, autocomplete("df.gr")), first)
+        self.assertEqual(len(self.neoai.requests), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_prefix_hit_narrows_the_results(self):
+        cache = self.cache()
+        self.send(cache, autocomplete("df.g"))
+        response = self.send(cache, autocomplete("df.grou"))
+        self.assertEqual(len(self.neoai.requests), 1)
+        self.assertEqual(response["old_prefix"], "grou")
+        self.assertEqual([r["new_prefix"] for r in response["results"]], ["groupby", "group"])
+        self.assertEqual(cache.prefix_hits, 1)
+
+    def test_prefix_hit_on_a_raw_response(self):
+        self.neoai.serializer = Serializer()
+        cache = self.cache()
+        self.send(cache, autocomplete("df.g"))
+        response = self.send(cache, autocomplete("df.gro"))
+        self.assertEqual([r["new_prefix"] for r in response["results"]], ["groupby", "group"])
+
+    def test_prefix_misses(self):
+        cache = self.cache()
+        self.send(cache, autocomplete("df.gr"))
+        # No cached result starts with what was typed.
+        self.send(cache, autocomplete("df.grx"))
+        # Typing that is not part of the word changes the context.
+        self.send(cache, autocomplete("df.gr("))
+        # The text after the cursor changed.
+        self.send(cache, autocomplete("df.gro", after=")"))
+        # The word got shorter.
+        self.send(cache, autocomplete("df.g"))
+        self.assertEqual(len(self.neoai.requests), 5)
+        self.assertEqual(cache.prefix_hits, 0)
+
+    def test_entries_expire(self):
+        cache = self.cache(ttl=30.0)
+        self.send(cache, autocomplete("df.g"))
+        self.now += 30.0
+        self.send(cache, autocomplete("df.g"))
+        self.send(cache, autocomplete("df.gr"))
+        self.assertEqual(len(self.neoai.requests), 1)
+        self.now += 30.1
+        self.send(cache, autocomplete("df.gr"))
+        self.send(cache, autocomplete("df.g"))
+        self.assertEqual(len(self.neoai.requests), 3)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = self.cache(max_entries=2)
+        for before in ("a.g", "b.g", "a.g", "c.g"):
+            self.send(cache, autocomplete(before))
+        self.send(cache, autocomplete("a.g"))
+        self.assertEqual(len(self.neoai.requests), 3)
+        self.send(cache, autocomplete("b.g"))
+        self.assertEqual(len(self.neoai.requests), 4)
+
+    def test_entries_are_evicted_beyond_max_bytes(self):
+        probe = self.cache()
+        self.send(probe, autocomplete("a.g"))
+        cache = self.cache(max_bytes=2 * probe._bytes)
+        for before in ("a.g", "b.g", "c.g"):
+            self.send(cache, autocomplete(before))
+        self.assertEqual(cache._bytes, 2 * probe._bytes)
+        del self.neoai.requests[:]
+        self.send(cache, autocomplete("c.g"))
+        self.assertEqual(len(self.neoai.requests), 0)
+        self.send(cache, autocomplete("a.g"))
+        self.assertEqual(len(self.neoai.requests), 1)
+
+    def test_disabled_cache_passes_through(self):
+        cache = self.cache(max_entries=0)
+        self.send(cache, autocomplete("df.gr"))
+        self.send(cache, autocomplete("df.gr"))
+        self.assertEqual(len(self.neoai.requests), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
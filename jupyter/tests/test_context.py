@@ -0,0 +1,105 @@
+import asyncio
+import unittest
+
+from jupyter_neoai.context import RESYNC, NotebookContexts
+
+
+class RecordingNeoai:
+    def __init__(self):
+        self.requests = []
+
+    async def request(self, request, session=None, deadline=None):
+        self.requests.append(request)
+        return {"results": []}
+
+
+def autocomplete(context):
+    return {
+        "version": "1.0.7",
+        "request": {"Autocomplete": {"filename": "a.ipynb", "max_num_results": 5}},
+        "context": dict({"document": "a.ipynb#1", "before_lines": 50, "after_lines": 50}, **context),
+    }
+
+
+class TestNotebookContexts(unittest.TestCase):
+    def setUp(self):
+        self.neoai = RecordingNeoai()
+        self.contexts = NotebookContexts(self.neoai, max_documents=2)
+
+    def send(self, request):
+        return asyncio.get_event_loop().run_until_complete(self.contexts.request(request))
+
+    def sent(self):
+        return self.neoai.requests[-1]["request"]["Autocomplete"]
+
+    def test_assembles_before_and_after_across_cells(self):
+        self.send(
+            autocomplete(
+                {
+                    "order": ["a", "b", "c"],
+                    "edits": [
+                        {"cell": "a", "text": "import os\n!ls"},
+                        {"cell": "b", "text": "x = 1\ny = os.pa"},
+                        {"cell": "c", "text": "print(y)"},
+                    ],
+                    "cell": "b",
+                    "cursor": 15,
+                    "version": 1,
+                }
+            )
+        )
+        self.assertEqual(self.sent()["before"], "import os\nx = 1\ny = os.pa")
+        self.assertEqual(self.sent()["after"], "\nprint(y)")
+        self.assertTrue(self.sent()["region_includes_beginning"])
+        self.assertTrue(self.sent()["region_includes_end"])
+        self.assertEqual(self.sent()["filename"], "a.ipynb")
+        self.assertNotIn("context", self.neoai.requests[-1])
+
+    def test_applies_edits_in_utf16_offsets(self):
+        self.send(autocomplete({"order": ["a"], "edits": [{"cell": "a", "text": "s = '\U0001F600'"}], "cell": "a", "cursor": 0, "version": 1}))
+        edit = {"cell": "a", "offset": 7, "delete": 1, "insert": "!'\nos."}
+        self.send(autocomplete({"edits": [edit], "cell": "a", "cursor": 13, "base": 1, "version": 2}))
+        self.assertEqual(self.sent()["before"], "s = '\U0001F600!'\nos.")
+        self.assertEqual(self.sent()["after"], "")
+
+    def test_limits_the_lines_of_context(self):
+        text = "\n".join(f"line{i}" for i in range(10))
+        request = autocomplete({"order": ["a"], "edits": [{"cell": "a", "text": text}], "cell": "a", "cursor": len(text), "version": 1})
+        request["context"]["before_lines"] = 3
+        self.send(request)
+        self.assertEqual(self.sent()["before"], "line7\nline8\nline9")
+        self.assertFalse(self.sent()["region_includes_beginning"])
+
+    def test_a_malformed_request_asks_for_a_resync(self):
+        request = autocomplete({"order": ["a"], "edits": [{"cell": "a", "text": "x"}], "cell": "a", "cursor": 1, "version": 1})
+        request["request"] = "Autocomplete"
+        self.assertEqual(self.send(request), RESYNC)
+        self.assertEqual(self.neoai.requests, [])
+
+    def test_unknown_cells_ask_for_a_resync(self):
+        edit = {"cell": "a", "offset": 0, "delete": 0, "insert": "x"}
+        result = self.send(autocomplete({"edits": [edit], "cell": "a", "cursor": 1, "version": 1}))
+        self.assertEqual(result, RESYNC)
+        self.assertEqual(self.contexts.resyncs, 1)
+        self.assertEqual(self.neoai.requests, [])
+
+    def test_edits_against_another_version_ask_for_a_resync(self):
+        self.send(autocomplete({"order": ["a"], "edits": [{"cell": "a", "text": "ab"}], "cell": "a", "cursor": 2, "version": 1}))
+        edit = {"cell": "a", "offset": 2, "delete": 0, "insert": "c"}
+        # An edit overtaken by the next one is not applied twice.
+        overtaking = self.send(autocomplete({"edits": [edit], "cell": "a", "cursor": 3, "base": 2, "version": 3}))
+        self.assertEqual(overtaking, RESYNC)
+        self.send(autocomplete({"edits": [edit], "cell": "a", "cursor": 3, "base": 1, "version": 2}))
+        self.assertEqual(self.sent()["before"], "abc")
+        # Starting over needs no base.
+        self.send(autocomplete({"order": ["a"], "edits": [{"cell": "a", "text": "xy"}], "cell": "a", "cursor": 1, "version": 4}))
+        self.assertEqual(self.sent()["before"], "x")
+
+    def test_requests_without_context_pass_through(self):
+        request = {"version": "1.0.7", "request": {"Prefetch": {"filename": "a.ipynb"}}}
+        self.send(request)
+        self.assertIs(self.neoai.requests[-1], request)
+
+
+if __name__ == "__main__":
+    unittest.main()
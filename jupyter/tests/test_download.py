@@ -0,0 +1,113 @@
+import hashlib
+import os
+import tempfile
+import threading
+import unittest
+import zipfile
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from jupyter_neoai.download import SecurityException, download, extract_member
+
+_BINARY = os.urandom(3 * 1024 * 1024 + 17)
+
+
+def _make_archive():
+    path = os.path.join(tempfile.mkdtemp(), "NeoAi.zip")
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("NeoAi", _BINARY)
+        zf.writestr("README", b"not the binary")
+    with open(path, "rb") as f:
+        return f.read()
+
+
+_ARCHIVE = _make_archive()
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    """Serves the fixture archive, honouring single ``bytes=N-`` ranges."""
+
+    requested_ranges = []
+
+    def do_GET(self):
+        range_header = self.headers.get("Range")
+        self.requested_ranges.append(range_header)
+        if range_header:
+            start = int(range_header[len("bytes="):].rstrip("-"))
+            if start >= len(_ARCHIVE):
+                self.send_response(416)
+                self.end_headers()
+                return
+            self.send_response(206)
+            body = _ARCHIVE[start:]
+        else:
+            self.send_response(200)
+            body = _ARCHIVE
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestDownload(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(("127.0.0.1", 0), _RangeHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/NeoAi.zip"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        _RangeHandler.requested_ranges = []
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "NeoAi.zip.part")
+
+    def test_download_hashes_while_streaming(self):
+        checksum = download(self.url, self.path, hashlib.sha256(_ARCHIVE).hexdigest())
+
+        self.assertEqual(checksum, hashlib.sha256(_ARCHIVE).hexdigest())
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), _ARCHIVE)
+        self.assertEqual(_RangeHandler.requested_ranges, [None])
+
+    def test_download_resumes_partial_file(self):
+        with open(self.path, "wb") as f:
+            f.write(_ARCHIVE[:1000])
+
+        download(self.url, self.path, hashlib.sha256(_ARCHIVE).hexdigest())
+
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), _ARCHIVE)
+        self.assertEqual(_RangeHandler.requested_ranges, ["bytes=1000-"])
+
+    def test_download_of_complete_partial_file(self):
+        with open(self.path, "wb") as f:
+            f.write(_ARCHIVE)
+
+        download(self.url, self.path, hashlib.sha256(_ARCHIVE).hexdigest())
+
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), _ARCHIVE)
+
+    def test_checksum_mismatch_removes_file(self):
+        with self.assertRaises(SecurityException):
+            download(self.url, self.path, "0" * 64)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_extract_member_only_extracts_executable(self):
+        download(self.url, self.path)
+
+        path = extract_member(self.path, "NeoAi", self.dir)
+
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), _BINARY)
+        self.assertFalse(os.path.exists(os.path.join(self.dir, "README")))
+
+
+if __name__ == "__main__":
+    unittest.main()
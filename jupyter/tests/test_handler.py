@@ -0,0 +1,198 @@
+import asyncio
+import json
+import os
+import unittest
+from unittest import mock
+from urllib.parse import quote
+
+from tornado import web
+from tornado.testing import AsyncHTTPTestCase, gen_test
+from tornado.websocket import websocket_connect
+
+from jupyter_neoai.handler import NeoaiBatchHandler, NeoaiHandler, NeoaiWebSocketHandler
+from jupyter_neoai.pool import READY, NeoaiPool
+
+MOCK_BINARY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools", "mock_neoai.py")
+
+REQUEST = {
+    "version": "1.0.7",
+    "request": {"Autocomplete": {"filename": "a.ipynb", "before": "df.gr & x = 1", "after": ""}},
+}
+
+
+class RecordingNeoai:
+    def __init__(self):
+        self.requests = []
+        self.response = {"old_prefix": "gr", "results": [{"new_prefix": "groupby"}]}
+
+    async def request(self, request, session=None):
+        self.requests.append((request, session))
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+
+def authenticated(handler_class):
+    """Lets every request in, as a logged in user would be."""
+    return type(handler_class.__name__, (handler_class,), {"get_current_user": lambda self: "user"})
+
+
+class TestNeoaiHandler(AsyncHTTPTestCase):
+    def get_app(self):
+        self.neoai = RecordingNeoai()
+        return web.Application([(r"/neoai", authenticated(NeoaiHandler), {"neoai": self.neoai})])
+
+    def get(self, query):
+        return self.fetch(f"/neoai?{query}")
+
+    def assert_answered(self, response, session):
+        self.assertEqual(response.code, 200)
+        self.assertEqual(json.loads(response.body)["results"], [{"new_prefix": "groupby"}])
+        self.assertEqual(self.neoai.requests[-1], (REQUEST, session))
+
+    def test_get_with_data_before_session(self):
+        self.assert_answered(self.get(f"data={quote(json.dumps(REQUEST))}&session=cell-1"), "cell-1")
+
+    def test_get_with_session_before_data(self):
+        self.assert_answered(self.get(f"session=cell-1&data={quote(json.dumps(REQUEST))}"), "cell-1")
+
+    def test_get_with_form_encoded_data(self):
+        # What jQuery's $.get sends: spaces as "+".
+        data = quote(json.dumps(REQUEST), safe="").replace("%20", "+")
+        self.assert_answered(self.get(f"data={data}&session=cell-1"), "cell-1")
+
+    def test_get_with_the_request_as_only_parameter(self):
+        self.assert_answered(self.get(f"data={quote(json.dumps(REQUEST))}"), None)
+        self.assert_answered(self.get(f"request={quote(json.dumps(REQUEST))}"), None)
+
+    def test_get_without_data(self):
+        self.assertEqual(self.get("session=cell-1").code, 400)
+        self.assertEqual(self.get("data=%7B").code, 400)
+
+    def test_requests_must_be_objects(self):
+        for data in (
+            "[1]",
+            "null",
+            '"Autocomplete"',
+            "{}",
+            '{"request": "x"}',
+            '{"request": {"Autocomplete": "x"}}',
+            '{"request": {"Autocomplete": {"before": 1}}}',
+            '{"request": {"Autocomplete": {"before": "x", "after": null}}}',
+        ):
+            self.assertEqual(self.get(f"data={quote(data)}").code, 400)
+            self.assertEqual(self.fetch("/neoai", method="POST", body=data).code, 400)
+        self.assertEqual(self.neoai.requests, [])
+
+    def test_no_response_is_an_empty_object(self):
+        self.neoai.response = None
+        for response in (
+            self.get(f"data={quote(json.dumps(REQUEST))}"),
+            self.fetch("/neoai", method="POST", body=json.dumps(REQUEST)),
+        ):
+            self.assertEqual(response.code, 200)
+            self.assertEqual(json.loads(response.body), {})
+
+    def test_post(self):
+        response = self.fetch("/neoai?session=cell-1", method="POST", body=json.dumps(REQUEST))
+        self.assert_answered(response, "cell-1")
+
+
+class TestNeoaiWebSocketHandler(AsyncHTTPTestCase):
+    def get_app(self):
+        self.neoai = RecordingNeoai()
+        return web.Application([(r"/neoai/ws", authenticated(NeoaiWebSocketHandler), {"neoai": self.neoai})])
+
+    async def exchange(self, message):
+        connection = await websocket_connect(self.get_url("/neoai/ws").replace("http", "ws", 1))
+        try:
+            connection.write_message(json.dumps(message))
+            return json.loads(await connection.read_message())
+        finally:
+            connection.close()
+
+    @gen_test
+    async def test_answers_with_the_request_id(self):
+        answer = await self.exchange({"id": 1, "session": "cell-1", "request": REQUEST})
+        self.assertEqual(answer["id"], 1)
+        self.assertEqual(answer["response"]["results"], [{"new_prefix": "groupby"}])
+
+    @gen_test
+    async def test_a_failed_request_is_answered_with_null(self):
+        self.neoai.response = RuntimeError("boom")
+        with self.assertLogs(level="ERROR"):
+            answer = await self.exchange({"id": 1, "request": REQUEST})
+        self.assertEqual(answer, {"id": 1, "response": None})
+
+
+class TestNeoaiBatchHandler(AsyncHTTPTestCase):
+    """Sends batches to a pool of one ``tools/mock_neoai.py``."""
+
+    def setUp(self):
+        env = mock.patch.dict(os.environ, {"NEOAI_MOCK_LATENCY": "60", "NEOAI_MOCK_JITTER": "0"})
+        env.start()
+        self.addCleanup(env.stop)
+        super().setUp()
+
+    def get_app(self):
+        self.pool = NeoaiPool(
+            size=1,
+            max_queue_depth=8,
+            request_timeout=1.0,
+            hot_standby=False,
+            health_check_interval=0,
+            binary_path=MOCK_BINARY,
+        )
+        handler = authenticated(NeoaiBatchHandler)
+        return web.Application(
+            [
+                (r"/neoai/batch", handler, {"neoai": self.pool, "timeout": 10.0}),
+                (r"/neoai/batch/short", handler, {"neoai": self.pool, "timeout": 0.1}),
+            ]
+        )
+
+    def tearDown(self):
+        self.pool.close()
+        for worker in self.pool.workers():
+            if worker._reader is not None:
+                self.io_loop.run_sync(lambda: worker._reader)
+        super().tearDown()
+
+    def wait_until_ready(self):
+        async def ready():
+            while self.pool.state != READY:
+                await asyncio.sleep(0.01)
+
+        self.io_loop.run_sync(ready, timeout=10)
+
+    def batch(self, path, words):
+        requests = [
+            {"version": "1.0.7", "request": {"Autocomplete": {"filename": "a.ipynb", "before": f"x.{word}"}}}
+            for word in words
+        ]
+        body = json.dumps({"requests": requests})
+        response = self.fetch(path, method="POST", body=body, request_timeout=20)
+        self.assertEqual(response.code, 200)
+        return json.loads(response.body)["results"]
+
+    def test_batch_larger_than_the_queue_depth(self):
+        self.wait_until_ready()
+        words = [f"w{i}" for i in range(20)]
+        # 20 answers take 1.2 s, longer than the request timeout of each.
+        results = self.batch("/neoai/batch", words)
+        self.assertEqual([result and result["old_prefix"] for result in results], words)
+
+    def test_batch_with_a_malformed_request_is_rejected(self):
+        requests = [REQUEST, {"version": "1.0.7", "request": {"Autocomplete": {"before": 1}}}]
+        response = self.fetch("/neoai/batch", method="POST", body=json.dumps({"requests": requests}))
+        self.assertEqual(response.code, 400)
+
+    def test_batch_gets_null_for_requests_past_its_deadline(self):
+        self.wait_until_ready()
+        results = self.batch("/neoai/batch/short", [f"w{i}" for i in range(5)])
+        self.assertEqual(results[0]["old_prefix"], "w0")
+        self.assertEqual(results[2:], [None] * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
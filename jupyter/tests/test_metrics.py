@@ -0,0 +1,54 @@
+import unittest
+from types import SimpleNamespace
+
+from jupyter_neoai.metrics import Metrics, render, request_type
+
+
+def _autocomplete():
+    return {"request": {"Autocomplete": {"filename": "a.py", "before": "x"}}}
+
+
+class TestMetrics(unittest.TestCase):
+    def _render(self, metrics):
+        worker = SimpleNamespace(
+            queue_depth=3,
+            pid=None,
+            stats=lambda: {"starts": 2, "crashes": 1, "failovers": 1},
+        )
+        pool = SimpleNamespace(state="ready", workers=lambda: [worker])
+        singleflight = SimpleNamespace(requests=4, coalesced=1)
+        cache = SimpleNamespace(hits=2, prefix_hits=1, misses=1)
+        return render(metrics, pool, singleflight, cache).splitlines()
+
+    def test_histogram_buckets_are_cumulative(self):
+        metrics = Metrics()
+        for seconds in (0.003, 0.02, 0.02, 7.0):
+            metrics.observe_request(_autocomplete(), seconds)
+        lines = self._render(metrics)
+        self.assertIn('neoai_request_duration_seconds_bucket{type="Autocomplete",le="0.005"} 1', lines)
+        self.assertIn('neoai_request_duration_seconds_bucket{type="Autocomplete",le="0.025"} 3', lines)
+        self.assertIn('neoai_request_duration_seconds_bucket{type="Autocomplete",le="5.0"} 3', lines)
+        self.assertIn('neoai_request_duration_seconds_bucket{type="Autocomplete",le="+Inf"} 4', lines)
+        self.assertIn('neoai_request_duration_seconds_count{type="Autocomplete"} 4', lines)
+
+    def test_counters_and_gauges(self):
+        metrics = Metrics()
+        metrics.error("timeout")
+        metrics.error("timeout")
+        metrics.bytes_written += 10
+        lines = self._render(metrics)
+        self.assertIn('neoai_errors_total{kind="timeout"} 2', lines)
+        self.assertIn("neoai_ipc_bytes_written_total 10", lines)
+        self.assertIn('neoai_queue_depth{worker="0"} 3', lines)
+        self.assertIn('neoai_binary_crashes_total{worker="0"} 1', lines)
+        self.assertIn("neoai_cache_hit_ratio 0.75", lines)
+        self.assertIn("# TYPE neoai_cache_hit_ratio gauge", lines)
+
+    def test_unknown_request_types_share_a_series(self):
+        self.assertEqual(request_type(_autocomplete()), "Autocomplete")
+        self.assertEqual(request_type({"request": {"Anything": {}}}), "other")
+        self.assertEqual(request_type({}), "other")
+
+
+if __name__ == "__main__":
+    unittest.main()
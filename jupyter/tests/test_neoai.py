@@ -0,0 +1,211 @@
+import asyncio
+import os
+import signal
+import unittest
+from unittest import mock
+
+from jupyter_neoai.neoai import Neoai
+from jupyter_neoai.singleflight import SingleFlight
+
+MOCK_BINARY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools", "mock_neoai.py")
+
+
+def autocomplete(before, filename="a.ipynb"):
+    return {
+        "version": "1.0.7",
+        "request": {
+            "Autocomplete": {
+                "filename": filename,
+                "before": before,
+                "after": "",
+                "region_includes_beginning": True,
+                "region_includes_end": True,
+                "max_num_results": 5,
+            }
+        },
+    }
+
+
+class TestNeoai(unittest.TestCase):
+    """Drives ``Neoai`` against ``tools/mock_neoai.py``."""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        env = mock.patch.dict(os.environ, {"NEOAI_MOCK_LATENCY": "100", "NEOAI_MOCK_JITTER": "0"})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def neoai(self, request_timeout=2.0, hot_standby=False, health_check_interval=0, stall_timeout=10.0):
+        async def create():
+            # Neoai binds to the loop it is created on.
+            return Neoai(
+                request_timeout=request_timeout,
+                stall_timeout=stall_timeout,
+                hot_standby=hot_standby,
+                health_check_interval=health_check_interval,
+                binary_path=MOCK_BINARY,
+            )
+
+        neoai = self.run_until_complete(create())
+        launched = []
+        launch = neoai._supervisor._launch
+
+        async def record():
+            result = await launch()
+            if result is not None:
+                launched.append(result[0])
+            return result
+
+        neoai._supervisor._launch = record
+        self.addCleanup(self.stop, neoai, launched)
+        self.assertTrue(self.run_until_complete(neoai.spawn()))
+        self.assertTrue(self.run_until_complete(neoai.wait_until_warm(10)))
+        return neoai
+
+    def stop(self, neoai, launched):
+        neoai.close()
+
+        async def reap():
+            # Standbys and replaced binaries included, wedged ones killed.
+            for proc in launched:
+                try:
+                    await asyncio.wait_for(proc.wait(), 1)
+                except asyncio.TimeoutError:
+                    proc.kill()
+                    await proc.wait()
+
+        self.run_until_complete(reap())
+        self.run_until_complete(neoai._reader)
+
+    def run_until_complete(self, future):
+        return self.loop.run_until_complete(future)
+
+    async def wait_for(self, condition, timeout=10):
+        deadline = self.loop.time() + timeout
+        while not condition():
+            self.assertLess(self.loop.time(), deadline)
+            await asyncio.sleep(0.01)
+
+    def word(self, response):
+        return response["old_prefix"] if response else response
+
+    def test_answers_in_order(self):
+        neoai = self.neoai()
+
+        async def send():
+            return await asyncio.gather(*(neoai.request(autocomplete(f"x.{w}")) for w in ("a", "bb", "ccc")))
+
+        responses = self.run_until_complete(send())
+        self.assertEqual([self.word(r) for r in responses], ["a", "bb", "ccc"])
+        self.assertEqual(neoai.queue_depth, 0)
+
+    def test_a_newer_request_of_the_session_replaces_a_queued_one(self):
+        neoai = self.neoai()
+
+        async def type_ahead():
+            # The first two fill the write-ahead window, so the session's
+            # requests wait in the queue.
+            busy = [neoai.request(autocomplete(f"x.{word}")) for word in ("a", "b")]
+            busy = [asyncio.ensure_future(request) for request in busy]
+            await asyncio.sleep(0.01)
+            older = asyncio.ensure_future(neoai.request(autocomplete("x.df"), session="cell"))
+            await asyncio.sleep(0.01)
+            newer = asyncio.ensure_future(neoai.request(autocomplete("x.dfg"), session="cell"))
+            return await asyncio.gather(older, newer, *busy)
+
+        older, newer, *_ = self.run_until_complete(type_ahead())
+        self.assertIsNone(older)
+        self.assertEqual(self.word(newer), "dfg")
+
+    def test_a_timed_out_response_is_consumed_and_not_given_to_the_next_request(self):
+        neoai = self.neoai(request_timeout=0.05)
+        self.assertIsNone(self.run_until_complete(neoai.request(autocomplete("x.stale"))))
+        self.assertEqual(len(neoai._pending), 1)
+
+        neoai._request_timeout = 2.0
+        response = self.run_until_complete(neoai.request(autocomplete("x.fresh")))
+        self.assertEqual(self.word(response), "fresh")
+        self.assertEqual(neoai.queue_depth, 0)
+
+    def test_a_cancelled_request_is_taken_off_the_queue(self):
+        neoai = self.neoai()
+
+        async def cancel_queued():
+            busy = [asyncio.ensure_future(neoai.request(autocomplete(f"x.{w}"))) for w in ("a", "b")]
+            await asyncio.sleep(0.01)
+            queued = asyncio.ensure_future(neoai.request(autocomplete("x.gone"), session="cell"))
+            await asyncio.sleep(0.01)
+            self.assertEqual(neoai.queue_depth, 3)
+            queued.cancel()
+            await asyncio.sleep(0.01)
+            self.assertEqual(neoai.queue_depth, 2)
+            return await asyncio.gather(*busy)
+
+        self.assertEqual([self.word(r) for r in self.run_until_complete(cancel_queued())], ["a", "b"])
+
+    def test_cancelling_every_coalesced_caller_takes_the_request_off_the_queue(self):
+        neoai = self.neoai()
+        singleflight = SingleFlight(neoai)
+
+        async def cancel_coalesced():
+            busy = [asyncio.ensure_future(neoai.request(autocomplete(f"x.{w}"))) for w in ("a", "b")]
+            await asyncio.sleep(0.01)
+            callers = [asyncio.ensure_future(singleflight.request(autocomplete("x.gone"))) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            self.assertEqual(neoai.queue_depth, 3)
+            for caller in callers:
+                caller.cancel()
+            await asyncio.sleep(0.01)
+            self.assertEqual(neoai.queue_depth, 2)
+            return await asyncio.gather(*busy)
+
+        self.assertEqual([self.word(r) for r in self.run_until_complete(cancel_coalesced())], ["a", "b"])
+
+    def test_close_stops_the_binary_and_its_standby(self):
+        neoai = self.neoai(hot_standby=True)
+
+        async def close():
+            while not neoai._supervisor._standby_ready():
+                await asyncio.sleep(0.01)
+            proc, standby = neoai._proc, neoai._supervisor._standby.result()[0]
+            neoai.close()
+            await asyncio.wait_for(asyncio.gather(proc.wait(), standby.wait()), 5)
+            return await neoai.request(autocomplete("x.a"))
+
+        self.assertIsNone(self.run_until_complete(close()))
+        self.assertIsNone(neoai.pid)
+
+    def test_a_crash_switches_to_the_standby(self):
+        neoai = self.neoai(hot_standby=True)
+
+        async def crash():
+            await self.wait_for(neoai._supervisor._standby_ready)
+            crashed, standby = neoai._proc, neoai._supervisor._standby.result()[0]
+            crashed.kill()
+            await self.wait_for(lambda: neoai._proc is standby)
+            return await neoai.request(autocomplete("x.after"))
+
+        self.assertEqual(self.word(self.run_until_complete(crash())), "after")
+        stats = neoai.stats()
+        self.assertEqual((stats["crashes"], stats["failovers"]), (1, 1))
+        # From noticing the crash to the standby taking over, well below a cold start.
+        self.assertLess(stats["failover_latency"], 0.1)
+
+    def test_the_health_probe_restarts_a_wedged_binary(self):
+        neoai = self.neoai(health_check_interval=0.1, stall_timeout=0.5)
+        wedged = neoai._proc
+        os.kill(wedged.pid, signal.SIGSTOP)
+
+        async def recover():
+            await self.wait_for(lambda: neoai._proc not in (None, wedged))
+            return await neoai.request(autocomplete("x.after"))
+
+        self.assertEqual(self.word(self.run_until_complete(recover())), "after")
+        self.assertEqual(neoai.stats()["crashes"], 1)
+        # The new binary had to start and answer its warm-up first.
+        self.assertGreaterEqual(neoai.stats()["failover_latency"], 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import json
+import unittest
+
+from jupyter_neoai.serializer import RawResponse, Serializer, orjson, response_bytes
+
+REQUEST = {
+    "version": "1.0.7",
+    "request": {"Autocomplete": {"filename": "a.ipynb", "before": "print('ü\U0001F600", "after": ")\n", "max_num_results": 5}},
+}
+
+
+class SerializerTests:
+    def test_encodes_envelopes_as_json_lines(self):
+        line = self.serializer.encode(REQUEST)
+        self.assertTrue(line.endswith(b"\n"))
+        self.assertEqual(line.count(b"\n"), 1)
+        self.assertEqual(json.loads(line), REQUEST)
+        self.assertEqual(self.serializer.encode_request(REQUEST["request"], "1.0.7"), line)
+
+    def test_encodes_other_messages(self):
+        for message in ({"version": "1.0.7"}, {"request": {}, "context": {}}, [1, 2]):
+            self.assertEqual(json.loads(self.serializer.encode(message)), message)
+
+    def test_encodes_integers_beyond_64_bits(self):
+        message = {"version": "1.0.7", "request": {"n": 2**70}}
+        self.assertEqual(json.loads(self.serializer.encode(message)), message)
+
+    def test_decodes_lines(self):
+        self.assertEqual(self.serializer.decode(b'{"results": []}\n'), {"results": []})
+        with self.assertRaises(ValueError):
+            self.serializer.decode(b'{"results": \n')
+
+    def test_passes_responses_through(self):
+        line = b'{"old_prefix": "df.", "results": [{"new_prefix": "df.head()"}]}\n'
+        response = self.serializer.decode_response(line)
+        self.assertIsInstance(response, RawResponse)
+        self.assertIs(response_bytes(response), line)
+        self.assertTrue(response)
+        self.assertEqual(response["results"][0]["new_prefix"], "df.head()")
+        self.assertEqual(dict(response, old_prefix="df.h")["old_prefix"], "df.h")
+
+    def test_rejects_responses_that_are_not_objects(self):
+        for line in (b"", b"null\n", b"[]\n", b'{"results": [\n'):
+            with self.assertRaises(ValueError):
+                self.serializer.decode_response(line)
+        self.assertFalse(self.serializer.decode_response(b"{}\n"))
+
+    def test_parses_responses_without_passthrough(self):
+        serializer = Serializer(use_orjson=self.serializer.backend == "orjson", passthrough=False)
+        self.assertEqual(serializer.decode_response(b'{"results": []}\n'), {"results": []})
+
+
+class TestJsonSerializer(SerializerTests, unittest.TestCase):
+    def setUp(self):
+        self.serializer = Serializer(use_orjson=False)
+        self.assertEqual(self.serializer.backend, "json")
+
+
+@unittest.skipIf(orjson is None, "orjson is not installed")
+class TestOrjsonSerializer(SerializerTests, unittest.TestCase):
+    def setUp(self):
+        self.serializer = Serializer()
+        self.assertEqual(self.serializer.backend, "orjson")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import asyncio
+import unittest
+
+from jupyter_neoai.pool import routing_key
+from jupyter_neoai.singleflight import SingleFlight, request_key
+
+
+class GatedNeoai:
+    """Answers each request once ``release`` is called."""
+
+    def __init__(self):
+        self.requests = []
+        self.cancelled = []
+        self.gate = None
+
+    async def request(self, request, session=None, deadline=None):
+        self.requests.append(request)
+        try:
+            await asyncio.shield(self.gate)
+        except asyncio.CancelledError:
+            self.cancelled.append(request)
+            raise
+        return {"results": [{"new_prefix": request["request"].get("Autocomplete", {}).get("before")}]}
+
+    def release(self):
+        self.gate.set_result(None)
+
+
+def autocomplete(before, filename="a.ipynb"):
+    return {
+        "version": "1.0.7",
+        "request": {
+            "Autocomplete": {
+                "filename": filename,
+                "before": before,
+                "after": "",
+                "region_includes_beginning": True,
+                "region_includes_end": True,
+                "max_num_results": 5,
+            }
+        },
+    }
+
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.neoai = GatedNeoai()
+        self.neoai.gate = self.loop.create_future()
+        self.singleflight = SingleFlight(self.neoai)
+
+    def run_until_complete(self, future):
+        return self.loop.run_until_complete(future)
+
+    def start(self, request, session=None):
+        task = self.loop.create_task(self.singleflight.request(request, session=session))
+        self.run_until_complete(asyncio.sleep(0))
+        return task
+
+    def test_identical_requests_share_one_call(self):
+        first = self.start(autocomplete("df.gr"), session="a")
+        second = self.start(autocomplete("df.gr"), session="b")
+        self.neoai.release()
+        responses = self.run_until_complete(asyncio.gather(first, second))
+        self.assertEqual(len(self.neoai.requests), 1)
+        self.assertIs(responses[0], responses[1])
+        self.assertEqual((self.singleflight.requests, self.singleflight.coalesced), (2, 1))
+
+    def test_different_requests_are_sent_separately(self):
+        first = self.start(autocomplete("df.gr"))
+        second = self.start(autocomplete("df.gro"))
+        third = self.start(autocomplete("df.gr", filename="b.ipynb"))
+        self.neoai.release()
+        self.run_until_complete(asyncio.gather(first, second, third))
+        self.assertEqual(len(self.neoai.requests), 3)
+        self.assertEqual(self.singleflight.coalesced, 0)
+
+    def test_a_finished_call_is_not_reused(self):
+        self.neoai.release()
+        self.run_until_complete(self.singleflight.request(autocomplete("df.gr")))
+        self.run_until_complete(self.singleflight.request(autocomplete("df.gr")))
+        self.assertEqual(len(self.neoai.requests), 2)
+
+    def test_other_requests_pass_through(self):
+        self.neoai.release()
+        request = {"version": "1.0.7", "request": {"Features": {}}}
+        self.assertIsNone(request_key(request))
+        self.run_until_complete(self.singleflight.request(request))
+        self.run_until_complete(self.singleflight.request(request))
+        self.assertEqual(len(self.neoai.requests), 2)
+        self.assertEqual(self.singleflight.requests, 0)
+
+    def test_malformed_requests_have_no_key(self):
+        for request in (
+            {"request": "x"},
+            {"request": ["Autocomplete"]},
+            {"request": {"Autocomplete": "x"}},
+            {"request": {"Autocomplete": {"filename": "a.ipynb", "before": 1}}},
+        ):
+            self.assertIsNone(request_key(request))
+        self.assertIsNone(routing_key({"request": "x"}))
+        self.assertEqual(routing_key(autocomplete("df.gr")), "a.ipynb")
+
+    def test_a_cancelled_caller_leaves_the_call_to_the_others(self):
+        first = self.start(autocomplete("df.gr"))
+        second = self.start(autocomplete("df.gr"))
+        first.cancel()
+        self.neoai.release()
+        self.assertTrue(self.run_until_complete(second)["results"])
+        self.assertTrue(first.cancelled())
+        self.assertEqual(self.neoai.cancelled, [])
+
+    def test_the_last_caller_going_away_cancels_the_call(self):
+        first = self.start(autocomplete("df.gr"))
+        second = self.start(autocomplete("df.gr"))
+        first.cancel()
+        second.cancel()
+        self.run_until_complete(asyncio.sleep(0))
+        self.assertEqual(self.neoai.cancelled, [autocomplete("df.gr")])
+
+        # An identical request afterwards is sent again.
+        third = self.start(autocomplete("df.gr"))
+        self.neoai.release()
+        self.assertTrue(self.run_until_complete(third)["results"])
+        self.assertEqual(len(self.neoai.requests), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
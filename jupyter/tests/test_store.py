@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from jupyter_neoai.store import BinaryStore
+
+
+class TestBinaryStoreGarbageCollection(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.installs = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.installs, True)
+        self.store = BinaryStore(self.root)
+
+    def stored(self, checksum):
+        path = os.path.join(self.root, "sha256", checksum, "NeoAi")
+        os.makedirs(os.path.dirname(path))
+        with open(path, "w") as f:
+            f.write(checksum)
+        return path
+
+    def partial(self, key, age):
+        path = os.path.join(self.root, "partial", key)
+        os.makedirs(path)
+        part = os.path.join(path, "NeoAi.zip.part")
+        with open(part, "w") as f:
+            f.write("PK")
+        mtime = time.time() - age
+        os.utime(part, (mtime, mtime))
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_unreferenced_binaries_are_removed(self):
+        unused = self.stored("a" * 64)
+        linked = self.stored("b" * 64)
+        os.link(linked, os.path.join(self.installs, "NeoAi"))
+        self.store.collect_garbage()
+        self.assertFalse(os.path.exists(os.path.dirname(unused)))
+        self.assertTrue(os.path.isfile(linked))
+
+    def test_binaries_kept_installs_resolve_to_stay(self):
+        symlinked = self.stored("a" * 64)
+        install = os.path.join(self.installs, "NeoAi")
+        os.symlink(symlinked, install)
+        self.store.collect_garbage(keep=[install])
+        self.assertTrue(os.path.isfile(symlinked))
+        self.store.collect_garbage()
+        self.assertFalse(os.path.exists(symlinked))
+
+    def test_abandoned_downloads_are_removed(self):
+        old = self.partial("a" * 64, age=2 * 24 * 3600)
+        fresh = self.partial("b" * 64, age=60)
+        self.store.collect_garbage()
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.isdir(fresh))
+
+    def test_locks_of_removed_entries_are_removed(self):
+        self.stored("a" * 64)
+        self.partial("b" * 64, age=60)
+        self.store.collect_garbage()
+        locks = os.path.join(self.root, "locks")
+        self.assertEqual(os.listdir(locks), ["b" * 64 + ".lock"])
+
+    def test_materialize_fails_once_collected(self):
+        path = self.stored("a" * 64)
+        self.store.collect_garbage()
+        with self.assertRaises(FileNotFoundError):
+            self.store.materialize(path, os.path.join(self.installs, "NeoAi"))
+        self.assertEqual(os.listdir(self.installs), [])
+
+    def test_materialized_binaries_survive_collection(self):
+        path = self.stored("a" * 64)
+        install = os.path.join(self.installs, "NeoAi")
+        self.store.materialize(path, install)
+        self.store.collect_garbage(keep=[install])
+        self.assertTrue(os.path.isfile(path))
+        with open(install) as f:
+            self.assertEqual(f.read(), "a" * 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,23 @@
+import unittest
+
+from jupyter_neoai.supervisor import Backoff
+
+
+class TestBackoff(unittest.TestCase):
+    def test_delays_grow_up_to_the_cap(self):
+        backoff = Backoff(base=1.0, cap=8.0, reset_after=60.0)
+        delays = [backoff.next_delay(uptime=1.0) for _ in range(7)]
+        self.assertEqual(delays[0], 0.0)
+        for delay, limit in zip(delays[1:], [1, 2, 4, 8, 8, 8]):
+            self.assertGreaterEqual(delay, limit / 2)
+            self.assertLessEqual(delay, limit)
+
+    def test_a_healthy_run_resets_the_sequence(self):
+        backoff = Backoff(base=1.0, cap=8.0, reset_after=60.0)
+        backoff.next_delay(uptime=1.0)
+        self.assertGreater(backoff.next_delay(uptime=1.0), 0.0)
+        self.assertEqual(backoff.next_delay(uptime=120.0), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
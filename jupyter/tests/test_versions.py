@@ -0,0 +1,126 @@
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from jupyter_neoai.store import BinaryStore
+from jupyter_neoai.versions import ACTIVE_FILE, BinaryVersions
+
+
+class _VersionHandler(BaseHTTPRequestHandler):
+    """Serves ``latest`` as the version, answering 304 to a matching ETag."""
+
+    latest = "1.0.0"
+    requests = []
+
+    def do_GET(self):
+        etag = f'"{self.latest}"'
+        self.requests.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = self.latest.encode("UTF-8")
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestBinaryVersions(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(("127.0.0.1", 0), _VersionHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/version"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        _VersionHandler.latest = "1.0.0"
+        _VersionHandler.requests = []
+        self.binary_dir = tempfile.mkdtemp()
+        self.installed = []
+
+    def _install(self, version):
+        self.installed.append(version)
+        path = os.path.join(self.binary_dir, version, "NeoAi")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(version)
+
+    def _versions(self, check_ttl=3600, keep=2):
+        return BinaryVersions(self.binary_dir, "NeoAi", self.url, self._install, check_ttl, keep)
+
+    def test_install_latest_activates_it(self):
+        versions = self._versions()
+        self.assertIsNone(versions.path())
+        path = versions.install_latest()
+        self.assertEqual(path, os.path.join(self.binary_dir, "1.0.0", "NeoAi"))
+        self.assertEqual(versions.active_version(), "1.0.0")
+        self.assertTrue(os.access(path, os.X_OK))
+
+    def test_path_follows_active_file(self):
+        self._install("1.0.0")
+        self._install("2.0.0")
+        versions = self._versions()
+        self.assertTrue(versions.path().endswith(os.path.join("2.0.0", "NeoAi")))
+        versions.activate("1.0.0")
+        self.assertTrue(versions.path().endswith(os.path.join("1.0.0", "NeoAi")))
+        # Another process switching versions is noticed as well.
+        with open(os.path.join(self.binary_dir, ACTIVE_FILE), "w") as f:
+            f.write("2.0.0")
+        os.utime(os.path.join(self.binary_dir, ACTIVE_FILE), ns=(0, 10 ** 18))
+        self.assertTrue(versions.path().endswith(os.path.join("2.0.0", "NeoAi")))
+
+    def test_update_stages_activates_and_collects(self):
+        versions = self._versions(check_ttl=0, keep=2)
+        versions.install_latest()
+        self.assertFalse(versions.update())
+
+        for latest in ("1.1.0", "1.2.0"):
+            _VersionHandler.latest = latest
+            self.assertTrue(versions.update())
+            self.assertEqual(versions.active_version(), latest)
+
+        self.assertEqual(versions.installed_versions(), ["1.2.0", "1.1.0"])
+        self.assertEqual(self.installed, ["1.0.0", "1.1.0", "1.2.0"])
+
+    def test_update_collects_binaries_of_removed_versions_from_the_store(self):
+        store = BinaryStore(tempfile.mkdtemp())
+
+        def install(version):
+            path = os.path.join(store.root, "sha256", version, "NeoAi")
+            os.makedirs(os.path.dirname(path))
+            with open(path, "w") as f:
+                f.write(version)
+            store.materialize(path, os.path.join(self.binary_dir, version, "NeoAi"))
+
+        versions = BinaryVersions(self.binary_dir, "NeoAi", self.url, install, check_ttl=0, keep=2, store=store)
+        versions.install_latest()
+        for latest in ("1.1.0", "1.2.0"):
+            _VersionHandler.latest = latest
+            versions.update()
+
+        self.assertEqual(sorted(os.listdir(os.path.join(store.root, "sha256"))), ["1.1.0", "1.2.0"])
+
+    def test_version_check_is_conditional_and_cached(self):
+        versions = self._versions(check_ttl=3600)
+        self.assertEqual(versions.latest_version(), "1.0.0")
+        self.assertEqual(versions.latest_version(), "1.0.0")
+        self.assertEqual(len(_VersionHandler.requests), 1)
+
+        self.assertEqual(versions.latest_version(force=True), "1.0.0")
+        self.assertEqual(_VersionHandler.requests, [None, '"1.0.0"'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Measures the request bytes sent per keystroke with the full context the
+frontend assembles and with the versioned edits the server's notebook
+index expands:
+
+    python tools/bench_context.py --cells 30
+
+A snippet is typed one keystroke at a time into a new cell in the middle
+of a synthetic notebook. Every delta request is expanded by
+``NotebookContexts`` and checked against the full request, so the numbers
+compare requests that give the binary the same context.
+"""
+import argparse
+import asyncio
+import json
+
+from jupyter_neoai.context import NotebookContexts
+
+# Lines of context around the cursor, as N_LINES_BEFORE/N_LINES_AFTER in main.js.
+_LINES = 50
+
+_CELL = (
+    "import numpy as np\n"
+    "values = np.random.default_rng({0}).normal(size=1000)\n"
+    "mean_{0} = values.mean()\n"
+    "# spread of sample {0}\n"
+    "std_{0} = values.std()\n"
+    "print(f'{{mean_{0}:.3f}} +/- {{std_{0}:.3f}}')"
+)
+
+_SNIPPET = (
+    "import pandas as pd\n"
+    "df = pd.read_csv('data.csv')\n"
+    "summary = df.groupby('category').agg({'value': ['mean', 'sum']})\n"
+    "for name, group in df.groupby('category'):\n"
+    "    print(name, group.value.describe())"
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cells", type=int, default=20, help="cells in the notebook")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args(argv)
+
+
+class _Backend:
+    async def request(self, request, session=None, deadline=None):
+        return request["request"]["Autocomplete"]
+
+
+class Client:
+    """
+    The requests main.js sends for a notebook, with and without the index.
+    """
+
+    def __init__(self, order, cells):
+        self.order = order
+        self.cells = cells
+        self.sent_order = None
+        self.sent_cells = {}
+        self.base = None
+        self.versions = 0
+
+    def full_request(self, cell, cursor):
+        position = self.order.index(cell)
+        text = self.cells[cell]
+        before = []
+        for other in self.order[:position]:
+            before.extend(self.cells[other].split("\n"))
+        before.extend(text[:cursor].split("\n"))
+        after = text[cursor:].split("\n")
+        for other in self.order[position + 1 :]:
+            after.extend(self.cells[other].split("\n"))
+        # The line with the cursor is skipped as a whole when it is not code.
+        if _is_code(before[-1] + after[0]):
+            before = [line for line in before[:-1] if _is_code(line)] + before[-1:]
+            after = after[:1] + [line for line in after[1:] if _is_code(line)]
+        else:
+            before = [line for line in before[:-1] if _is_code(line)]
+            after = [line for line in after[1:] if _is_code(line)]
+        return {
+            "version": "1.0.7",
+            "request": {
+                "Autocomplete": {
+                    "filename": "bench.ipynb",
+                    "before": "\n".join(before[-_LINES:]),
+                    "after": "\n".join(after[:_LINES]),
+                    "region_includes_beginning": len(before) <= _LINES,
+                    "region_includes_end": len(after) <= _LINES,
+                    "max_num_results": 5,
+                }
+            },
+        }
+
+    def delta_request(self, cell, cursor):
+        self.versions += 1
+        context = {
+            "document": "bench.ipynb#1",
+            "cell": cell,
+            "cursor": cursor,
+            "before_lines": _LINES,
+            "after_lines": _LINES,
+            "version": self.versions,
+            "edits": [],
+        }
+        if self.base is not None:
+            context["base"] = self.base
+        self.base = self.versions
+        if self.order != self.sent_order:
+            context["order"] = list(self.order)
+            self.sent_order = list(self.order)
+        for other in self.order:
+            known = self.sent_cells.get(other)
+            text = self.cells[other]
+            if known is None:
+                context["edits"].append({"cell": other, "text": text})
+            elif known != text:
+                context["edits"].append(text_edit(other, known, text))
+            self.sent_cells[other] = text
+        return {
+            "version": "1.0.7",
+            "request": {"Autocomplete": {"filename": "bench.ipynb", "max_num_results": 5}},
+            "context": context,
+        }
+
+
+def text_edit(cell, old, new):
+    common = min(len(old), len(new))
+    start = 0
+    while start < common and old[start] == new[start]:
+        start += 1
+    end = 0
+    while end < common - start and old[len(old) - 1 - end] == new[len(new) - 1 - end]:
+        end += 1
+    return {"cell": cell, "offset": start, "delete": len(old) - start - end, "insert": new[start : len(new) - end]}
+
+
+def _is_code(line):
+    return len(line) > 0 and line[0] != "!"
+
+
+def _size(request):
+    return len(json.dumps(request).encode("utf8"))
+
+
+def run(args):
+    order = [f"cell-{i}" for i in range(args.cells)]
+    cells = {cell: _CELL.format(i) for i, cell in enumerate(order)}
+    order.insert(len(order) // 2, "typed")
+    cells["typed"] = ""
+    client = Client(order, cells)
+    contexts = NotebookContexts(_Backend())
+    loop = asyncio.new_event_loop()
+
+    # The notebook is opened and indexed before typing starts.
+    loop.run_until_complete(contexts.request(client.delta_request("typed", 0)))
+
+    full_bytes = delta_bytes = 0
+    for position in range(1, len(_SNIPPET) + 1):
+        cells["typed"] = _SNIPPET[:position]
+        full = client.full_request("typed", position)
+        delta = client.delta_request("typed", position)
+        expanded = loop.run_until_complete(contexts.request(delta))
+        expected = full["request"]["Autocomplete"]
+        if (expanded.get("before"), expanded.get("after")) != (expected["before"], expected["after"]):
+            raise AssertionError(f"context differs after keystroke {position}")
+        full_bytes += _size(full)
+        delta_bytes += _size(delta)
+    loop.close()
+
+    keystrokes = len(_SNIPPET)
+    return {
+        "cells": args.cells + 1,
+        "keystrokes": keystrokes,
+        "full_bytes_per_keystroke": round(full_bytes / keystrokes, 1),
+        "delta_bytes_per_keystroke": round(delta_bytes / keystrokes, 1),
+        "reduction": round(full_bytes / delta_bytes, 1),
+        "resyncs": contexts.resyncs,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(
+        f"{report['keystrokes']} keystrokes in a notebook of {report['cells']} cells: "
+        f"{report['full_bytes_per_keystroke']} bytes/keystroke with full context, "
+        f"{report['delta_bytes_per_keystroke']} with edits ({report['reduction']}x less)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Times encoding an Autocomplete request for the NeoAi binary and decoding
+its response, per request, at typical context sizes:
+
+    python tools/bench_serializer.py --sizes 1024 4096 32768
+
+``inline`` is what the extension did before the serializer: ``json.dumps``
+of the whole envelope, ``+ "\\n"``, ``encode``, then ``decode`` and
+``json.loads`` of the answer. The other rows are ``Serializer`` with each
+available backend.
+"""
+import argparse
+import json
+import time
+
+from jupyter_neoai.serializer import Serializer, orjson
+
+_LINE = "    frame = frame.assign(total=frame.price * frame.quantity)  # ünits"
+
+_RESULT = {
+    "new_prefix": "frame.groupby('category')",
+    "old_suffix": "",
+    "new_suffix": "",
+    "details": "84%",
+    "completion_metadata": {"kind": "Method", "origin": "CLOUD", "detail": "84%"},
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1024, 4096, 32768], help="context sizes in bytes")
+    parser.add_argument("--results", type=int, default=5, help="completions per response")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds to time each case")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def make_request(size):
+    lines = (size // (len(_LINE) + 1)) or 1
+    before = "\n".join([_LINE] * lines)
+    return {
+        "version": "1.0.7",
+        "request": {
+            "Autocomplete": {
+                "filename": "analysis.ipynb",
+                "before": before[: size * 3 // 4],
+                "after": before[: size // 4],
+                "region_includes_beginning": False,
+                "region_includes_end": False,
+                "max_num_results": 5,
+            }
+        },
+    }
+
+
+def make_response(results):
+    return (json.dumps({"old_prefix": "frame.", "results": [_RESULT] * results, "user_message": []}) + "\n").encode("utf8")
+
+
+def _inline_encode(request):
+    return (json.dumps(request) + "\n").encode("utf8")
+
+
+def _inline_decode(line):
+    return json.loads(line.decode("utf8"))
+
+
+def codecs():
+    yield "inline", _inline_encode, _inline_decode
+    serializer = Serializer(use_orjson=False)
+    yield "json", serializer.encode, serializer.decode
+    if orjson is not None:
+        serializer = Serializer()
+        yield "orjson", serializer.encode, serializer.decode
+
+
+def measure(function, argument, min_time):
+    calls = 0
+    started = time.perf_counter()
+    elapsed = 0.0
+    while calls == 0 or elapsed < min_time:
+        for _ in range(100):
+            function(argument)
+        calls += 100
+        elapsed = time.perf_counter() - started
+    return elapsed / calls
+
+
+def run(args):
+    response = make_response(args.results)
+    rows = []
+    for size in args.sizes:
+        request = make_request(size)
+        for name, encode, decode in codecs():
+            rows.append(
+                {
+                    "codec": name,
+                    "context_bytes": size,
+                    "request_bytes": len(encode(request)),
+                    "encode_us": round(measure(encode, request, args.min_time) * 1e6, 2),
+                    "decode_us": round(measure(decode, response, args.min_time) * 1e6, 2),
+                }
+            )
+    return {"response_bytes": len(response), "results": rows}
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'codec':8} {'context':>8} {'request':>8} {'encode us':>10} {'decode us':>10}")
+    for row in report["results"]:
+        print(
+            f"{row['codec']:8} {row['context_bytes']:8} {row['request_bytes']:8} "
+            f"{row['encode_us']:10} {row['decode_us']:10}"
+        )
+    print(f"decoded responses are {report['response_bytes']} bytes")
+
+
+if __name__ == "__main__":
+    main()
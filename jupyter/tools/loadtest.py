@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Drives simulated notebook sessions against a running ``/neoai`` endpoint
+and reports latency percentiles and throughput:
+
+    python tools/loadtest.py http://localhost:8888 --token <token> --sessions 50
+
+Each session types a snippet of code one keystroke at a time into its own
+notebook, sending an Autocomplete request per keystroke the way the
+frontend does, and pauses ``--think`` milliseconds between keystrokes.
+"""
+import argparse
+import collections
+import http.client
+import json
+import math
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+_SNIPPET = (
+    "import pandas as pd\n"
+    "df = pd.read_csv('data.csv')\n"
+    "summary = df.groupby('category').agg({'value': ['mean', 'sum']})\n"
+    "for name, group in df.groupby('category'):\n"
+    "    print(name, group.value.describe())\n"
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("url", help="base URL of the notebook server, e.g. http://localhost:8888")
+    parser.add_argument("--token", default="", help="notebook server token")
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent notebook sessions")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--think", type=float, default=100.0, help="milliseconds between keystrokes")
+    parser.add_argument("--method", choices=["GET", "POST"], default="POST")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args(argv)
+
+
+class Session(threading.Thread):
+    def __init__(self, index, args, deadline):
+        super().__init__(daemon=True)
+        self.index = index
+        self.args = args
+        self.deadline = deadline
+        self.latencies = []
+        self.empty = 0
+        self.errors = 0
+        self.statuses = collections.Counter()
+        url = urlsplit(args.url)
+        self.secure = url.scheme == "https"
+        self.netloc = url.netloc
+        self.path = url.path.rstrip("/") + "/neoai"
+        self.headers = {"Content-Type": "application/json"}
+        if args.token:
+            self.headers["Authorization"] = f"token {args.token}"
+
+    def run(self):
+        connection_class = http.client.HTTPSConnection if self.secure else http.client.HTTPConnection
+        connection = connection_class(self.netloc, timeout=30)
+        session = f"loadtest-{self.index}"
+        filename = f"loadtest-{self.index}.ipynb"
+        position = 0
+        while time.monotonic() < self.deadline:
+            position = position % len(_SNIPPET) + 1
+            request = {
+                "version": "1.0.7",
+                "request": {
+                    "Autocomplete": {
+                        "filename": filename,
+                        "before": _SNIPPET[:position],
+                        "after": "",
+                        "region_includes_beginning": True,
+                        "region_includes_end": True,
+                        "max_num_results": 5,
+                    }
+                },
+            }
+            started = time.monotonic()
+            try:
+                body = self.send(connection, session, json.dumps(request))
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                connection.close()
+                connection = connection_class(self.netloc, timeout=30)
+                continue
+            if body is None:
+                self.errors += 1
+            else:
+                self.latencies.append(time.monotonic() - started)
+                # No completion (booting, dropped or timed out) comes back as {}.
+                if body.strip() in (b"", b"{}", b"null"):
+                    self.empty += 1
+            time.sleep(self.args.think / 1000)
+        connection.close()
+
+    def send(self, connection, session, data):
+        if self.args.method == "GET":
+            connection.request(
+                "GET",
+                f"{self.path}?data={quote(data, safe='')}&session={quote(session)}",
+                headers=self.headers,
+            )
+        else:
+            connection.request(
+                "POST", f"{self.path}?session={quote(session)}", body=data, headers=self.headers
+            )
+        response = connection.getresponse()
+        body = response.read()
+        if response.status != 200:
+            self.statuses[response.status] += 1
+            return None
+        return body
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def run(args):
+    deadline = time.monotonic() + args.duration
+    started = time.monotonic()
+    sessions = [Session(i, args, deadline) for i in range(args.sessions)]
+    for session in sessions:
+        session.start()
+    for session in sessions:
+        session.join()
+    elapsed = time.monotonic() - started
+
+    latencies = sorted(l for session in sessions for l in session.latencies)
+    return {
+        "sessions": args.sessions,
+        "seconds": round(elapsed, 3),
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "empty_responses": sum(session.empty for session in sessions),
+        "errors": sum(session.errors for session in sessions),
+        "error_statuses": dict(sum((session.statuses for session in sessions), collections.Counter())),
+        "latency_ms": {
+            name: round(value * 1000, 2) if value is not None else None
+            for name, value in (
+                ("p50", percentile(latencies, 50)),
+                ("p95", percentile(latencies, 95)),
+                ("p99", percentile(latencies, 99)),
+                ("max", latencies[-1] if latencies else None),
+            )
+        },
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    latency = report["latency_ms"]
+    print(
+        f"{report['requests']} requests from {report['sessions']} sessions in {report['seconds']}s: "
+        f"{report['requests_per_second']} req/s, {report['empty_responses']} empty, {report['errors']} errors"
+    )
+    if report["error_statuses"]:
+        print("HTTP errors: " + ", ".join(f"{n} x {status}" for status, n in sorted(report["error_statuses"].items())))
+    print(f"latency p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms, max {latency['max']} ms")
+
+
+if __name__ == "__main__":
+    main()
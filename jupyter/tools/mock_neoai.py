@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+A stand-in for the NeoAi binary speaking the same newline-delimited JSON
+protocol, for load tests without the real binary:
+
+    c.JupyterNeoai.binary_path = "/path/to/jupyter/tools/mock_neoai.py"
+
+Every request line gets one response line. Autocomplete requests are
+answered with made-up completions of the word before the cursor, the
+``neoai::sem`` warm-up with a confirmation, anything else with ``{}``.
+Latency, jitter and failures are set by the options below, or by the
+matching ``NEOAI_MOCK_*`` environment variables since the extension starts
+the binary with its own arguments.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+_WORD_TAIL = re.compile(r"\w*\Z")
+
+
+def _env(name, default, cast=float):
+    value = os.environ.get("NEOAI_MOCK_" + name)
+    return cast(value) if value else default
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--latency", type=float, default=_env("LATENCY", 20.0),
+                        help="milliseconds to answer an Autocomplete request")
+    parser.add_argument("--jitter", type=float, default=_env("JITTER", 10.0),
+                        help="milliseconds of uniform random latency added on top")
+    parser.add_argument("--results", type=int, default=_env("RESULTS", 5, int),
+                        help="completions per Autocomplete response")
+    parser.add_argument("--crash-rate", type=float, default=_env("CRASH_RATE", 0.0),
+                        help="probability of exiting instead of answering a request")
+    parser.add_argument("--hang-rate", type=float, default=_env("HANG_RATE", 0.0),
+                        help="probability of never answering again")
+    parser.add_argument("--seed", type=int, default=_env("SEED", None, int))
+    # The extension passes the real binary's options; they are ignored.
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+def autocomplete(request, count):
+    before = request.get("before", "")
+    if before.endswith("neoai::sem"):
+        return {
+            "old_prefix": "neoai::sem",
+            "results": [{"new_prefix": "semantic completion enabled", "old_suffix": "", "new_suffix": ""}],
+            "user_message": [],
+        }
+    word = _WORD_TAIL.search(before).group()
+    count = min(count, request.get("max_num_results") or count)
+    return {
+        "old_prefix": word,
+        "results": [
+            {
+                "new_prefix": f"{word}{suffix}",
+                "old_suffix": "",
+                "new_suffix": "",
+                "detail": f"{90 - 10 * i}%",
+            }
+            for i, suffix in enumerate(["_mock", "ing", "er", "_value", "s", "_list", "ed"][:count])
+        ],
+        "user_message": [],
+        "is_locked": False,
+    }
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    rng = random.Random(args.seed)
+    for line in sys.stdin:
+        try:
+            body = json.loads(line).get("request", {})
+        except ValueError:
+            body = {}
+        if rng.random() < args.crash_rate:
+            sys.exit(70)
+        if rng.random() < args.hang_rate:
+            while True:
+                time.sleep(3600)
+
+        if "Autocomplete" in body:
+            time.sleep((args.latency + rng.uniform(0, args.jitter)) / 1000)
+            response = autocomplete(body["Autocomplete"], args.results)
+        else:
+            response = {}
+        sys.stdout.write(json.dumps(response) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
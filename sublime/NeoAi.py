@@ -1,43 +1,108 @@
 import sublime_plugin
 import sublime
-import sys
-
-_is_ST3 = int(sublime.version()) >= 3114
-
-if _is_ST3:
-    # Clear module cache to force reloading all modules of this package.
-    # See https://github.com/emmetio/sublime-text-plugin/issues/35
-    prefix = __package__ + "."  # don't clear the base package
-    for module_name in [
-        module_name
-        for module_name in sys.modules
-        if (module_name.startswith(prefix) and module_name != __name__)
-        or ("json" == module_name)
-    ]:
-        del sys.modules[module_name]
-    prefix = None
-
-
-from .lib.requests import get_capabilities, set_state, open_config  # noqa E402
-from .lib.settings import is_native_auto_complete  # noqa E402
-
-capabilities = get_capabilities()
-is_v2 = False
-is_v3 = False
-
-if is_native_auto_complete() or (
-    capabilities["enabled_features"]
-    and "sublime.new-experience" in capabilities["enabled_features"]
+from importlib import import_module
+
+from .lib import bootstrap
+
+# Package modules edited since they were loaded, and those using them, are
+# imported again when the plugin reloads; the rest are reused as they are.
+if bootstrap.__name__ in bootstrap.evict_changed(__package__, keep=(__name__,)):
+    bootstrap = import_module(bootstrap.__name__)
+
+# Dependencies first, so that each timing is mostly the module's own.
+_timer = bootstrap.ImportTimer(__package__)
+for _module in (
+    ".lib.settings",
+    ".lib.serializer",
+    ".lib.binary_versions",
+    ".lib.neo_ai_process",
+    ".lib.requests",
+    ".lib.capabilities",
+    ".lib.prefetch",
 ):
-    if int(sublime.version()) >= 4000:
-        is_v3 = True
-        from .completions.completions_v4 import *
-    else:
-        is_v2 = True
-        from .completions.completions_v2 import *
+    _timer.load(_module)
+
+from .lib.capabilities import completion_mode, load_snapshot, save_snapshot  # noqa E402
+from .lib.neo_ai_process import neoai_proc  # noqa E402
+from .lib.prefetch import PrefetchScheduler  # noqa E402
+from .lib.requests import (  # noqa E402
+    get_capabilities,
+    set_state,
+    open_config,
+    prefetch,
+)
+from .lib.settings import get_settings_eager, is_native_auto_complete  # noqa E402
+
+# Chosen from the previous session's capabilities, so that loading the
+# plugin does not wait for the binary. plugin_loaded() asks the binary and
+# reloads the plugin if the answer calls for another completion mode.
+mode = completion_mode(
+    load_snapshot(), is_native_auto_complete(), int(sublime.version())
+)
+is_v2 = mode == "v2"
+is_v3 = mode == "v4"
+
+# Only the completions module of the chosen mode is imported. Sublime looks
+# for the plugin's classes when this module is loaded, so it cannot wait
+# until the first completion.
+completions = _timer.load(".completions.completions_" + mode)
+if mode == "v4":
+    from .completions.completions_v4 import *
+elif mode == "v2":
+    from .completions.completions_v2 import *
 else:
     from .completions.completions_v1 import *
 
+_timer.report()
+bootstrap.record(__package__)
+
+
+def plugin_loaded():
+    if hasattr(completions, "plugin_loaded"):
+        completions.plugin_loaded()
+    get_capabilities(callback=on_capabilities)
+
+
+def on_capabilities(capabilities):
+    if not capabilities:
+        return
+    saved = save_snapshot(capabilities)
+    fresh_mode = completion_mode(
+        capabilities, is_native_auto_complete(), int(sublime.version())
+    )
+    if fresh_mode == mode:
+        return
+    if not saved:
+        # The reloaded plugin would read the old snapshot and pick this
+        # mode again, then ask and reload again, over and over.
+        print("Neoai: could not switch completions from", mode, "to", fresh_mode)
+        return
+    print("Neoai: switching completions from", mode, "to", fresh_mode)
+    sublime_plugin.unload_plugin(__name__)
+    sublime_plugin.reload_plugin(__name__)
+
+
+prefetcher = PrefetchScheduler(prefetch, neoai_proc.busy)
+
+
+class NeoaiPrefetchListener(sublime_plugin.EventListener):
+    def is_enabled(self):
+        return get_settings_eager().get("prefetch", True)
+
+    def on_load(self, view):
+        if self.is_enabled():
+            prefetcher.loaded(view)
+
+    def on_activated(self, view):
+        if self.is_enabled():
+            prefetcher.activated(view)
+
+    def on_modified(self, view):
+        prefetcher.modified()
+
+    def on_close(self, view):
+        prefetcher.closed(view)
+
 
 class DisableViewCommand(sublime_plugin.TextCommand):
     def run(self, edit):
@@ -1,7 +1,9 @@
 import sublime
 import sublime_plugin
+import threading
 import time
 import re
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional, Tuple
 
 from ..lib.settings import (
@@ -10,6 +12,49 @@ from ..lib.settings import (
     get_trigger_characters, log
 )
 from ..lib.requests import NeoaiAIClient
+from ..lib.view_helpers import get_context_window
+
+# Characters sent on each side of the cursor, like the other backends'
+# char limits, and lines around the cursor used for structure analysis.
+CONTEXT_CHAR_LIMIT = 100000
+PREVIOUS_LINES = 19
+NEXT_LINES = 4
+MAX_SNAPSHOTS = 16
+
+
+class ContextSnapshots:
+    """Text around the cursor per view, reused until the view or the cursor changes"""
+    
+    def __init__(self, max_views=MAX_SNAPSHOTS):
+        self.max_views = max_views
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+        
+    def get(self, view, position):
+        """Return the context window at position, reading the view only if it changed"""
+        key = (view.change_count(), position)
+        with self._lock:
+            snapshot = self._snapshots.get(view.id())
+            if snapshot is not None and snapshot[0] == key:
+                self._snapshots.move_to_end(view.id())
+                return snapshot[1]
+                
+        window = get_context_window(view, position, CONTEXT_CHAR_LIMIT, PREVIOUS_LINES, NEXT_LINES)
+        with self._lock:
+            self._snapshots[view.id()] = (key, window)
+            self._snapshots.move_to_end(view.id())
+            while len(self._snapshots) > self.max_views:
+                self._snapshots.popitem(last=False)
+        return window
+        
+    def discard(self, view):
+        with self._lock:
+            self._snapshots.pop(view.id(), None)
+
+
+# Shared by the async and the inline provider, which are asked about the
+# same cursor when inline completions fall back to auto_complete.
+context_snapshots = ContextSnapshots()
 
 
 class NeoaiAdvancedCompletionProvider(sublime_plugin.AsyncCompletionProvider):
@@ -157,37 +202,21 @@ class NeoaiAdvancedCompletionProvider(sublime_plugin.AsyncCompletionProvider):
         
     def _get_enhanced_context(self, view, position, language, prefix):
         """Get enhanced context with more sophisticated analysis"""
-        # Get text before and after cursor
-        prefix_text = view.substr(sublime.Region(0, position))
-        suffix = view.substr(sublime.Region(position, view.size()))
-        
-        # Get current line
-        line_region = view.line(position)
-        current_line = view.substr(line_region)
+        # Get bounded text around the cursor and the lines next to it
+        window = context_snapshots.get(view, position)
+        current_line = window['current_line']
+        prev_lines = list(window['previous_lines'])
+        next_lines = list(window['next_lines'])
         
-        # Get previous lines for context
-        prev_lines = []
-        for i in range(1, 20):  # Get up to 19 previous lines
-            prev_line_region = view.line(line_region.begin() - i)
-            if prev_line_region.begin() < 0:
-                break
-            prev_lines.insert(0, view.substr(prev_line_region))
-            
-        # Get next lines for context
-        next_lines = []
-        for i in range(1, 5):  # Get up to 4 next lines
-            next_line_region = view.line(line_region.end() + i)
-            if next_line_region.end() > view.size():
-                break
-            next_lines.append(view.substr(next_line_region))
-            
         # Analyze code structure
         structure = self._analyze_code_structure(prev_lines + [current_line], language)
         
         return {
             'language': language,
-            'prefix': prefix_text,
-            'suffix': suffix,
+            'prefix': window['before'],
+            'suffix': window['after'],
+            'region_includes_beginning': window['region_includes_beginning'],
+            'region_includes_end': window['region_includes_end'],
             'current_line': current_line,
             'previous_lines': prev_lines,
             'next_lines': next_lines,
@@ -565,32 +594,19 @@ class NeoaiAdvancedInlineProvider(sublime_plugin.InlineCompletionItemProvider):
         
     def _get_enhanced_context(self, view, position, language):
         """Get enhanced context (same as async provider)"""
-        prefix_text = view.substr(sublime.Region(0, position))
-        suffix = view.substr(sublime.Region(position, view.size()))
-        
-        line_region = view.line(position)
-        current_line = view.substr(line_region)
+        window = context_snapshots.get(view, position)
+        current_line = window['current_line']
+        prev_lines = list(window['previous_lines'])
+        next_lines = list(window['next_lines'])
         
-        prev_lines = []
-        for i in range(1, 20):
-            prev_line_region = view.line(line_region.begin() - i)
-            if prev_line_region.begin() < 0:
-                break
-            prev_lines.insert(0, view.substr(prev_line_region))
-            
-        next_lines = []
-        for i in range(1, 5):
-            next_line_region = view.line(line_region.end() + i)
-            if next_line_region.end() > view.size():
-                break
-            next_lines.append(view.substr(next_line_region))
-            
         structure = self._analyze_code_structure(prev_lines + [current_line], language)
         
         return {
             'language': language,
-            'prefix': prefix_text,
-            'suffix': suffix,
+            'prefix': window['before'],
+            'suffix': window['after'],
+            'region_includes_beginning': window['region_includes_beginning'],
+            'region_includes_end': window['region_includes_end'],
             'current_line': current_line,
             'previous_lines': prev_lines,
             'next_lines': next_lines,
@@ -768,6 +784,10 @@ class NeoaiAdvancedEventListener(sublime_plugin.EventListener):
         if self._should_trigger_completion(view):
             sublime.set_timeout(lambda: self._trigger_completion(view), 100)
             
+    def on_close(self, view):
+        """Forget the view's context snapshot"""
+        context_snapshots.discard(view)
+        
     def _should_trigger_completion(self, view):
         """Enhanced trigger detection"""
         sel = view.sel()
@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import shutil
+import stat
+import time
+
+ACTIVE_FILE = ".active"
+_CHECK_FILE = ".version-check"
+_UPDATE_SERVER_URL = "https://update.neoai.com/bundles"
+_CHUNK_SIZE = 1024 * 1024
+
+
+class SecurityException(Exception):
+    """Custom exception for security-related errors."""
+
+    pass
+
+
+class BinaryVersions:
+    """
+    The NeoAi versions installed under ``binary_dir``, each as
+    ``<version>/<executable>``.
+
+    Mirrors ``jupyter_neoai.versions``: the version in use is named by the
+    ``.active`` file, the resolved path is cached until that file changes,
+    and ``update`` stages the latest version next to the running one before
+    switching to it and removing all but the newest ``keep`` versions.
+    """
+
+    def __init__(
+        self, binary_dir, executable, version_url, install, check_ttl=24 * 3600, keep=2
+    ):
+        self._binary_dir = binary_dir
+        self._executable = executable
+        self._version_url = version_url
+        self._install = install
+        self._check_ttl = check_ttl
+        self._keep = max(1, keep)
+        self._path = None
+        self._active_mtime = None
+
+    def path(self):
+        active_mtime = _mtime(os.path.join(self._binary_dir, ACTIVE_FILE))
+        if (
+            self._path is None
+            or active_mtime != self._active_mtime
+            or not os.path.isfile(self._path)
+        ):
+            self._active_mtime = active_mtime
+            self._path = self._resolve()
+        return self._path
+
+    def active_version(self):
+        try:
+            with open(os.path.join(self._binary_dir, ACTIVE_FILE)) as f:
+                return f.read().strip() or None
+        except (IOError, OSError):
+            return None
+
+    def installed_versions(self):
+        try:
+            versions = [
+                d
+                for d in os.listdir(self._binary_dir)
+                if not d.startswith(".") and os.path.isfile(self._executable_path(d))
+            ]
+        except OSError:
+            return []
+        versions.sort(key=parse_semver, reverse=True)
+        return versions
+
+    def activate(self, version):
+        active = os.path.join(self._binary_dir, ACTIVE_FILE)
+        with open(active + ".tmp", "w") as f:
+            f.write(version)
+        os.replace(active + ".tmp", active)
+        self._path = None
+        print("Neoai: version", version, "is now active")
+
+    def latest_version(self):
+        state = self._read_check_state()
+        if (
+            state.get("version")
+            and time.time() - state.get("checked_at", 0) < self._check_ttl
+        ):
+            return state["version"]
+
+        # Imported here since urllib takes longer to import than the rest of
+        # the plugin, and is only needed by the background updater.
+        from urllib.error import HTTPError, URLError
+        from urllib.request import Request, urlopen
+
+        request = Request(self._version_url)
+        if state.get("version"):
+            if state.get("etag"):
+                request.add_header("If-None-Match", state["etag"])
+            if state.get("last_modified"):
+                request.add_header("If-Modified-Since", state["last_modified"])
+        try:
+            with urlopen(request, timeout=30) as response:
+                state = {
+                    "version": response.read().decode("UTF-8").strip(),
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+        except HTTPError as e:
+            if e.code != 304:
+                print("Neoai: failed to fetch version:", e)
+                return state.get("version")
+        except (URLError, OSError) as e:
+            print("Neoai: failed to fetch version:", e)
+            return state.get("version")
+
+        state["checked_at"] = time.time()
+        self._write_check_state(state)
+        return state["version"]
+
+    def update(self):
+        version = self.latest_version()
+        current = self.active_version() or next(iter(self.installed_versions()), None)
+        if not version or version == current:
+            return False
+        if not os.path.isfile(self._executable_path(version)):
+            print("Neoai: staging version", version)
+            self._install(version)
+            if not os.path.isfile(self._executable_path(version)):
+                return False
+        self.activate(version)
+        self.collect_garbage()
+        return True
+
+    def collect_garbage(self):
+        active = self.active_version()
+        keep = [active] if active else []
+        for version in self.installed_versions():
+            if len(keep) >= self._keep:
+                break
+            if version not in keep:
+                keep.append(version)
+
+        for entry in os.listdir(self._binary_dir):
+            path = os.path.join(self._binary_dir, entry)
+            if entry.startswith(".") or entry in keep or not os.path.isdir(path):
+                continue
+            print("Neoai: removing old version", entry)
+            # A binary still running from there may keep files open on Windows.
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _resolve(self):
+        active = self.active_version()
+        candidates = [active] if active else []
+        candidates += self.installed_versions()
+        for version in candidates:
+            path = self._executable_path(version)
+            if os.path.isfile(path):
+                add_execute_permission(path)
+                print("Neoai: starting version", version)
+                return path
+        return None
+
+    def _executable_path(self, version):
+        return os.path.join(self._binary_dir, version, self._executable)
+
+    def _read_check_state(self):
+        try:
+            with open(os.path.join(self._binary_dir, _CHECK_FILE)) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _write_check_state(self, state):
+        path = os.path.join(self._binary_dir, _CHECK_FILE)
+        try:
+            with open(path + ".tmp", "w") as f:
+                json.dump(state, f)
+            os.replace(path + ".tmp", path)
+        except (IOError, OSError) as e:
+            print("Neoai: could not record version check:", e)
+
+
+def zip_installer(binary_dir, target):
+    """
+    Returns an ``install(version)`` callable that unpacks the release zip of
+    ``target`` into ``binary_dir/<version>/<target>``, once it matches the
+    SHA-256 published next to it.
+    """
+
+    def install(version):
+        import tempfile
+        import zipfile
+        from urllib.error import URLError
+        from urllib.request import urlopen
+
+        url = "{}/{}/{}/NeoAi.zip".format(_UPDATE_SERVER_URL, version, target)
+        output_dir = os.path.join(binary_dir, version, target)
+        staging_dir = tempfile.mkdtemp(prefix=".staging-", dir=binary_dir)
+        try:
+            expected_checksum = fetch_checksum(url)
+            archive = os.path.join(staging_dir, "NeoAi.zip")
+            sha256 = hashlib.sha256()
+            with urlopen(url, timeout=60) as response, open(archive, "wb") as f:
+                for chunk in iter(lambda: response.read(_CHUNK_SIZE), b""):
+                    sha256.update(chunk)
+                    f.write(chunk)
+            actual_checksum = sha256.hexdigest()
+            if expected_checksum and actual_checksum != expected_checksum:
+                raise SecurityException(
+                    "Checksum mismatch for {}. Expected {}, got {}.".format(
+                        url, expected_checksum, actual_checksum
+                    )
+                )
+            with zipfile.ZipFile(archive) as zf:
+                zf.extractall(os.path.join(staging_dir, target))
+            os.remove(archive)
+            if not os.path.isdir(os.path.dirname(output_dir)):
+                os.makedirs(os.path.dirname(output_dir))
+            # The version directory only appears once it is complete.
+            os.rename(os.path.join(staging_dir, target), output_dir)
+        except (URLError, OSError, zipfile.BadZipFile) as e:
+            print("Neoai: failed to download version", version, e)
+        except SecurityException as e:
+            print("Neoai: security error installing version", version, e)
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    return install
+
+
+def fetch_checksum(url):
+    """
+    Returns the SHA-256 published next to ``url``, or ``None`` if there is none.
+    """
+    from urllib.error import HTTPError
+    from urllib.request import urlopen
+
+    try:
+        with urlopen(url + ".sha256", timeout=30) as response:
+            return response.read().decode("UTF-8").split()[0].strip().lower()
+    except (HTTPError, IndexError) as e:
+        print(
+            "Neoai: could not download checksum file ({}),"
+            " proceeding without verification.".format(e)
+        )
+        return None
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def parse_semver(s):
+    try:
+        return [int(x) for x in s.split(".")]
+    except ValueError:
+        return []
+
+
+def add_execute_permission(path):
+    st = os.stat(path)
+    new_mode = st.st_mode | stat.S_IEXEC
+    if new_mode != st.st_mode:
+        os.chmod(path, new_mode)
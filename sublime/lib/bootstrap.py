@@ -0,0 +1,115 @@
+import os
+import sys
+import time
+import types
+from importlib import import_module
+
+# Plugin imports taking longer than this in total are reported.
+STARTUP_BUDGET_MS = 100
+
+# Source mtimes of the package's modules as they were imported. This module
+# stays loaded across plugin reloads, unless it changed itself.
+_mtimes = {}
+
+
+def evict_changed(package, keep=()):
+    """
+    Removes from ``sys.modules`` the modules of ``package`` whose source
+    changed since they were imported, and the modules of ``package`` that
+    refer to them through a module, function, class or instance, so that
+    they are imported afresh. Everything else,
+    including the standard library, is reused. Returns the removed names;
+    when this module is one of them, the caller should import it again.
+    """
+    prefix = package + "."
+    loaded = dict(
+        (name, module)
+        for name, module in list(sys.modules.items())
+        if name.startswith(prefix) and name not in keep and module is not None
+    )
+    # Modules imported without being recorded count as changed.
+    stale = set(
+        name
+        for name, module in loaded.items()
+        if _mtimes.get(name) != _source_mtime(module)
+    )
+    if not _mtimes:
+        # This module was just imported, unlike the rest.
+        stale.discard(__name__)
+
+    changed = bool(stale)
+    while changed:
+        changed = False
+        for name, module in loaded.items():
+            # Packages refer to their submodules but need no reloading.
+            if name in stale or _source_mtime(module) is None:
+                continue
+            if _refers_to(module, stale):
+                stale.add(name)
+                changed = True
+
+    for name in stale:
+        del sys.modules[name]
+        _mtimes.pop(name, None)
+    return sorted(stale)
+
+
+def record(package):
+    """
+    Remembers the source mtimes of the modules of ``package`` loaded so far.
+    """
+    prefix = package + "."
+    for name, module in list(sys.modules.items()):
+        if name.startswith(prefix) and module is not None and name not in _mtimes:
+            _mtimes[name] = _source_mtime(module)
+
+
+class ImportTimer:
+    """
+    Imports modules relative to ``package`` and keeps how long each took.
+    Importing dependencies first makes each time roughly the module's own.
+    """
+
+    def __init__(self, package):
+        self.package = package
+        self.timings = []
+
+    def load(self, name):
+        started = time.perf_counter()
+        module = import_module(name, self.package)
+        self.timings.append((name.lstrip("."), (time.perf_counter() - started) * 1000))
+        return module
+
+    def report(self, budget_ms=STARTUP_BUDGET_MS):
+        total = sum(ms for _, ms in self.timings)
+        print(
+            "Neoai: imports took {:.1f} ms ({})".format(
+                total,
+                ", ".join("{} {:.1f}".format(name, ms) for name, ms in self.timings),
+            )
+        )
+        if total > budget_ms:
+            print(
+                "Neoai: imports exceeded the startup budget of {} ms".format(budget_ms)
+            )
+        return total
+
+
+def _source_mtime(module):
+    path = getattr(module, "__file__", None)
+    if not path:
+        return None
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _refers_to(module, names):
+    for value in list(vars(module).values()):
+        if isinstance(value, types.ModuleType):
+            if value.__name__ in names:
+                return True
+        elif getattr(value, "__module__", None) in names:
+            return True
+    return False
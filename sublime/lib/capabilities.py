@@ -0,0 +1,46 @@
+import json
+import os
+
+# Capabilities of the previous session, so that plugin load does not wait
+# for the binary to start. Dot entries survive the binaries' cleanup.
+SNAPSHOT_PATH = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "..", "binaries", ".capabilities.json"
+)
+NEW_EXPERIENCE = "sublime.new-experience"
+
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    try:
+        with open(path) as f:
+            capabilities = json.load(f)
+    except (IOError, ValueError):
+        return None
+    return capabilities if isinstance(capabilities, dict) else None
+
+
+def save_snapshot(capabilities, path=SNAPSHOT_PATH):
+    """
+    Returns whether ``capabilities`` could be saved.
+    """
+    tmp_path = path + ".tmp"
+    try:
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(tmp_path, "w") as f:
+            json.dump(capabilities, f)
+        os.replace(tmp_path, path)
+    except (IOError, OSError) as e:
+        print("Neoai: could not save capabilities:", e)
+        return False
+    return True
+
+
+def completion_mode(capabilities, native_auto_complete, sublime_version):
+    """
+    Returns which completions module to use: "v4" or "v2" for the new
+    experience on Sublime Text 4 and 3, "v1" otherwise.
+    """
+    enabled_features = (capabilities or {}).get("enabled_features") or ()
+    if native_auto_complete or NEW_EXPERIENCE in enabled_features:
+        return "v4" if sublime_version >= 4000 else "v2"
+    return "v1"
@@ -1,21 +1,27 @@
+import collections
 import os
 import platform
+import random
 import sublime
 import subprocess
-from imp import reload
-from json import loads, dumps
-import stat
+import threading
+import time
+from concurrent.futures import CancelledError, Future, TimeoutError
+from .binary_versions import BinaryVersions, zip_installer
+from .serializer import Serializer
 from .settings import get_settings_eager, is_native_auto_complete, get_version
 
 SETTINGS_PATH = "NeoAi.sublime-settings"
-MAX_RESTARTS = 10
-
-
-def add_execute_permission(path):
-    st = os.stat(path)
-    new_mode = st.st_mode | stat.S_IEXEC
-    if new_mode != st.st_mode:
-        os.chmod(path, new_mode)
+# Restarts after consecutive crashes wait twice as long each time, up to
+# BACKOFF_CAP seconds. A process that ran for BACKOFF_RESET_AFTER seconds
+# before crashing starts over.
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 60.0
+BACKOFF_RESET_AFTER = 60.0
+VERSION_URL = "https://update.neoai.com/bundles/version"
+UPDATE_CHECK_INTERVAL = 24 * 3600
+VERSIONS_TO_KEEP = 2
+PROTOCOL_VERSION = "2.0.2"
 
 
 def get_startup_info(platform):
@@ -27,13 +33,6 @@ def get_startup_info(platform):
         return None
 
 
-def parse_semver(s):
-    try:
-        return [int(x) for x in s.split(".")]
-    except ValueError:
-        return []
-
-
 def get_arch():
     try:
         # handle a case of m1 running under roseeta
@@ -47,53 +46,96 @@ def get_arch():
     return sublime.arch()
 
 
+_TRANSLATION = {
+    ("linux", "x32"): "i686-unknown-linux-musl/NeoAi",
+    ("linux", "x64"): "x86_64-unknown-linux-musl/NeoAi",
+    ("osx", "x32"): "i686-apple-darwin/NeoAi",
+    ("osx", "x64"): "x86_64-apple-darwin/NeoAi",
+    ("osx", "arm64"): "aarch64-apple-darwin/NeoAi",
+    ("windows", "x32"): "i686-pc-windows-gnu/NeoAi.exe",
+    ("windows", "x64"): "x86_64-pc-windows-gnu/NeoAi.exe",
+}
+
+_versions = {}
+
+
+def get_binary_versions(binary_dir):
+    binary_dir = os.path.realpath(binary_dir)
+    if binary_dir not in _versions:
+        platform = _TRANSLATION[sublime.platform(), get_arch()]
+        _versions[binary_dir] = BinaryVersions(
+            binary_dir,
+            os.path.normpath(platform),
+            VERSION_URL,
+            zip_installer(binary_dir, platform.split("/")[0]),
+            check_ttl=UPDATE_CHECK_INTERVAL,
+            keep=VERSIONS_TO_KEEP,
+        )
+    return _versions[binary_dir]
+
+
 def get_neoai_path(binary_dir):
-    def join_path(*args):
-        return os.path.join(binary_dir, *args)
-
-    translation = {
-        ("linux", "x32"): "i686-unknown-linux-musl/NeoAi",
-        ("linux", "x64"): "x86_64-unknown-linux-musl/NeoAi",
-        ("osx", "x32"): "i686-apple-darwin/NeoAi",
-        ("osx", "x64"): "x86_64-apple-darwin/NeoAi",
-        ("osx", "arm64"): "aarch64-apple-darwin/NeoAi",
-        ("windows", "x32"): "i686-pc-windows-gnu/NeoAi.exe",
-        ("windows", "x64"): "x86_64-pc-windows-gnu/NeoAi.exe",
-    }
-
-    platform_key = sublime.platform(), get_arch()
-    platform = translation[platform_key]
-
-    versions = []
-
-    # if a .active file exists and points to an existing binary than use it
-    active_path = join_path(binary_dir, ".active")
-    if os.path.exists(active_path):
-        version = open(active_path).read().strip()
-        version_path = join_path(binary_dir, version)
-        active_neoai_path = join_path(version_path, platform)
-        if os.path.exists(active_neoai_path):
-            versions = [version_path]
-
-    # if no .active file then fallback to taking the latest
-    if len(versions) == 0:
-        versions = os.listdir(binary_dir)
-        versions.sort(key=parse_semver, reverse=True)
-
-    for version in versions:
-        path = join_path(version, platform)
-        if os.path.isfile(path):
-            add_execute_permission(path)
-            print("Neoai: starting version", version)
-            return path
+    # Resolved once and cached until the .active file changes.
+    return get_binary_versions(binary_dir).path()
+
+
+def _update_periodically(versions):
+    while True:
+        try:
+            versions.update()
+        except Exception as e:  # pylint: disable=W0703
+            print("Neoai: update check failed:", e)
+        time.sleep(UPDATE_CHECK_INTERVAL)
+
+
+class Backoff:
+    def __init__(
+        self, base=BACKOFF_BASE, cap=BACKOFF_CAP, reset_after=BACKOFF_RESET_AFTER
+    ):
+        self.base = base
+        self.cap = cap
+        self.reset_after = reset_after
+        self.failures = 0
+
+    def next_delay(self, uptime):
+        if uptime >= self.reset_after:
+            self.failures = 0
+        failures = self.failures
+        self.failures += 1
+        if failures == 0:
+            return 0.0
+        delay = min(self.cap, self.base * 2 ** (failures - 1))
+        return delay * random.uniform(0.5, 1.0)
 
 
 class NeoAiProcess:
+    """
+    Owns the NeoAi binary. Only the worker thread talks to its pipe:
+    ``submit`` queues a request and returns a Future, so that the UI thread
+    never waits on the binary. A queued request is replaced by a newer one
+    with the same key, e.g. the next Autocomplete of the same view.
+    """
+
     install_directory = os.path.dirname(os.path.realpath(__file__))
 
     def __init__(self):
         self.neoai_proc = None
+        # With the "hot_standby" setting, a second process started ahead of
+        # time and switched to on a crash, so the next request does not pay
+        # for a cold start.
+        self.standby_proc = None
         self.num_restarts = 0
+        self.num_failovers = 0
+        self.failover_latency = None
+        self.backoff = Backoff()
+        self.started_at = 0
+        self.not_before = 0
+        self.updater = None
+        self.serializer = Serializer(PROTOCOL_VERSION)
+        self.queue = collections.OrderedDict()
+        self.queue_changed = threading.Condition()
+        self.in_flight = False
+        self.worker = None
 
     def run_neoai(self, inheritStdio=False, additionalArgs=[]):
         binary_dir = os.path.join(NeoAiProcess.install_directory, "..", "binaries")
@@ -101,6 +143,7 @@ class NeoAiProcess:
         neoai_path = settings.get("custom_binary_path", None)
         if neoai_path is None:
             neoai_path = get_neoai_path(binary_dir)
+            self.start_updater(binary_dir)
         args = [neoai_path, "--client", "sublime"] + additionalArgs
         log_file_path = settings.get("log_file_path", None)
         if log_file_path is not None:
@@ -127,40 +170,158 @@ class NeoAiProcess:
             startupinfo=get_startup_info(sublime.platform()),
         )
 
+    def start_updater(self, binary_dir):
+        # Newer versions are staged while this one runs and picked up by
+        # the next restart.
+        if self.updater is None:
+            self.updater = threading.Thread(
+                target=_update_periodically,
+                args=(get_binary_versions(binary_dir),),
+                daemon=True,
+            )
+            self.updater.start()
+
     def restart_neoai_proc(self):
         if self.neoai_proc is not None:
             try:
                 self.neoai_proc.terminate()
             except Exception:  # pylint: disable=W0703
                 pass
-        self.neoai_proc = self.run_neoai()
+            self.neoai_proc = None
+
+        started = time.time()
+        if self.standby_proc is not None and self.standby_proc.poll() is None:
+            self.neoai_proc = self.standby_proc
+            # Its answer to the warm-up request comes first.
+            try:
+                self.neoai_proc.stdout.readline()
+            except (IOError, OSError):
+                pass
+            self.num_failovers += 1
+            self.failover_latency = time.time() - started
+            print("Neoai: switched to the standby process")
+        elif started >= self.not_before:
+            self.neoai_proc = self.run_neoai()
+        else:
+            print("Neoai: backing off for {:.1f}s".format(self.not_before - started))
+        self.standby_proc = None
+
+        if self.neoai_proc is not None:
+            self.started_at = time.time()
+            hot_standby = get_settings_eager().get("hot_standby", False)
+            if hot_standby and time.time() >= self.not_before:
+                self.standby_proc = self.start_standby()
+
+    def start_standby(self):
+        """
+        Starts a process to switch to on a crash and sends it a Features
+        request, so that it has booted by the time it is needed.
+        """
+        proc = self.run_neoai()
+        try:
+            proc.stdin.write(self.serializer.encode({"Features": {}}))
+            proc.stdin.flush()
+        except (IOError, OSError) as e:
+            print("Neoai: could not warm up the standby process:", e)
+            proc.terminate()
+            return None
+        return proc
+
+    def crashed(self):
+        self.num_restarts += 1
+        delay = self.backoff.next_delay(time.time() - self.started_at)
+        self.not_before = time.time() + delay
+        print(
+            "Neoai: restart",
+            self.num_restarts,
+            "failovers",
+            self.num_failovers,
+            "last failover latency",
+            self.failover_latency,
+        )
+
+    def submit(self, req, key=None, callback=None):
+        """
+        Queues ``req`` for the worker thread and returns a Future of the
+        response, None when the binary could not answer. A request still
+        queued under the same ``key`` is cancelled. ``callback`` is called
+        with the response on the UI thread, unless the request is cancelled.
+        """
+        future = Future()
+        if callback is not None:
+
+            def deliver(future):
+                if not future.cancelled():
+                    sublime.set_timeout(lambda: callback(future.result()), 0)
 
-    def request(self, req):
+            future.add_done_callback(deliver)
+        with self.queue_changed:
+            superseded = self.queue.pop(key, None) if key is not None else None
+            self.queue[key if key is not None else object()] = (req, future)
+            self.start_worker()
+            self.queue_changed.notify()
+        if superseded is not None:
+            superseded[1].cancel()
+        return future
+
+    def request(self, req, timeout=None):
+        """
+        Sends ``req`` and waits for the response, None if it does not come
+        within ``timeout`` seconds.
+        """
+        try:
+            return self.submit(req).result(timeout)
+        except (CancelledError, TimeoutError):
+            return None
+
+    def busy(self):
+        """
+        Whether a request of any kind, not only an Autocomplete, is being
+        answered or waiting to be sent, prefetches included.
+        """
+        with self.queue_changed:
+            return self.in_flight or bool(self.queue)
+
+    def start_worker(self):
+        if self.worker is None:
+            self.worker = threading.Thread(target=self.serve, daemon=True)
+            self.worker.start()
+
+    def serve(self):
+        while True:
+            with self.queue_changed:
+                while not self.queue:
+                    self.queue_changed.wait()
+                _, (req, future) = self.queue.popitem(last=False)
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self.in_flight = True
+            try:
+                result = self.roundtrip(req)
+            except Exception as e:  # pylint: disable=W0703
+                print("Neoai request failed:", e)
+                result = None
+            with self.queue_changed:
+                self.in_flight = False
+            future.set_result(result)
+
+    def roundtrip(self, req):
         if self.neoai_proc is None:
             self.restart_neoai_proc()
-        if self.neoai_proc.poll():
+        elif self.neoai_proc.poll() is not None:
             print("Neoai subprocess is dead")
-            if self.num_restarts < MAX_RESTARTS:
-                print("Restarting it...")
-                self.num_restarts += 1
-                self.restart_neoai_proc()
-            else:
-                return None
-        req = {"version": "2.0.2", "request": req}
-        req = dumps(req)
-        req += "\n"
+            self.crashed()
+            self.restart_neoai_proc()
+        if self.neoai_proc is None:
+            return None
         try:
-            self.neoai_proc.stdin.write(bytes(req, "UTF-8"))
+            self.neoai_proc.stdin.write(self.serializer.encode(req))
             self.neoai_proc.stdin.flush()
-            result = self.neoai_proc.stdout.readline()
-            result = str(result, "UTF-8")
-            result = loads(result)
-            return result
+            return self.serializer.decode(self.neoai_proc.stdout.readline())
         except (IOError, OSError, UnicodeDecodeError, ValueError) as e:
             print("Exception while interacting with Neoai subprocess:", e)
-            if self.num_restarts < MAX_RESTARTS:
-                self.num_restarts += 1
-                self.restart_neoai_proc()
+            self.crashed()
+            self.restart_neoai_proc()
 
 
 global neoai_proc
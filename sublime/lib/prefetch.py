@@ -0,0 +1,151 @@
+import collections
+import threading
+import time
+
+import sublime
+
+# Priorities, most urgent first.
+ACTIVE = 0
+VISIBLE = 1
+RECENT = 2
+
+# Milliseconds without edits before prefetching, and between two prefetches.
+IDLE_DELAY = 1000
+PREFETCH_INTERVAL = 500
+# Seconds before the same file is prefetched again.
+PREFETCH_TTL = 600
+RECENT_FILES = 10
+
+
+class PrefetchScheduler:
+    """
+    Prefetches the files completions are likely to be asked for next, so
+    that the first completion in a file does not pay for the binary
+    indexing it: the active file first, then the other visible ones, then
+    recently used ones.
+
+    Prefetches only go out once the user has stopped typing for IDLE_DELAY
+    milliseconds and while ``busy()`` says the binary has nothing else to
+    do, at most one per PREFETCH_INTERVAL. A file prefetched in the last
+    PREFETCH_TTL seconds is not queued again; older prefetches are forgotten.
+    """
+
+    def __init__(
+        self, prefetch, busy, clock=time.time, schedule=sublime.set_timeout_async
+    ):
+        self._prefetch = prefetch
+        self._busy = busy
+        self._clock = clock
+        self._schedule = schedule
+        self._lock = threading.Lock()
+        self._queue = {}
+        self._recent = collections.OrderedDict()
+        self._prefetched = {}
+        self._last_activity = 0
+        self._last_prefetch = 0
+        self._scheduled = False
+
+    def activated(self, view):
+        file_name = view.file_name()
+        if not file_name:
+            return
+        with self._lock:
+            self._recent.pop(file_name, None)
+            self._recent[file_name] = True
+            while len(self._recent) > RECENT_FILES:
+                self._recent.popitem(last=False)
+            # Whatever was active or visible before only is recent now.
+            for other in self._queue:
+                self._queue[other] = RECENT
+            self._add(file_name, ACTIVE)
+            for other in _visible_files(view.window()):
+                self._add(other, VISIBLE)
+            for other in self._recent:
+                self._add(other, RECENT)
+            self._start()
+
+    def loaded(self, view):
+        file_name = view.file_name()
+        if not file_name:
+            return
+        window = view.window()
+        active = window.active_view() if window is not None else None
+        if active is not None and active.id() == view.id():
+            priority = ACTIVE
+        elif file_name in _visible_files(window):
+            priority = VISIBLE
+        else:
+            priority = RECENT
+        with self._lock:
+            self._add(file_name, priority)
+            self._start()
+
+    def modified(self):
+        self._last_activity = self._clock()
+
+    def closed(self, view):
+        file_name = view.file_name()
+        with self._lock:
+            self._queue.pop(file_name, None)
+            self._recent.pop(file_name, None)
+
+    def pump(self):
+        """
+        Sends the most urgent prefetch if the user and the binary are idle,
+        and schedules the next call while files are queued.
+        """
+        with self._lock:
+            self._scheduled = False
+            now = self._clock()
+            self._forget_expired(now)
+            if not self._queue:
+                return
+            wait = (
+                max(
+                    self._last_activity + IDLE_DELAY / 1000.0,
+                    self._last_prefetch + PREFETCH_INTERVAL / 1000.0,
+                )
+                - now
+            )
+            if wait > 0 or self._busy():
+                self._start(max(int(round(wait * 1000)), PREFETCH_INTERVAL))
+                return
+            file_name = min(self._queue, key=self._queue.get)
+            del self._queue[file_name]
+            self._prefetched[file_name] = now
+            self._last_prefetch = now
+            self._start(PREFETCH_INTERVAL)
+        self._prefetch(file_name)
+
+    def _add(self, file_name, priority):
+        prefetched_at = self._prefetched.get(file_name)
+        if prefetched_at is not None:
+            if self._clock() - prefetched_at < PREFETCH_TTL:
+                return
+            del self._prefetched[file_name]
+        self._queue[file_name] = min(priority, self._queue.get(file_name, priority))
+
+    def _forget_expired(self, now):
+        expired = [
+            file_name
+            for file_name, prefetched_at in self._prefetched.items()
+            if now - prefetched_at >= PREFETCH_TTL
+        ]
+        for file_name in expired:
+            del self._prefetched[file_name]
+
+    def _start(self, delay=IDLE_DELAY):
+        if self._queue and not self._scheduled:
+            self._scheduled = True
+            self._schedule(self.pump, delay)
+
+
+def _visible_files(window):
+    if window is None:
+        return []
+    files = []
+    for group in range(window.num_groups()):
+        view = window.active_view_in_group(group)
+        if view is not None and view.file_name():
+            files.append(view.file_name())
+    return files
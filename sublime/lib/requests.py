@@ -3,24 +3,32 @@ from .completion_origin import CompletionOrigin
 import os
 
 
-def get_capabilities():
-    return neoai_proc.request({"Features": {}})
+def get_capabilities(callback=None):
+    """
+    Returns the binary's capabilities, or with ``callback`` returns a Future
+    right away and calls ``callback`` with them on the UI thread.
+    """
+    if callback is None:
+        return neoai_proc.request({"Features": {}})
+    return neoai_proc.submit({"Features": {}}, key=("Features",), callback=callback)
 
 
 def uninstalling():
-    neoai_proc.request({"Uninstalling": {}})
+    neoai_proc.submit({"Uninstalling": {}})
 
 
 def set_state(state):
-    neoai_proc.request({"SetState": {"state_type": state}})
+    neoai_proc.submit({"SetState": {"state_type": state}})
 
 
 def open_config():
-    neoai_proc.request({"Configuration": {}})
+    neoai_proc.submit({"Configuration": {}})
 
 
 def prefetch(file_name):
-    neoai_proc.request({"Prefetch": {"filename": file_name}})
+    neoai_proc.submit(
+        {"Prefetch": {"filename": file_name}}, key=("Prefetch", file_name)
+    )
 
 
 def autocomplete(
@@ -30,7 +38,14 @@ def autocomplete(
     region_includes_beginning,
     region_includes_end,
     max_num_results=5,
+    view_id=None,
+    callback=None,
 ):
+    """
+    Returns the completions, or with ``callback`` returns a Future right
+    away and calls ``callback`` with them on the UI thread. A pending
+    request of the same ``view_id`` is dropped in favor of this one.
+    """
     request = {
         "Autocomplete": {
             "before": before,
@@ -41,7 +56,10 @@ def autocomplete(
             "max_num_results": max_num_results,
         }
     }
-    return neoai_proc.request(request)
+    if callback is None:
+        return neoai_proc.request(request)
+    key = ("Autocomplete", view_id) if view_id is not None else None
+    return neoai_proc.submit(request, key=key, callback=callback)
 
 
 def set_completion_state(
@@ -0,0 +1,51 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_NEWLINE = b"\n"
+_ENVELOPE_END = b"}\n"
+
+_json_encoder = json.JSONEncoder(separators=(",", ":"))
+
+
+def _json_dumps(value):
+    return _json_encoder.encode(value).encode("utf-8")
+
+
+def _json_loads(line):
+    # json.loads only takes bytes from Python 3.6 on.
+    return json.loads(line.decode("utf-8"))
+
+
+def _orjson_dumps(value):
+    try:
+        return orjson.dumps(value)
+    except TypeError:
+        return _json_dumps(value)
+
+
+class Serializer:
+    """
+    Encodes requests for the NeoAi binary as newline terminated JSON lines
+    and decodes its answers, with orjson when it can be imported and the
+    json module otherwise. The start of the envelope is encoded once per
+    protocol version, so only the request itself is serialized.
+    """
+
+    def __init__(self, version, use_orjson=True):
+        self.backend = "orjson" if use_orjson and orjson is not None else "json"
+        self._dumps = _orjson_dumps if self.backend == "orjson" else _json_dumps
+        self._loads = orjson.loads if self.backend == "orjson" else _json_loads
+        self._envelope = b'{"version":' + _json_dumps(version) + b',"request":'
+
+    def encode(self, request):
+        return b"".join((self._envelope, self._dumps(request), _ENVELOPE_END))
+
+    def decode(self, line):
+        """
+        Raises ValueError (or UnicodeDecodeError) when ``line`` is not JSON.
+        """
+        return self._loads(line)
@@ -16,6 +16,37 @@ def get_after(view, char_limit):
     return view.substr(sublime.Region(loc, end)), end == view.size()
 
 
+def get_context_window(view, position, char_limit, previous_lines, next_lines):
+    """
+    Returns the text around ``position`` without copying the whole buffer:
+    at most ``char_limit`` characters before and after it, whether those
+    reach the beginning and the end of the buffer, and up to
+    ``previous_lines`` and ``next_lines`` whole lines around the current
+    one, read at once.
+    """
+    size = view.size()
+    begin = max(0, position - char_limit)
+    end = min(size, position + char_limit)
+    row, _ = view.rowcol(position)
+    last_row, _ = view.rowcol(size)
+    first_row = max(0, row - previous_lines)
+    lines_region = sublime.Region(
+        view.text_point(first_row, 0),
+        view.line(view.text_point(min(last_row, row + next_lines), 0)).end(),
+    )
+    lines = view.substr(lines_region).split("\n")
+    current = row - first_row
+    return {
+        "before": view.substr(sublime.Region(begin, position)),
+        "after": view.substr(sublime.Region(position, end)),
+        "region_includes_beginning": begin == 0,
+        "region_includes_end": end == size,
+        "current_line": lines[current],
+        "previous_lines": lines[:current],
+        "next_lines": lines[current + 1:],
+    }
+
+
 def active_view():
     """Return currently active view"""
     return sublime.active_window().active_view()
@@ -0,0 +1,271 @@
+"""
+Times the per-keystroke work of the completion backends on buffers of
+growing size, outside Sublime Text:
+
+    python tests/bench_completions.py --output bench.json
+    python tests/bench_completions.py --baseline bench.json
+
+The JSON report has one row per backend, function and buffer size, in a
+stable order, so reports of two releases can be diffed. ``--baseline``
+prints the change of every row against an earlier report.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fakes  # noqa: E402
+from fakes.sublime import View  # noqa: E402
+
+SIZES = [1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024]
+
+_SOURCE = '''import os
+from collections import defaultdict
+
+
+class FrameLoader(object):
+    """Loads frames from disk."""
+
+    def __init__(self, root):
+        self.root = root
+        self.cache = defaultdict(list)
+
+    def load(self, name):
+        path = os.path.join(self.root, name)
+        with open(path) as f:
+            rows = [line.split(",") for line in f]
+        for row in rows:
+            self.cache[name].append(row)
+        return rows
+
+'''
+
+
+def make_buffer(size):
+    text = (_SOURCE * (size // len(_SOURCE) + 1))[:size]
+    return View(text, file_name="bench.py")
+
+
+def _cursor(view):
+    # In the middle of a line in the middle of the buffer.
+    line = view.line(view.size() // 2)
+    return line.begin() + line.size() // 2
+
+
+def _previous_lines(view, position, count=20):
+    lines = []
+    line = view.line(position)
+    while len(lines) < count and line.begin() > 0:
+        line = view.line(line.begin() - 1)
+        lines.insert(0, view.substr(line))
+    return lines
+
+
+def cases(view):
+    """
+    Returns ``(backend, function, call)`` for every benchmarked function,
+    with ``call`` running it once against ``view``.
+    """
+    position = _cursor(view)
+    prefix = "ro"
+    completions = fakes.COMPLETIONS
+    completion = completions[0]["completion"]
+    lines = _previous_lines(view, position) + [view.substr(view.line(position))]
+
+    v1 = fakes.load_completions("completions_v1").NeoaiCompletionProvider(view)
+    v2 = fakes.load_completions("completions_v2").NeoaiInlineCompletionProvider()
+    v3 = fakes.load_completions("completions_v3").NeoaiAsyncCompletionProvider()
+    v4_module = fakes.load_completions("completions_v4")
+    v4 = v4_module.NeoaiAdvancedCompletionProvider()
+    v4_inline = v4_module.NeoaiAdvancedInlineProvider()
+    view_helpers = fakes.load_lib("view_helpers")
+    language = "python"
+
+    return [
+        ("v1", "_detect_language", lambda: v1._detect_language(position)),
+        ("v1", "_get_context", lambda: v1._get_context(position, language, prefix)),
+        (
+            "v1",
+            "_convert_completions",
+            lambda: v1._convert_completions(completions, language),
+        ),
+        ("v1", "_extract_trigger", lambda: v1._extract_trigger(completion, language)),
+        ("v2", "_detect_language", lambda: v2._detect_language(view, position)),
+        ("v2", "_get_context", lambda: v2._get_context(view, position, language)),
+        (
+            "v2",
+            "_convert_inline_completions",
+            lambda: v2._convert_inline_completions(completions, view, position),
+        ),
+        ("v3", "_detect_language", lambda: v3._detect_language(view, position)),
+        (
+            "v3",
+            "_get_context",
+            lambda: v3._get_context(view, position, language, prefix),
+        ),
+        (
+            "v3",
+            "_convert_completions",
+            lambda: v3._convert_completions(completions, language),
+        ),
+        ("v3", "_extract_trigger", lambda: v3._extract_trigger(completion, language)),
+        ("v4", "_detect_language", lambda: v4._detect_language(view, position)),
+        (
+            "v4",
+            "_get_enhanced_context",
+            lambda: v4._get_enhanced_context(view, position, language, prefix),
+        ),
+        (
+            "v4_inline",
+            "_get_enhanced_context",
+            lambda: v4_inline._get_enhanced_context(view, position, language),
+        ),
+        # What the v4 providers pay when the view changed since the last call.
+        (
+            "lib",
+            "get_context_window",
+            lambda: view_helpers.get_context_window(
+                view,
+                position,
+                v4_module.CONTEXT_CHAR_LIMIT,
+                v4_module.PREVIOUS_LINES,
+                v4_module.NEXT_LINES,
+            ),
+        ),
+        (
+            "v4",
+            "_analyze_code_structure",
+            lambda: v4._analyze_code_structure(lines, language),
+        ),
+        (
+            "v4",
+            "_convert_enhanced_completions",
+            lambda: v4._convert_enhanced_completions(
+                completions, language, view, position
+            ),
+        ),
+        (
+            "v4",
+            "_extract_enhanced_trigger",
+            lambda: v4._extract_enhanced_trigger(completion, language),
+        ),
+    ]
+
+
+def measure(call, min_time, max_calls):
+    """
+    Calls ``call`` until ``min_time`` seconds or ``max_calls`` calls have
+    passed and returns the per-call times in seconds.
+    """
+    times = []
+    started = time.perf_counter()
+    while len(times) < max_calls and (
+        not times or time.perf_counter() - started < min_time
+    ):
+        before = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - before)
+    return times
+
+
+def _summary(times):
+    times = sorted(times)
+    return {
+        "calls": len(times),
+        "min_us": round(times[0] * 1e6, 2),
+        "median_us": round(times[len(times) // 2] * 1e6, 2),
+        "p95_us": round(times[min(len(times) - 1, int(len(times) * 0.95))] * 1e6, 2),
+        "mean_us": round(sum(times) / len(times) * 1e6, 2),
+    }
+
+
+def run(sizes=SIZES, min_time=0.2, max_calls=10000):
+    results = []
+    for size in sizes:
+        view = make_buffer(size)
+        for backend, function, call in cases(view):
+            row = {"backend": backend, "function": function, "buffer_bytes": size}
+            row.update(_summary(measure(call, min_time, max_calls)))
+            results.append(row)
+    return {
+        "schema": 1,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(report, baseline):
+    """
+    Returns one line per row of ``report`` with its median against the
+    matching row of ``baseline``.
+    """
+    key = lambda row: (
+        row["backend"],
+        row["function"],
+        row["buffer_bytes"],
+    )  # noqa: E731
+    previous = {key(row): row for row in baseline["results"]}
+    lines = []
+    for row in report["results"]:
+        old = previous.get(key(row))
+        change = ""
+        if old and old["median_us"]:
+            change = "{:+.1f}%".format((row["median_us"] / old["median_us"] - 1) * 100)
+        lines.append(
+            "{:<10} {:<32} {:>9} {:>12.2f}us {:>9}".format(
+                row["backend"],
+                row["function"],
+                row["buffer_bytes"],
+                row["median_us"],
+                change,
+            )
+        )
+    return lines
+
+
+def _size(text):
+    units = {"K": 1024, "M": 1024 * 1024}
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes", default="1K,10K,100K,1M,10M", help="comma-separated buffer sizes"
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="seconds to spend per row"
+    )
+    parser.add_argument(
+        "--max-calls", type=int, default=10000, help="upper bound of calls per row"
+    )
+    parser.add_argument(
+        "--output", help="write the JSON report to this file instead of stdout"
+    )
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    report = run(
+        [_size(s) for s in args.sizes.split(",")], args.min_time, args.max_calls
+    )
+    if args.baseline:
+        with open(args.baseline) as f:
+            print("\n".join(compare(report, json.load(f))))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    elif not args.baseline:
+        print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Fakes for running the plugin outside Sublime Text.
+
+``install()`` registers the fake ``sublime`` and ``sublime_plugin``
+modules. ``load_completions(name)`` imports a module of ``completions/``
+as part of a ``NeoAi`` package whose ``lib.settings`` and ``lib.requests``
+provide the names the completion backends import, with a client returning
+canned completions instead of talking to the binary. ``load_lib(name)``
+imports one of the real ``lib/`` modules from that package; ``SETTINGS``
+holds what its ``get_settings_eager()`` returns.
+"""
+
+import importlib
+import os
+import sys
+import types
+
+from . import sublime, sublime_plugin
+
+PACKAGE = "NeoAi"
+PACKAGE_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+COMPLETIONS = [
+    {
+        "completion": "def read_frame(path):",
+        "description": "function",
+        "confidence": 0.9,
+    },
+    {"completion": "self.frame = frame", "description": "attribute", "confidence": 0.7},
+    {"completion": "import pandas as pd", "description": "import", "confidence": 0.5},
+    {"completion": "for row in rows:", "description": "loop", "confidence": 0.4},
+    {"completion": "value", "description": "", "confidence": 0.2},
+]
+
+SETTINGS = {}
+
+
+class FakeClient:
+    def __init__(self, completions=None):
+        self.completions = COMPLETIONS if completions is None else completions
+        self.contexts = []
+
+    def get_completions(self, context, callback=None):
+        self.contexts.append(context)
+        if callback is not None:
+            callback(self.completions)
+        return self.completions
+
+
+def install():
+    sys.modules["sublime"] = sublime
+    sys.modules["sublime_plugin"] = sublime_plugin
+
+
+def load_completions(name):
+    _install_package()
+    return importlib.import_module("{}.completions.{}".format(PACKAGE, name))
+
+
+def load_lib(name):
+    """
+    Imports a module of ``lib/`` that does not depend on the faked
+    ``lib.requests``.
+    """
+    _install_package()
+    return importlib.import_module("{}.lib.{}".format(PACKAGE, name))
+
+
+def _install_package():
+    install()
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [PACKAGE_DIR]
+        sys.modules[PACKAGE] = package
+        _install_lib()
+
+
+def _install_lib():
+    lib = types.ModuleType(PACKAGE + ".lib")
+    lib.__path__ = [os.path.join(PACKAGE_DIR, "lib")]
+
+    settings = types.ModuleType(PACKAGE + ".lib.settings")
+    settings.get_language_setting = lambda language, key, default=None: default
+    settings.is_language_enabled = lambda language: True
+    settings.get_trigger_delay = lambda: 0
+    settings.get_debounce_delay = lambda: 0
+    settings.get_max_completions = lambda: 5
+    settings.is_auto_trigger_enabled = lambda: True
+    settings.get_trigger_characters = lambda: [".", "(", " "]
+    settings.log = lambda message, level="info": None
+    settings.get_settings_eager = lambda: SETTINGS
+    settings.is_native_auto_complete = lambda: False
+    settings.get_version = lambda: "0.0.0"
+
+    requests = types.ModuleType(PACKAGE + ".lib.requests")
+    requests.NeoaiAIClient = FakeClient
+
+    lib.settings = settings
+    lib.requests = requests
+    sys.modules[lib.__name__] = lib
+    sys.modules[settings.__name__] = settings
+    sys.modules[requests.__name__] = requests
@@ -0,0 +1,322 @@
+"""
+A stand-in for Sublime Text's ``sublime`` module, enough to run the plugin
+code outside the editor. ``View`` keeps its text in a string and answers
+``line``/``substr``/``scope_name`` like the editor does.
+"""
+
+import bisect
+
+KIND_ID_AMBIGUOUS = 0
+KIND_ID_KEYWORD = 1
+KIND_ID_TYPE = 2
+KIND_ID_FUNCTION = 3
+KIND_ID_NAMESPACE = 4
+KIND_ID_NAVIGATION = 5
+KIND_ID_MARKUP = 6
+KIND_ID_VARIABLE = 7
+KIND_ID_SNIPPET = 8
+
+KIND_AMBIGUOUS = (KIND_ID_AMBIGUOUS, "", "")
+KIND_KEYWORD = (KIND_ID_KEYWORD, "k", "Keyword")
+KIND_TYPE = (KIND_ID_TYPE, "t", "Type")
+KIND_FUNCTION = (KIND_ID_FUNCTION, "f", "Function")
+KIND_NAMESPACE = (KIND_ID_NAMESPACE, "a", "Namespace")
+KIND_NAVIGATION = (KIND_ID_NAVIGATION, "n", "Navigation")
+KIND_MARKUP = (KIND_ID_MARKUP, "m", "Markup")
+KIND_VARIABLE = (KIND_ID_VARIABLE, "v", "Variable")
+KIND_SNIPPET = (KIND_ID_SNIPPET, "s", "Snippet")
+
+COMPLETION_FORMAT_TEXT = 0
+COMPLETION_FORMAT_SNIPPET = 1
+COMPLETION_FORMAT_COMMAND = 2
+COMPLETION_TYPE_TEXT = 0
+COMPLETION_TYPE_SNIPPET = 1
+
+INHIBIT_WORD_COMPLETIONS = 8
+INHIBIT_EXPLICIT_COMPLETIONS = 16
+DYNAMIC_COMPLETIONS = 32
+
+_SCOPES = {
+    ".py": "source.python",
+    ".js": "source.js",
+    ".ts": "source.ts",
+    ".go": "source.go",
+    ".java": "source.java",
+    ".rs": "source.rust",
+}
+
+_settings = {}
+_pending = []
+
+
+def version():
+    return "4169"
+
+
+def platform():
+    return "linux"
+
+
+def arch():
+    return "x64"
+
+
+def set_timeout(callback, delay=0):
+    _pending.append(callback)
+
+
+def set_timeout_async(callback, delay=0):
+    _pending.append(callback)
+
+
+def run_pending():
+    """
+    Runs the callbacks scheduled with ``set_timeout``, including those they
+    schedule in turn. Returns how many ran.
+    """
+    count = 0
+    while _pending:
+        _pending.pop(0)()
+        count += 1
+    return count
+
+
+def load_settings(name):
+    return _settings.setdefault(name, Settings())
+
+
+def save_settings(name):
+    pass
+
+
+def register_async_completion_provider(provider):
+    pass
+
+
+def register_inline_completion_item_provider(provider):
+    pass
+
+
+def active_window():
+    return Window()
+
+
+def new():
+    return Window()
+
+
+class Region:
+    def __init__(self, a, b=None):
+        self.a = a
+        self.b = a if b is None else b
+
+    def begin(self):
+        return min(self.a, self.b)
+
+    def end(self):
+        return max(self.a, self.b)
+
+    def size(self):
+        return abs(self.b - self.a)
+
+    def empty(self):
+        return self.a == self.b
+
+    def contains(self, x):
+        if isinstance(x, Region):
+            return self.begin() <= x.begin() and x.end() <= self.end()
+        return self.begin() <= x <= self.end()
+
+    def __eq__(self, other):
+        return isinstance(other, Region) and (self.a, self.b) == (other.a, other.b)
+
+    def __hash__(self):
+        return hash((self.a, self.b))
+
+    def __repr__(self):
+        return "Region({}, {})".format(self.a, self.b)
+
+
+class Settings:
+    def __init__(self, values=None):
+        self._values = dict(values or {})
+
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+    def set(self, key, value):
+        self._values[key] = value
+
+    def has(self, key):
+        return key in self._values
+
+    def erase(self, key):
+        self._values.pop(key, None)
+
+
+class Selection(list):
+    def clear(self):
+        del self[:]
+
+    def add(self, region):
+        self.append(region if isinstance(region, Region) else Region(region))
+
+
+class CompletionItem:
+    def __init__(
+        self,
+        trigger,
+        annotation="",
+        completion="",
+        completion_format=COMPLETION_FORMAT_TEXT,
+        kind=KIND_AMBIGUOUS,
+        details="",
+        **extra
+    ):
+        self.trigger = trigger
+        self.annotation = annotation
+        self.completion = completion
+        self.completion_format = completion_format
+        self.kind = kind
+        self.details = details
+        self.extra = extra
+
+
+class InlineCompletionItem:
+    def __init__(
+        self, completion, annotation="", kind=KIND_AMBIGUOUS, details="", **extra
+    ):
+        self.completion = completion
+        self.annotation = annotation
+        self.kind = kind
+        self.details = details
+        self.extra = extra
+
+
+class Window:
+    def __init__(self, views=None):
+        self._views = list(views or [])
+
+    def views(self):
+        return list(self._views)
+
+    def active_view(self):
+        return self._views[0] if self._views else None
+
+    def num_groups(self):
+        return 1
+
+    def active_view_in_group(self, group):
+        return self.active_view()
+
+
+class View:
+    _next_id = 1
+
+    def __init__(self, text="", file_name="untitled.py", scope=None):
+        self._id = View._next_id
+        View._next_id += 1
+        self._file_name = file_name
+        self._scope = scope or _SCOPES.get(
+            "." + file_name.rsplit(".", 1)[-1], "text.plain"
+        )
+        self._settings = Settings()
+        self._selection = Selection([Region(len(text))])
+        self._change_count = 0
+        self.commands = []
+        self._set_text(text)
+
+    def _set_text(self, text):
+        self._text = text
+        self._line_starts = [0]
+        start = text.find("\n")
+        while start != -1:
+            self._line_starts.append(start + 1)
+            start = text.find("\n", start + 1)
+
+    def id(self):
+        return self._id
+
+    def buffer_id(self):
+        return self._id
+
+    def file_name(self):
+        return self._file_name
+
+    def settings(self):
+        return self._settings
+
+    def window(self):
+        return Window([self])
+
+    def is_loading(self):
+        return False
+
+    def change_count(self):
+        return self._change_count
+
+    def size(self):
+        return len(self._text)
+
+    def sel(self):
+        return self._selection
+
+    def substr(self, x):
+        if isinstance(x, Region):
+            return self._text[max(0, x.begin()) : max(0, x.end())]
+        return self._text[x : x + 1]
+
+    def scope_name(self, point):
+        return self._scope + " "
+
+    def match_selector(self, point, selector):
+        return any(part.strip() in self._scope for part in selector.split(","))
+
+    def rowcol(self, point):
+        row = bisect.bisect_right(self._line_starts, self._clamp(point)) - 1
+        return row, point - self._line_starts[row]
+
+    def text_point(self, row, col):
+        row = max(0, min(row, len(self._line_starts) - 1))
+        return self._clamp(self._line_starts[row] + col)
+
+    def line(self, x):
+        if isinstance(x, Region):
+            return Region(self.line(x.begin()).begin(), self.line(x.end()).end())
+        row = bisect.bisect_right(self._line_starts, self._clamp(x)) - 1
+        return Region(self._line_starts[row], self._line_end(row))
+
+    def full_line(self, x):
+        region = self.line(x)
+        return Region(region.begin(), min(region.end() + 1, self.size()))
+
+    def lines(self, region):
+        first, _ = self.rowcol(region.begin())
+        last, _ = self.rowcol(region.end())
+        return [
+            Region(self._line_starts[row], self._line_end(row))
+            for row in range(first, last + 1)
+        ]
+
+    def insert(self, point, text):
+        self._set_text(self._text[:point] + text + self._text[point:])
+        self._change_count += 1
+        return len(text)
+
+    def erase(self, region):
+        self._set_text(self._text[: region.begin()] + self._text[region.end() :])
+        self._change_count += 1
+
+    def run_command(self, name, args=None):
+        self.commands.append((name, args))
+
+    def show_inline_completions(self, completions):
+        self.commands.append(("show_inline_completions", completions))
+
+    def _line_end(self, row):
+        if row + 1 < len(self._line_starts):
+            return self._line_starts[row + 1] - 1
+        return len(self._text)
+
+    def _clamp(self, point):
+        return max(0, min(point, len(self._text)))
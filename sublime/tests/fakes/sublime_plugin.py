@@ -0,0 +1,43 @@
+"""
+A stand-in for Sublime Text's ``sublime_plugin`` module.
+"""
+
+
+class EventListener:
+    pass
+
+
+class ViewEventListener:
+    def __init__(self, view):
+        self.view = view
+
+
+class TextCommand:
+    def __init__(self, view):
+        self.view = view
+
+
+class WindowCommand:
+    def __init__(self, window):
+        self.window = window
+
+
+class ApplicationCommand:
+    pass
+
+
+# Referenced by the completion backends; not part of the real API.
+class AsyncCompletionProvider:
+    pass
+
+
+class InlineCompletionItemProvider:
+    pass
+
+
+def reload_plugin(name):
+    pass
+
+
+def unload_plugin(name):
+    pass
@@ -0,0 +1,37 @@
+import unittest
+
+import bench_completions
+from fakes.sublime import Region, View
+
+
+class TestFakeView(unittest.TestCase):
+    def test_line_and_substr(self):
+        view = View("ab\ncd\n\nef")
+        self.assertEqual(view.line(4), Region(3, 5))
+        self.assertEqual(view.line(6), Region(6, 6))
+        self.assertEqual(view.line(-3), Region(0, 2))
+        self.assertEqual(view.line(100), Region(7, 9))
+        self.assertEqual(view.substr(view.line(Region(1, 4))), "ab\ncd")
+        self.assertEqual(
+            [view.substr(r) for r in view.lines(Region(0, 9))], ["ab", "cd", "", "ef"]
+        )
+
+
+class TestBenchCompletions(unittest.TestCase):
+    def test_report_has_a_row_per_case(self):
+        report = bench_completions.run(sizes=[1024], min_time=0, max_calls=1)
+        rows = report["results"]
+        self.assertEqual(
+            len(rows), len(bench_completions.cases(bench_completions.make_buffer(1024)))
+        )
+        self.assertTrue(
+            all(row["calls"] == 1 and row["buffer_bytes"] == 1024 for row in rows)
+        )
+        self.assertIn(
+            ("v4", "_get_enhanced_context"),
+            [(r["backend"], r["function"]) for r in rows],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
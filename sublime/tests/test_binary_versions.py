@@ -0,0 +1,89 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import zipfile
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
+
+import fakes
+
+binary_versions = fakes.load_lib("binary_versions")
+
+TARGET = "x86_64-unknown-linux-musl"
+
+
+def release_zip():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("NeoAi", "#!/bin/sh\n")
+    return buffer.getvalue()
+
+
+class _ReleaseHandler(BaseHTTPRequestHandler):
+    """Serves the release zip and the checksum set in ``files``."""
+
+    files = {}
+
+    def do_GET(self):
+        body = self.files.get(self.path.rsplit("/", 1)[-1])
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestZipInstaller(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(("127.0.0.1", 0), _ReleaseHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = "http://127.0.0.1:{}/bundles".format(cls.server.server_port)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.binary_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.binary_dir)
+        patcher = mock.patch.object(binary_versions, "_UPDATE_SERVER_URL", self.url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.archive = release_zip()
+        _ReleaseHandler.files = {"NeoAi.zip": self.archive}
+
+    def install(self):
+        with mock.patch("builtins.print"):
+            binary_versions.zip_installer(self.binary_dir, TARGET)("1.0.0")
+        return os.path.join(self.binary_dir, "1.0.0", TARGET, "NeoAi")
+
+    def test_installs_an_archive_matching_its_checksum(self):
+        checksum = hashlib.sha256(self.archive).hexdigest()
+        _ReleaseHandler.files["NeoAi.zip.sha256"] = (
+            checksum + "  NeoAi.zip\n"
+        ).encode()
+        self.assertTrue(os.path.isfile(self.install()))
+
+    def test_refuses_an_archive_not_matching_its_checksum(self):
+        _ReleaseHandler.files["NeoAi.zip.sha256"] = b"0" * 64
+        self.assertFalse(os.path.exists(self.install()))
+        self.assertEqual(os.listdir(self.binary_dir), [])
+
+    def test_installs_without_a_published_checksum(self):
+        self.assertTrue(os.path.isfile(self.install()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import fakes
+
+bootstrap = fakes.load_lib("bootstrap")
+
+PACKAGE = "bootstrap_fixture"
+MODULES = {
+    "__init__": "",
+    "base": "def value():\n    return 1\n",
+    "user": "from .base import value\n",
+    "other": "import json\n",
+}
+
+
+class TestEvictChanged(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        os.mkdir(os.path.join(self.dir, PACKAGE))
+        for name, source in MODULES.items():
+            self.write(name, source)
+        sys.path.insert(0, self.dir)
+        self.addCleanup(sys.path.remove, self.dir)
+        self.addCleanup(self.unload)
+        self.timer = bootstrap.ImportTimer(PACKAGE)
+        for name in ("base", "user", "other"):
+            self.timer.load("." + name)
+        bootstrap.record(PACKAGE)
+
+    def write(self, name, source):
+        path = os.path.join(self.dir, PACKAGE, name + ".py")
+        with open(path, "w") as f:
+            f.write(source)
+        return path
+
+    def unload(self):
+        for name in list(sys.modules):
+            if name == PACKAGE or name.startswith(PACKAGE + "."):
+                del sys.modules[name]
+                bootstrap._mtimes.pop(name, None)
+
+    def test_nothing_changed(self):
+        json_module = sys.modules["json"]
+        self.assertEqual(bootstrap.evict_changed(PACKAGE), [])
+        self.assertIs(sys.modules["json"], json_module)
+        self.assertEqual(
+            [name for name, _ in self.timer.timings], ["base", "user", "other"]
+        )
+
+    def test_changed_modules_and_their_users_are_evicted(self):
+        path = self.write("base", "def value():\n    return 2\n")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(
+            bootstrap.evict_changed(PACKAGE), [PACKAGE + ".base", PACKAGE + ".user"]
+        )
+        self.assertIn(PACKAGE + ".other", sys.modules)
+        self.assertEqual(self.timer.load(".user").value(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
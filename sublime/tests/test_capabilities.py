@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import fakes
+
+capabilities = fakes.load_lib("capabilities")
+
+
+class TestCapabilities(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, "binaries", ".capabilities.json")
+
+    def test_snapshot_round_trip(self):
+        self.assertIsNone(capabilities.load_snapshot(self.path))
+        snapshot = {"enabled_features": [capabilities.NEW_EXPERIENCE]}
+        self.assertTrue(capabilities.save_snapshot(snapshot, self.path))
+        self.assertEqual(capabilities.load_snapshot(self.path), snapshot)
+
+    def test_save_reports_failure(self):
+        with open(os.path.join(self.dir, "binaries"), "w") as f:
+            f.write("not a directory")
+        with mock.patch("builtins.print"):
+            self.assertFalse(capabilities.save_snapshot({}, self.path))
+
+    def test_corrupt_snapshot_is_ignored(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as f:
+            f.write('{"enabled_features": [')
+        self.assertIsNone(capabilities.load_snapshot(self.path))
+
+    def test_completion_mode(self):
+        new_experience = {"enabled_features": [capabilities.NEW_EXPERIENCE]}
+        self.assertEqual(capabilities.completion_mode(None, False, 4100), "v1")
+        self.assertEqual(
+            capabilities.completion_mode({"enabled_features": None}, False, 4100), "v1"
+        )
+        self.assertEqual(
+            capabilities.completion_mode(new_experience, False, 4100), "v4"
+        )
+        self.assertEqual(
+            capabilities.completion_mode(new_experience, False, 3211), "v2"
+        )
+        self.assertEqual(capabilities.completion_mode(None, True, 4100), "v4")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+import fakes
+
+neo_ai_process = fakes.load_lib("neo_ai_process")
+
+
+class FakeProc:
+    """
+    Answers each request line with ``{"echo": <request>}``, once ``gate``
+    is set.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.answers = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.stdin = self
+        self.stdout = self
+        self.returncode = None
+
+    def write(self, line):
+        request = json.loads(line.decode("utf-8"))["request"]
+        self.requests.append(request)
+        self.answers.append(json.dumps({"echo": request}).encode("utf-8") + b"\n")
+
+    def flush(self):
+        pass
+
+    def readline(self):
+        self.gate.wait()
+        return self.answers.pop(0) if self.answers else b""
+
+    def poll(self):
+        return self.returncode
+
+    def terminate(self):
+        self.returncode = -15
+
+
+class FakeNeoAiProcess(neo_ai_process.NeoAiProcess):
+    def __init__(self):
+        super().__init__()
+        self.procs = []
+
+    def run_neoai(self, inheritStdio=False, additionalArgs=[]):
+        self.procs.append(FakeProc())
+        return self.procs[-1]
+
+
+def echo(request):
+    return {"echo": request}
+
+
+def autocomplete(before):
+    return {"Autocomplete": {"before": before, "filename": "a.py"}}
+
+
+class TestHotStandby(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch("builtins.print")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(fakes.SETTINGS.clear)
+        self.process = FakeNeoAiProcess()
+
+    def test_no_standby_by_default(self):
+        self.assertEqual(self.process.roundtrip({"Hello": {}}), {"echo": {"Hello": {}}})
+        self.assertEqual(len(self.process.procs), 1)
+        self.assertIsNone(self.process.standby_proc)
+
+    def test_the_standby_is_warmed_up_and_taken_over_on_a_crash(self):
+        fakes.SETTINGS["hot_standby"] = True
+        self.process.roundtrip({"Hello": {}})
+        first, standby = self.process.procs
+        self.assertIs(self.process.standby_proc, standby)
+        self.assertEqual(standby.requests, [{"Features": {}}])
+
+        first.terminate()
+        response = self.process.roundtrip({"Hello": {}})
+        self.assertIs(self.process.neoai_proc, standby)
+        # The answer to the warm-up request is not taken for this one's.
+        self.assertEqual(response, {"echo": {"Hello": {}}})
+        self.assertEqual(self.process.num_failovers, 1)
+
+
+class TestWorker(unittest.TestCase):
+    def setUp(self):
+        self.process = FakeNeoAiProcess()
+        fakes.sublime.run_pending()
+
+    def hold(self):
+        """
+        Keeps the worker busy with a request until the returned function is
+        called, so that the next ones stay queued.
+        """
+        self.process.restart_neoai_proc()
+        gate = self.process.procs[0].gate
+        gate.clear()
+        self.addCleanup(gate.set)
+        self.process.submit({"Hello": {}})
+        deadline = time.time() + 5
+        while not self.process.busy() or self.process.queue:
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.001)
+        return gate.set
+
+    def test_a_newer_request_with_the_same_key_cancels_the_queued_one(self):
+        release = self.hold()
+        older = self.process.submit(autocomplete("df.gr"), key=("Autocomplete", 1))
+        newer = self.process.submit(autocomplete("df.gro"), key=("Autocomplete", 1))
+        other = self.process.submit(autocomplete("x"), key=("Autocomplete", 2))
+        self.assertTrue(older.cancelled())
+        release()
+        self.assertEqual(newer.result(5), echo(autocomplete("df.gro")))
+        self.assertEqual(other.result(5), echo(autocomplete("x")))
+        self.assertEqual(
+            self.process.procs[0].requests,
+            [{"Hello": {}}, autocomplete("df.gro"), autocomplete("x")],
+        )
+
+    def test_request_gives_up_after_its_timeout(self):
+        release = self.hold()
+        self.assertIsNone(self.process.request(autocomplete("df.gr"), timeout=0.05))
+        release()
+        self.assertEqual(
+            self.process.request(autocomplete("df.gro"), timeout=5),
+            echo(autocomplete("df.gro")),
+        )
+
+    def test_callbacks_run_on_the_ui_thread_unless_cancelled(self):
+        release = self.hold()
+        responses = []
+        cancelled = self.process.submit(
+            autocomplete("df.gr"), key=("Autocomplete", 1), callback=responses.append
+        )
+        answered = self.process.submit(
+            autocomplete("df.gro"), key=("Autocomplete", 1), callback=responses.append
+        )
+        release()
+        answered.result(5)
+        self.assertTrue(cancelled.cancelled())
+        self.assertEqual(responses, [])
+        self.assertEqual(fakes.sublime.run_pending(), 1)
+        self.assertEqual(responses, [echo(autocomplete("df.gro"))])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+
+import fakes
+from fakes import sublime
+
+prefetch = fakes.load_lib("prefetch")
+
+
+class TestPrefetchScheduler(unittest.TestCase):
+    def setUp(self):
+        self.now = 100.0
+        self.busy = False
+        self.prefetched = []
+        self.scheduled = []
+        self.scheduler = prefetch.PrefetchScheduler(
+            self.prefetched.append,
+            lambda: self.busy,
+            clock=lambda: self.now,
+            schedule=lambda callback, delay: self.scheduled.append(delay),
+        )
+
+    def view(self, file_name, window=None):
+        view = sublime.View(file_name=file_name)
+        view.window = lambda: window
+        return view
+
+    def pump(self, seconds=0):
+        self.now += seconds
+        del self.scheduled[:]
+        self.scheduler.pump()
+
+    def test_prefetches_active_then_visible_then_recent(self):
+        self.scheduler.activated(self.view("/recent.py"))
+        active = self.view("/active.py")
+        visible = self.view("/visible.py")
+        window = sublime.Window([active, visible])
+        window.num_groups = lambda: 2
+        window.active_view_in_group = lambda group: [active, visible][group]
+        active.window = lambda: window
+        self.scheduler.activated(active)
+        for _ in range(3):
+            self.pump(1)
+        self.assertEqual(self.prefetched, ["/active.py", "/visible.py", "/recent.py"])
+        self.assertEqual(self.scheduled, [])
+
+    def test_does_not_prefetch_a_file_twice_within_the_ttl(self):
+        view = self.view("/a.py")
+        self.scheduler.loaded(view)
+        self.pump(1)
+        self.scheduler.activated(view)
+        self.pump(1)
+        self.assertEqual(self.prefetched, ["/a.py"])
+        self.now += prefetch.PREFETCH_TTL
+        self.scheduler.activated(view)
+        self.pump(1)
+        self.assertEqual(self.prefetched, ["/a.py", "/a.py"])
+
+    def test_waits_for_the_user_to_stop_typing(self):
+        self.scheduler.loaded(self.view("/a.py"))
+        self.assertEqual(self.scheduled, [prefetch.IDLE_DELAY])
+        self.scheduler.modified()
+        self.pump(0.2)
+        self.assertEqual(self.prefetched, [])
+        self.assertEqual(self.scheduled, [800])
+        self.pump(0.8)
+        self.assertEqual(self.prefetched, ["/a.py"])
+
+    def test_waits_while_the_binary_is_busy(self):
+        self.scheduler.loaded(self.view("/a.py"))
+        self.busy = True
+        self.pump(1)
+        self.assertEqual(self.prefetched, [])
+        self.assertEqual(self.scheduled, [prefetch.PREFETCH_INTERVAL])
+        self.busy = False
+        self.pump(0.5)
+        self.assertEqual(self.prefetched, ["/a.py"])
+
+    def test_rate_limits_prefetches(self):
+        self.scheduler.loaded(self.view("/a.py"))
+        self.scheduler.loaded(self.view("/b.py"))
+        self.pump(1)
+        self.pump(0.1)
+        self.assertEqual(self.prefetched, ["/a.py"])
+        self.pump(0.4)
+        self.assertEqual(self.prefetched, ["/a.py", "/b.py"])
+
+    def test_forgets_prefetches_older_than_the_ttl(self):
+        self.scheduler.loaded(self.view("/a.py"))
+        self.pump(1)
+        self.now += prefetch.PREFETCH_TTL
+        self.scheduler.loaded(self.view("/b.py"))
+        self.pump(1)
+        self.assertEqual(self.prefetched, ["/a.py", "/b.py"])
+        self.assertEqual(list(self.scheduler._prefetched), ["/b.py"])
+
+    def test_ignores_unsaved_views(self):
+        view = self.view("untitled")
+        view.file_name = lambda: None
+        self.scheduler.activated(view)
+        self.scheduler.loaded(view)
+        self.assertEqual(self.scheduled, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
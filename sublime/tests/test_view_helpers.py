@@ -0,0 +1,82 @@
+import unittest
+
+import fakes
+from fakes.sublime import View
+
+view_helpers = fakes.load_lib("view_helpers")
+completions_v4 = fakes.load_completions("completions_v4")
+
+TEXT = "".join("line {}\n".format(i) for i in range(10))
+
+
+class TestContextWindow(unittest.TestCase):
+    def test_reads_a_bounded_window(self):
+        view = View(TEXT)
+        position = view.text_point(5, 3)
+        window = view_helpers.get_context_window(view, position, 10, 2, 1)
+        self.assertEqual(window["before"], TEXT[position - 10 : position])
+        self.assertEqual(window["after"], TEXT[position : position + 10])
+        self.assertFalse(window["region_includes_beginning"])
+        self.assertFalse(window["region_includes_end"])
+        self.assertEqual(window["current_line"], "line 5")
+        self.assertEqual(window["previous_lines"], ["line 3", "line 4"])
+        self.assertEqual(window["next_lines"], ["line 6"])
+
+    def test_stops_at_the_edges_of_the_buffer(self):
+        view = View("first\nlast")
+        window = view_helpers.get_context_window(view, 2, 100, 19, 4)
+        self.assertEqual(window["before"], "fi")
+        self.assertEqual(window["after"], "rst\nlast")
+        self.assertTrue(window["region_includes_beginning"])
+        self.assertTrue(window["region_includes_end"])
+        self.assertEqual(window["previous_lines"], [])
+        self.assertEqual(window["next_lines"], ["last"])
+        window = view_helpers.get_context_window(view, view.size(), 100, 19, 4)
+        self.assertEqual(
+            (window["previous_lines"], window["current_line"], window["next_lines"]),
+            (["first"], "last", []),
+        )
+
+
+class TestContextSnapshots(unittest.TestCase):
+    def test_providers_share_a_snapshot_until_the_view_changes(self):
+        view = View(TEXT)
+        position = view.text_point(5, 3)
+        context = (
+            completions_v4.NeoaiAdvancedCompletionProvider()._get_enhanced_context(
+                view, position, "python", "li"
+            )
+        )
+        self.assertEqual(context["prefix"], TEXT[:position])
+        self.assertEqual(
+            context["previous_lines"], ["line {}".format(i) for i in range(5)]
+        )
+        self.assertEqual(
+            context["next_lines"], ["line {}".format(i) for i in range(6, 10)]
+        )
+
+        window = completions_v4.context_snapshots.get(view, position)
+        inline = completions_v4.NeoaiAdvancedInlineProvider()._get_enhanced_context(
+            view, position, "python"
+        )
+        self.assertIs(completions_v4.context_snapshots.get(view, position), window)
+        self.assertEqual(inline["prefix"], context["prefix"])
+
+        view.insert(0, "# header\n")
+        self.assertIsNot(completions_v4.context_snapshots.get(view, position), window)
+        self.assertIsNot(
+            completions_v4.context_snapshots.get(view, position + 1), window
+        )
+
+    def test_keeps_a_bounded_number_of_views(self):
+        snapshots = completions_v4.ContextSnapshots(max_views=2)
+        views = [View(TEXT) for _ in range(3)]
+        windows = [snapshots.get(view, 0) for view in views]
+        self.assertIsNot(snapshots.get(views[0], 0), windows[0])
+        self.assertIs(snapshots.get(views[2], 0), windows[2])
+        snapshots.discard(views[2])
+        self.assertIsNot(snapshots.get(views[2], 0), windows[2])
+
+
+if __name__ == "__main__":
+    unittest.main()